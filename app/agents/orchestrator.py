@@ -8,10 +8,35 @@ from app.llm.client import llm
 from app.agents.test_point import TestPointAgent
 from app.agents.planner import Planner
 from app.workflow.merge import merge_generation_context
+from app.services.coverage import CoverageTracker
+from app.settings import (
+    COVERAGE_GOAL_MODE,
+    COVERAGE_TARGET_RATIO,
+    COVERAGE_BATCH_SIZE,
+    COVERAGE_TOPUP_ROUNDS,
+    COVERAGE_TOPUP_CELLS,
+)
 
 
 LLM_TIMEOUT_SECONDS = 1800  # ⭐ 5 分钟
 
+# 用例字段要求（全量生成 / 缺口补生成共用）
+_CASE_FIELD_RULES = """3. 每条用例【必须包含以下字段】：
+   - case_name
+   - module
+   - precondition
+   - steps（数组）
+   - expected
+   - test_point_id（对应【测试点】中的 id）
+   - coverage（正常流程 / 异常输入 / 边界条件 / 状态变化 / 安全/风控 之一）
+
+【关于 precondition 的强制说明】
+- precondition 表示【执行该用例前必须满足的状态】
+- 只能描述“状态 / 前提”，不能写操作步骤
+- 不允许为空
+- 如果无特殊前置条件，请写：“无特殊前置条件”
+"""
+
 
 class Orchestrator:
     """
@@ -140,6 +165,7 @@ class Orchestrator:
         requirement_hint: str | None = None,
         analysis_result: Dict[str, Any] | None = None,
         focus_requirements: str | None = None,  # ⭐ 新增
+        coverage_goal: bool | None = None,      # None → settings.COVERAGE_GOAL_MODE
     ) -> Generator[Dict[str, Any], None, None]:
 
         confirmed_items = confirmed_items or []
@@ -147,6 +173,9 @@ class Orchestrator:
         if not test_points:
             raise RuntimeError("无测试点，禁止生成测试用例")
 
+        if coverage_goal is None:
+            coverage_goal = COVERAGE_GOAL_MODE
+
         merged = merge_generation_context(
             raw_requirements=raw_requirements,
             user_requirement=requirement_hint,
@@ -154,19 +183,36 @@ class Orchestrator:
         )
         merged_requirements = merged["merged_requirements"]
 
+        # 用例回填测试点的 origin / coverage_item（覆盖统计用）
+        tp_by_id = {
+            tp.get("id"): tp for tp in test_points
+            if isinstance(tp, dict) and tp.get("id")
+        }
+
         idx = 0
         yielded_any = False
 
-        try:
-            for raw_case in self._stage_cases_stream(
+        if coverage_goal:
+            case_stream = self._coverage_goal_stream(
+                merged_requirements,
+                test_points,
+                confirmed_items,
+                focus_requirements,
+                tp_by_id,
+            )
+        else:
+            case_stream = self._stage_cases_stream(
                 merged_requirements,
                 test_points,
                 confirmed_items,
                 focus_requirements,  # ⭐ 传下去
-            ):
+            )
+
+        try:
+            for raw_case in case_stream:
                 idx += 1
                 yielded_any = True
-                normalized = self._normalize_case(raw_case)
+                normalized = self._normalize_case(raw_case, tp_by_id)
                 normalized["_index"] = idx
                 yield normalized
 
@@ -212,19 +258,7 @@ class Orchestrator:
 【生成规则（必须严格遵守）】
 1. 每个测试点 ≥ 3 条（正常 / 异常 / 边界）
 2. 返回 JSON 数组
-3. 每条用例【必须包含以下字段】：
-   - case_name
-   - module
-   - precondition
-   - steps（数组）
-   - expected
-
-【关于 precondition 的强制说明】
-- precondition 表示【执行该用例前必须满足的状态】
-- 只能描述“状态 / 前提”，不能写操作步骤
-- 不允许为空
-- 如果无特殊前置条件，请写：“无特殊前置条件”
-
+{_CASE_FIELD_RULES}
 【用户补充测试重点（必须重点覆盖）】
 {focus_requirements or "无"}
 
@@ -235,6 +269,108 @@ class Orchestrator:
 {json.dumps(test_points, ensure_ascii=False, indent=2)}
 """
 
+        yield from self._call_llm_cases(prompt)
+
+    # =====================================================
+    # 🎯 覆盖目标模式：分批生成 + 达标即停 + 缺口补生成
+    # =====================================================
+    def _coverage_goal_stream(
+        self,
+        raw_requirements: str,
+        test_points: List[Dict[str, Any]],
+        confirmed_items: List[str],
+        focus_requirements: str | None,
+        tp_by_id: Dict[str, Dict[str, Any]],
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        - 测试点按 COVERAGE_BATCH_SIZE 分批（mandatory 优先），每批一次 LLM 调用
+        - 每批结束检查覆盖目标，达成即不再调度后续批次
+        - 全部批次后仍未达标：只针对缺口（测试点 × 覆盖维度）发送小 prompt 补生成
+        """
+        tracker = CoverageTracker(test_points)
+
+        def track(cases):
+            for raw_case in cases:
+                tracker.add(self._normalize_case(raw_case, tp_by_id))
+                yield raw_case
+
+        def targets_met():
+            return tracker.meets_targets(COVERAGE_TARGET_RATIO)
+
+        # mandatory 测试点优先，尽早满足强制覆盖项
+        ordered = sorted(test_points, key=lambda tp: tp.get("origin") != "mandatory")
+        batch_size = max(1, COVERAGE_BATCH_SIZE)
+        scheduled_ids: List[str] = []
+
+        for start in range(0, len(ordered), batch_size):
+            if targets_met():
+                print(f"🎯 覆盖目标已达成，跳过剩余 {len(ordered) - start} 个测试点")
+                return
+
+            batch = ordered[start:start + batch_size]
+            scheduled_ids.extend(tp.get("id") for tp in batch)
+            yield from track(self._stage_cases_stream(
+                raw_requirements, batch, confirmed_items, focus_requirements,
+            ))
+
+        for _ in range(COVERAGE_TOPUP_ROUNDS):
+            if targets_met():
+                return
+
+            cells = tracker.uncovered_cells(scheduled_ids)
+            if not cells:
+                return
+
+            chunk_size = max(1, COVERAGE_TOPUP_CELLS)
+            for start in range(0, len(cells), chunk_size):
+                if targets_met():
+                    return
+                yield from track(self._call_llm_cases(self._build_topup_prompt(
+                    raw_requirements,
+                    cells[start:start + chunk_size],
+                    tp_by_id,
+                    focus_requirements,
+                )))
+
+    def _build_topup_prompt(
+        self,
+        raw_requirements: str,
+        cells: List[tuple],
+        tp_by_id: Dict[str, Dict[str, Any]],
+        focus_requirements: str | None = None,
+    ) -> str:
+        gaps: Dict[str, List[str]] = {}
+        for tp_id, coverage in cells:
+            gaps.setdefault(tp_id, []).append(coverage)
+
+        targets = [
+            {
+                "test_point": tp_by_id.get(tp_id) or {"id": tp_id},
+                "missing_coverage": coverages,
+            }
+            for tp_id, coverages in gaps.items()
+        ]
+
+        return f"""
+你是一名资深软件测试专家。
+
+以下测试点已有部分用例，但缺少指定覆盖维度。请只为【缺失的覆盖维度】补充测试用例：
+
+【生成规则（必须严格遵守）】
+1. 每个测试点的每个缺失维度生成 1 条用例，不要重复已有维度
+2. 返回 JSON 数组
+{_CASE_FIELD_RULES}
+【用户补充测试重点（必须重点覆盖）】
+{focus_requirements or "无"}
+
+【需求内容】
+{raw_requirements}
+
+【待补充的测试点与缺失维度】
+{json.dumps(targets, ensure_ascii=False, indent=2)}
+"""
+
+    def _call_llm_cases(self, prompt: str) -> Generator[Dict[str, Any], None, None]:
         raw = None
 
         with ThreadPoolExecutor(max_workers=1) as executor:
@@ -264,11 +400,17 @@ class Orchestrator:
     # =====================================================
     # 用例规范化
     # =====================================================
-    def _normalize_case(self, raw: Dict[str, Any]) -> Dict[str, Any]:
+    def _normalize_case(
+        self,
+        raw: Dict[str, Any],
+        tp_by_id: Dict[str, Dict[str, Any]] | None = None,
+    ) -> Dict[str, Any]:
         steps = raw.get("steps") or []
         if isinstance(steps, str):
             steps = [steps]
 
+        tp = (tp_by_id or {}).get(raw.get("test_point_id")) or {}
+
         return {
             "case_name": raw.get("case_name") or "未命名用例",
             "module": raw.get("module", ""),
@@ -276,7 +418,12 @@ class Orchestrator:
             "steps": steps,
             "expected": raw.get("expected", ""),
             "test_point_id": raw.get("test_point_id"),
-            "test_point_name": raw.get("test_point_name"),
+            "test_point_name": raw.get("test_point_name") or tp.get("name"),
+            "coverage": raw.get("coverage") or raw.get("coverage_type"),
+            "origin": raw.get("origin") or tp.get("origin"),
+            "coverage_item": raw.get("coverage_item") or (
+                tp.get("source_requirement") if tp.get("origin") == "mandatory" else None
+            ),
         }
 
     def _safe_parse_cases(self, raw: Any) -> List[Dict[str, Any]]:
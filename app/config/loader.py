@@ -1,6 +1,5 @@
 from pathlib import Path
 import os
-import yaml
 import re
 
 # 支持 ${ENV_VAR} 形式
@@ -45,6 +44,9 @@ def load_config() -> dict:
             f"Missing config.yaml at: {config_path}"
         )
 
+    # ⚠️ yaml 延迟导入：环境变量齐全时不会走到这里
+    import yaml
+
     with open(config_path, "r", encoding="utf-8") as f:
         raw_cfg = yaml.safe_load(f) or {}
 
@@ -63,4 +65,8 @@ def load_config() -> dict:
                 f"Check config.yaml or environment variables."
             )
 
+    # 其余字段（domain_keywords、大写的 settings 键等）原样透传，不做 ${ENV_VAR} 解析
+    for k, v in raw_cfg.items():
+        cfg.setdefault(k, v)
+
     return cfg
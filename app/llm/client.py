@@ -3,7 +3,6 @@
 # NOTE: This file must be saved as UTF-8 (no BOM)
 
 import json
-from openai import OpenAI
 
 from app.settings import (
     OPENAI_API_KEY,
@@ -21,6 +20,9 @@ class LLM:
     """
 
     def call(self, prompt: str) -> dict:
+        # ⚠️ openai SDK 延迟导入（导入耗时较长，首次调用 LLM 时才加载）
+        from openai import OpenAI
+
         client = OpenAI(
             api_key=OPENAI_API_KEY,
             base_url=OPENAI_BASE_URL,
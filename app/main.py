@@ -1,34 +1,69 @@
-from fastapi import FastAPI, UploadFile, File, Form
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
 from app.workflow.router import router as workflow_router
 
 
-import shutil
 import os
 import uuid
 import json
-import asyncio
 import traceback
 import re
+import time
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from typing import Dict, Optional
 
 # ===============================
 # 项目内部依赖
 # ===============================
-from app.settings import TMP_DIR
-from app.workflow.state import update_workflow, get_workflow
+from app.settings import (
+    TMP_DIR,
+    MAX_UPLOAD_BYTES,
+    TASK_EXCEL_MAP_MAX,
+    TASK_EXCEL_TTL,
+    WARMUP_IMPORTS,
+)
+from app.workflow.state import (
+    update_workflow,
+    update_workflow_stage,
+    get_workflow,
+    get_store,
+)
 from app.workflow.models import WorkflowStage
 
 # ✅ 正确的 merge 函数
 from app.workflow.merge import merge_generation_context
+from app.workflow.jobs import start_job_runtime, stop_job_runtime
+from app.services.export_cache import conditional_file_response, file_etag
+from app.services.case_exporters import shutdown_export_pool
+from app.services.warmup import start_background_warmup
+from app.services.ingest import UploadSizeLimitMiddleware, UPLOAD_FORM_OVERHEAD
 
 # ===============================
 # 初始化
 # ===============================
 os.makedirs(TMP_DIR, exist_ok=True)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # ⭐ 后台任务 worker 进程池 + 结果回写线程
+    start_job_runtime()
+    # ⭐ 重依赖在首次使用时才导入；服务开始监听后在后台预先加载
+    if WARMUP_IMPORTS:
+        start_background_warmup()
+    try:
+        yield
+    finally:
+        stop_job_runtime()
+        shutdown_export_pool()
+        # ⭐ 退出前把 write-behind 的进度更新落盘
+        get_store().close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(
@@ -39,11 +74,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ⭐ 请求体超过上传上限时在 multipart 解析前拒绝（不先落盘整个文件）
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_bytes=MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD,
+)
+
 # ⭐ 注册 workflow 路由（关键）
 from app.workflow.router import router as workflow_router
 app.include_router(workflow_router, prefix="/workflow", tags=["workflow"])
 
-TASK_EXCEL_MAP: Dict[str, str] = {}
+# =====================================================
+# task_id → excel 路径（有界 · 过期淘汰）
+# =====================================================
+class _ExpiringTaskMap:
+    """
+    最多保留 max_entries 条，超过 ttl 秒的条目在读写时淘汰
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __setitem__(self, key: str, value: str):
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (time.monotonic(), value)
+            self._evict()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            self._evict()
+            item = self._items.get(key)
+            return item[1] if item else default
+
+    def __len__(self):
+        return len(self._items)
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._items:
+            _, (ts, _) = next(iter(self._items.items()))
+            if len(self._items) > self.max_entries or now - ts > self.ttl:
+                self._items.popitem(last=False)
+            else:
+                break
+
+
+TASK_EXCEL_MAP = _ExpiringTaskMap(TASK_EXCEL_MAP_MAX, TASK_EXCEL_TTL)
 
 # =====================================================
 # SSE 工具函数
@@ -63,13 +143,25 @@ async def generate_testcases_stream(
 ):
     async def event_generator():
         task_id = str(uuid.uuid4())
-        tmp_name = f"sse_{task_id}_{file.filename}"
+        tmp_name = f"sse_{task_id}_{os.path.basename(file.filename or 'upload.pdf')}"
         file_path = os.path.join(TMP_DIR, tmp_name)
 
+        # ⚠️ 本接口里的同步调用（workflow 存储 / LLM 阶段 / Excel 导出）都放到线程池，
+        #    不在事件循环上阻塞其他连接
+        async def report(message: str):
+            if workflow_id:
+                await run_in_threadpool(
+                    update_workflow_stage,
+                    workflow_id,
+                    WorkflowStage.GENERATING,
+                    message=message,
+                )
+
         try:
             from app.services.pdf_parser import parse_pdf
+            from app.services.ingest import save_upload_streaming
             from app.agents.orchestrator import Orchestrator
-            from app.services.excel_exporter import export_excel
+            from app.services.excel_exporter import export_excel, excel_path_for
 
             orch = Orchestrator()
 
@@ -77,29 +169,24 @@ async def generate_testcases_stream(
             # workflow：开始生成
             # ===============================
             if workflow_id:
-                update_workflow(
-                    workflow_id,
-                    stage=WorkflowStage.GENERATING,
-                    progress=5,
-                    message="建立生成任务",
-                    task_id=task_id,
-                )
+                await run_in_threadpool(update_workflow, workflow_id, task_id=task_id)
+            await report("建立生成任务")
 
             yield sse_event("connected", {"task_id": task_id})
 
             # ===============================
-            # 保存 PDF
+            # 保存 PDF（分块落盘，不阻塞事件循环）
             # ===============================
-            with open(file_path, "wb") as f:
-                shutil.copyfileobj(file.file, f)
+            await save_upload_streaming(file, file_path, MAX_UPLOAD_BYTES)
 
             # ===============================
             # PDF 解析
             # ===============================
             yield sse_event("stage", "pdf_parsing")
-            update_workflow(workflow_id, progress=15, message="解析需求文档")
+            await report("解析需求文档")
 
-            pdf_data = parse_pdf(file_path) or {}
+            # ⚠️ 解析是 CPU 密集同步调用，放到线程池
+            pdf_data = await run_in_threadpool(parse_pdf, file_path) or {}
             raw_requirements = (
                 pdf_data.get("confirmed_text", "")
                 + "\n"
@@ -115,10 +202,11 @@ async def generate_testcases_stream(
             # =====================================================
             analysis_result = None
             if workflow_id:
-                wf = get_workflow(workflow_id)
+                wf = await run_in_threadpool(get_workflow, workflow_id)
                 analysis_result = wf.analysis_result if wf else None
 
-            merged = merge_generation_context(
+            merged = await run_in_threadpool(
+                merge_generation_context,
                 raw_requirements=raw_requirements,
                 user_requirement=requirement,
                 analysis_result=analysis_result,
@@ -129,15 +217,16 @@ async def generate_testcases_stream(
             # ===============================
             # Stage 1：modules
             # ===============================
-            update_workflow(workflow_id, progress=30, message="构建功能模块")
-            modules = orch._stage_modules(merged_context)
+            await report("构建功能模块")
+            modules = await run_in_threadpool(orch._stage_modules, merged_context)
             yield sse_event("modules", modules)
 
             # ===============================
             # Stage 2：test_points
             # ===============================
-            update_workflow(workflow_id, progress=50, message="生成测试点")
-            test_points = orch._stage_test_points(
+            await report("生成测试点")
+            test_points = await run_in_threadpool(
+                orch._stage_test_points,
                 merged_context,
                 modules,
                 [],
@@ -147,33 +236,36 @@ async def generate_testcases_stream(
             # ===============================
             # Stage 3：cases
             # ===============================
-            update_workflow(workflow_id, progress=70, message="生成测试用例")
+            await report("生成测试用例")
             collected_cases = []
 
             for group in test_points:
-                for case in orch._stage_cases_stream(
+                # 同步生成器的每一步（LLM 调用）都在线程池里推进
+                async for case in iterate_in_threadpool(orch._stage_cases_stream(
                     merged_context,
                     [group],
                     [],
-                ):
+                )):
                     collected_cases.append(case)
                     yield sse_event("case", {"case": case})
-                    await asyncio.sleep(0)
 
             # ===============================
             # Excel
             # ===============================
-            update_workflow(workflow_id, progress=90, message="导出 Excel")
-            excel_path = export_excel(collected_cases)
+            await report("导出 Excel")
+            excel_path = await run_in_threadpool(
+                export_excel, collected_cases, excel_path_for(task_id)
+            )
             TASK_EXCEL_MAP[task_id] = excel_path
 
-            update_workflow(
-                workflow_id,
-                stage=WorkflowStage.GENERATED,
-                progress=100,
-                message="生成完成",
-                excel_path=excel_path,
-            )
+            if workflow_id:
+                await run_in_threadpool(update_workflow, workflow_id, excel_path=excel_path)
+                await run_in_threadpool(
+                    update_workflow_stage,
+                    workflow_id,
+                    WorkflowStage.GENERATED,
+                    message="生成完成",
+                )
 
             yield sse_event("done", {
                 "task_id": task_id,
@@ -204,12 +296,17 @@ async def generate_testcases_stream(
 # Excel 下载
 # =====================================================
 @app.get("/download/{task_id}")
-async def download_excel(task_id: str):
+async def download_excel(request: Request, task_id: str):
     excel_path = TASK_EXCEL_MAP.get(task_id)
     if not excel_path or not os.path.exists(excel_path):
         return JSONResponse(status_code=404, content={"message": "Excel 不存在"})
-    return FileResponse(
+
+    # ETag = 文件内容 sha256（按 mtime 记忆，仅首次读盘）
+    etag = await run_in_threadpool(file_etag, excel_path)
+    return conditional_file_response(
+        request,
         excel_path,
+        etag=etag,
         filename="智能体生成测试用例.xlsx",
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
     )
@@ -0,0 +1,406 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/services/case_exporters.py
+
+"""
+多格式用例导出（xlsx / csv / jsonl / parquet）
+
+- 所有格式共用 normalize_case，字段口径与 Excel 一致
+- 统一接口：append(raw_case) / extend / close() → path / count
+- 生成过程中原始用例落盘为 JSONL（spill），其余格式按需从 spill 流式转换
+- 所有文件按用例集哈希存放，相同用例集复用已有导出
+- 实际转换在独立进程中执行（export_in_process）
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+from app.settings import EXPORT_PROCESSES
+from app.services.excel_exporter import (
+    HEADERS,
+    StreamingExcelWriter,
+    case_to_row,
+    flatten_cases,
+    normalize_case,
+    part_path as _part_path,
+)
+from app.services.export_cache import (
+    CaseSetHasher,
+    cached_export_path,
+    maybe_evict_export_cache,
+    touch_cached_export,
+)
+
+
+class ExportFormatUnavailable(RuntimeError):
+    """
+    导出格式依赖的可选库未安装（如 parquet 需要 pyarrow）
+    """
+
+
+# =====================================================
+# 写入器
+# =====================================================
+class CaseWriter:
+    extension = ""
+    media_type = "application/octet-stream"
+
+    def __init__(self, save_path: str):
+        self.save_path = save_path
+        self.count = 0
+        # 先写 .part，close 时 rename（文件出现即完整）
+        self._tmp_path: Optional[str] = None
+
+    def append(self, raw_case: Dict[str, Any]):
+        try:
+            # 兼容 {"module", "test_cases": [...]} 分组结构
+            for raw in flatten_cases([raw_case]):
+                self._write(normalize_case(raw))
+                self.count += 1
+        except Exception:
+            self.abort()
+            raise
+
+    def extend(self, raw_cases):
+        for raw in raw_cases:
+            self.append(raw)
+
+    def _write(self, case: Dict[str, Any]):
+        raise NotImplementedError
+
+    def _close_handle(self):
+        raise NotImplementedError
+
+    def close(self) -> str:
+        try:
+            self._close_handle()
+            os.replace(self._tmp_path, self.save_path)
+        except Exception:
+            self.abort()
+            raise
+        return self.save_path
+
+    def abort(self):
+        """
+        写入失败：关闭句柄并删除 .part，不留下半截文件（可重复调用）
+        """
+        try:
+            self._close_handle()
+        except Exception:
+            pass
+        if self._tmp_path and os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+class ExcelCaseWriter(CaseWriter):
+    extension = ".xlsx"
+    media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    def __init__(self, save_path: str):
+        super().__init__(save_path)
+        self._writer = StreamingExcelWriter(save_path)
+
+    def append(self, raw_case: Dict[str, Any]):
+        self._writer.append(raw_case)
+        self.count = self._writer.count
+
+    def close(self) -> str:
+        # .part 的清理由 StreamingExcelWriter.close 负责
+        return self._writer.close()
+
+    def abort(self):
+        pass
+
+
+class CsvCaseWriter(CaseWriter):
+    """
+    列与 Excel 表头一致；utf-8-sig 便于 Excel 直接打开不乱码
+    """
+    extension = ".csv"
+    media_type = "text/csv; charset=utf-8"
+
+    def __init__(self, save_path: str):
+        super().__init__(save_path)
+        self._tmp_path = _part_path(save_path)
+        self._fp = open(self._tmp_path, "w", encoding="utf-8-sig", newline="")
+        self._csv = csv.writer(self._fp)
+        self._csv.writerow(HEADERS)
+
+    def _write(self, case: Dict[str, Any]):
+        self._csv.writerow(case_to_row(case))
+
+    def _close_handle(self):
+        self._fp.close()
+
+
+class JsonlCaseWriter(CaseWriter):
+    """
+    每行一个 JSON 对象
+
+    normalized=False 时原样写入原始用例（生成过程的 spill 文件）
+    """
+    extension = ".jsonl"
+    media_type = "application/x-ndjson"
+
+    def __init__(self, save_path: str, normalized: bool = True):
+        super().__init__(save_path)
+        self.normalized = normalized
+        self._tmp_path = _part_path(save_path)
+        self._fp = open(self._tmp_path, "w", encoding="utf-8")
+
+    def append(self, raw_case: Dict[str, Any]):
+        if self.normalized:
+            super().append(raw_case)
+            return
+        try:
+            self._write(raw_case)
+        except Exception:
+            self.abort()
+            raise
+        self.count += 1
+
+    def _write(self, case: Dict[str, Any]):
+        self._fp.write(json.dumps(case, ensure_ascii=False))
+        self._fp.write("\n")
+
+    def _close_handle(self):
+        self._fp.close()
+
+
+PARQUET_ROW_GROUP = 10_000
+
+PARQUET_COLUMNS = [
+    "case_name", "module", "tags", "precondition", "steps",
+    "expected", "priority", "automatable", "remark",
+]
+
+
+class ParquetCaseWriter(CaseWriter):
+    """
+    列式导出（批量分析用），每 PARQUET_ROW_GROUP 行写一个 row group
+
+    ⚠️ 可选依赖 pyarrow
+    """
+    extension = ".parquet"
+    media_type = "application/vnd.apache.parquet"
+
+    def __init__(self, save_path: str):
+        super().__init__(save_path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ExportFormatUnavailable("parquet 导出需要安装 pyarrow")
+
+        self._pa = pa
+        self._schema = pa.schema(
+            [(name, pa.list_(pa.string()) if name == "steps" else pa.string())
+             for name in PARQUET_COLUMNS]
+        )
+        self._tmp_path = _part_path(save_path)
+        self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+        self._columns: Dict[str, List[Any]] = {name: [] for name in PARQUET_COLUMNS}
+
+    def _write(self, case: Dict[str, Any]):
+        for name in PARQUET_COLUMNS:
+            value = case.get(name)
+            if name == "steps":
+                self._columns[name].append([str(s) for s in value or []])
+            else:
+                self._columns[name].append("" if value is None else str(value))
+
+        if len(self._columns["case_name"]) >= PARQUET_ROW_GROUP:
+            self._flush_rows()
+
+    def _flush_rows(self):
+        if not self._columns["case_name"]:
+            return
+        table = self._pa.Table.from_pydict(self._columns, schema=self._schema)
+        self._writer.write_table(table)
+        self._columns = {name: [] for name in PARQUET_COLUMNS}
+
+    def _close_handle(self):
+        try:
+            self._flush_rows()
+        finally:
+            self._writer.close()
+
+
+CASE_WRITERS: Dict[str, Type[CaseWriter]] = {
+    "xlsx": ExcelCaseWriter,
+    "csv": CsvCaseWriter,
+    "jsonl": JsonlCaseWriter,
+    "parquet": ParquetCaseWriter,
+}
+
+EXPORT_FORMATS = tuple(CASE_WRITERS)
+
+
+def get_case_writer(fmt: str, save_path: str) -> CaseWriter:
+    writer_cls = CASE_WRITERS.get(fmt)
+    if writer_cls is None:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    return writer_cls(save_path)
+
+
+# =====================================================
+# 缓存路径（按用例集哈希寻址，见 export_cache.py）
+# =====================================================
+SPILL_EXTENSION = ".cases.jsonl"
+
+
+def cached_case_spill(content_hash: str) -> str:
+    return cached_export_path(content_hash, SPILL_EXTENSION)
+
+
+def cached_case_export(content_hash: str, fmt: str) -> str:
+    return cached_export_path(content_hash, CASE_WRITERS[fmt].extension)
+
+
+def _commit_to_cache(tmp_path: str, final_path: str) -> str:
+    """
+    相同哈希的文件已存在则直接复用（不重写内容）
+
+    复用时刷新 mtime：整组淘汰以组内最近使用时间为准，刚生成完的用例集不会在导出前被清掉
+    """
+    if os.path.exists(final_path):
+        os.remove(tmp_path)
+        os.utime(final_path)
+    else:
+        os.replace(tmp_path, final_path)
+    return final_path
+
+
+# =====================================================
+# spill → 任意格式
+# =====================================================
+def iter_spilled_cases(spill_path: str) -> Iterator[Dict[str, Any]]:
+    with open(spill_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_spilled_cases(spill_path: str, fmt: str, save_path: str) -> str:
+    """
+    从原始用例 spill 流式转换，内存与用例数无关
+    """
+    writer = get_case_writer(fmt, save_path)
+    try:
+        writer.extend(iter_spilled_cases(spill_path))
+    except Exception:
+        # spill 读取 / 解析失败同样不留 .part
+        writer.abort()
+        raise
+    return writer.close()
+
+
+def ensure_cached_export(content_hash: str, fmt: str) -> Optional[str]:
+    """
+    返回该用例集指定格式的导出文件，缓存未命中时从 spill 转换
+
+    spill 不存在（未生成 / 已整组淘汰）返回 None
+    """
+    save_path = cached_case_export(content_hash, fmt)
+    if os.path.exists(save_path):
+        touch_cached_export(save_path)
+        return save_path
+
+    spill_path = cached_case_spill(content_hash)
+    if not os.path.exists(spill_path):
+        return None
+
+    touch_cached_export(spill_path)
+    path = export_spilled_cases(spill_path, fmt, save_path)
+    maybe_evict_export_cache()
+    return path
+
+
+# =====================================================
+# 导出进程池（openpyxl 纯 Python 写 XML，避免占用 API 进程的 GIL）
+# =====================================================
+_EXPORT_POOL: Optional[ProcessPoolExecutor] = None
+_EXPORT_POOL_LOCK = threading.Lock()
+
+
+def _get_export_pool() -> ProcessPoolExecutor:
+    global _EXPORT_POOL
+    with _EXPORT_POOL_LOCK:
+        if _EXPORT_POOL is None:
+            # ⚠️ spawn：子进程不继承 API 进程的线程 / 事件循环
+            _EXPORT_POOL = ProcessPoolExecutor(
+                max_workers=EXPORT_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _EXPORT_POOL
+
+
+def export_in_process(content_hash: str, fmt: str) -> Optional[str]:
+    """
+    缓存命中直接返回；否则在导出进程中从 spill 转换，阻塞到文件就绪
+
+    子进程只收到哈希与格式，用例数据通过 spill 文件传递
+    """
+    save_path = cached_case_export(content_hash, fmt)
+    if os.path.exists(save_path):
+        touch_cached_export(save_path)
+        return save_path
+
+    if EXPORT_PROCESSES <= 0:
+        return ensure_cached_export(content_hash, fmt)
+
+    return _get_export_pool().submit(ensure_cached_export, content_hash, fmt).result()
+
+
+def shutdown_export_pool():
+    global _EXPORT_POOL
+    with _EXPORT_POOL_LOCK:
+        if _EXPORT_POOL is not None:
+            _EXPORT_POOL.shutdown(wait=True, cancel_futures=True)
+            _EXPORT_POOL = None
+
+
+# =====================================================
+# 生成过程中的输出（只写 spill + 算哈希，导出交给进程池）
+# =====================================================
+class CaseOutputs:
+    """
+    生成线程只做轻量的 JSONL 追加与哈希，close 时 spill 按哈希落入缓存目录
+    """
+
+    def __init__(self):
+        self.spill = JsonlCaseWriter(
+            cached_export_path(f"tmp-{uuid.uuid4().hex}", SPILL_EXTENSION),
+            normalized=False,
+        )
+        self.hasher = CaseSetHasher()
+        self.content_hash: Optional[str] = None
+
+    @property
+    def count(self) -> int:
+        return self.hasher.count
+
+    def append(self, raw_case: Dict[str, Any]):
+        self.spill.append(raw_case)
+        self.hasher.update(raw_case)
+
+    def abort(self):
+        """
+        生成失败时丢弃未完成的 spill
+        """
+        self.spill.abort()
+
+    def close(self) -> str:
+        """
+        返回用例集哈希（之后用 export_in_process / ensure_cached_export 导出）
+        """
+        self.content_hash = self.hasher.hexdigest()
+        _commit_to_cache(self.spill.close(), cached_case_spill(self.content_hash))
+        maybe_evict_export_cache()
+        return self.content_hash
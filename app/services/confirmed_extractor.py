@@ -4,9 +4,58 @@
 # @Author: sulo
 # services/confirmed_extractor.py
 
+import json
 import re
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 
+from app.settings import get_domain_keywords
+from app.services.keyword_matcher import KeywordMatcher, build_keyword_matcher
+
+
+# 内置领域词典；config.yaml 的 domain_keywords 按分类追加
+DEFAULT_DOMAIN_KEYWORDS: Dict[str, List[str]] = {
+    "action": ["登录", "注册", "退出", "新增", "删除", "修改", "查询"],
+    "account": ["用户", "账号", "用户名", "密码", "验证码", "权限", "角色"],
+    "result": ["成功", "失败", "错误", "异常", "超时"],
+}
+
+# URL / API 路径合并为一次正则扫描
+_URL_OR_API_PATTERN = re.compile(r"https?://[^\s]+|/api/[a-zA-Z0-9/_\-]+")
+_API_PATTERN = re.compile(r"/api/[a-zA-Z0-9/_\-]+")
+
+
+def load_domain_keywords() -> Dict[str, List[str]]:
+    """
+    内置词典 + 配置（dict 或同结构 JSON 字符串），按分类合并
+    """
+    raw = get_domain_keywords()
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except ValueError:
+            raw = None
+
+    merged = {k: list(v) for k, v in DEFAULT_DOMAIN_KEYWORDS.items()}
+    if isinstance(raw, dict):
+        for category, words in raw.items():
+            if isinstance(words, str):
+                words = [words]
+            merged.setdefault(str(category), []).extend(
+                str(w) for w in words or [] if w
+            )
+    return merged
+
+
+@lru_cache(maxsize=1)
+def get_domain_matcher() -> KeywordMatcher:
+    """
+    全部领域关键词的 matcher（首次使用时读取配置并构建，之后复用）
+    """
+    return build_keyword_matcher(
+        w for words in load_domain_keywords().values() for w in words
+    )
+
 
 def _extract_focus_points(requirement: Optional[str]) -> List[str]:
     """
@@ -29,12 +78,15 @@ def _extract_focus_points(requirement: Optional[str]) -> List[str]:
 
 def extract_confirmed_items(
     text: str,
-    requirement: Optional[str] = None
+    requirement: Optional[str] = None,
+    matcher: Optional[KeywordMatcher] = None,
 ) -> Dict[str, Any]:
     """
     从 OCR / 文本中抽取【确定识别】的高置信内容
     同时解析前端指定的【重点测试方向】
 
+    :param matcher: 关键词 matcher，默认使用 get_domain_matcher()
+
     返回结构化结果，供下游 Agent 使用
     """
 
@@ -44,17 +96,15 @@ def extract_confirmed_items(
     confirmed = set()
 
     if text:
-        patterns = [
-            r"https?://[^\s]+",                 # URL
-            r"/api/[a-zA-Z0-9/_\-]+",            # API 路径
-            r"登录|注册|退出|新增|删除|修改|查询",
-            r"用户|账号|用户名|密码|验证码|权限|角色",
-            r"成功|失败|错误|异常|超时",
-        ]
-
-        for p in patterns:
-            for m in re.findall(p, text):
-                confirmed.add(m.strip())
+        # URL / API 路径：一次正则扫描（URL 内的 /api 路径单独补出）
+        for m in _URL_OR_API_PATTERN.finditer(text):
+            value = m.group()
+            confirmed.add(value.strip())
+            if not value.startswith("/api/"):
+                confirmed.update(a.strip() for a in _API_PATTERN.findall(value))
+
+        # 领域关键词：一次扫描（小词典走正则，大词典走 Aho-Corasick）
+        confirmed.update((matcher or get_domain_matcher()).find_all(text))
 
     confirmed_items = sorted(list(confirmed))
 
@@ -3,12 +3,18 @@
 # @Time: 2026/1/14 22:46
 # @Author: sulo
 
+from app.services.keyword_matcher import build_keyword_matcher
+
 # ===============================
 # 原有测试覆盖维度（保留）
 # ===============================
 
 COVERAGE = ["正常流程", "异常输入", "边界条件", "状态变化", "安全/风控"]
 
+# 覆盖维度 → bit（索引版 API 使用）
+COVERAGE_BITS = {c: 1 << i for i, c in enumerate(COVERAGE)}
+FULL_COVERAGE_MASK = (1 << len(COVERAGE)) - 1
+
 
 def calc_coverage(tp_id, cases):
     """
@@ -34,6 +40,8 @@ def calc_coverage(tp_id, cases):
 
 def check_mandatory_coverage(mandatory_items, test_points):
     """
+    ⚠️ 已改为委托 MandatoryCoverageIndex（结果与原逐项扫描一致）
+
     校验用户指定的 mandatory / focus coverage 是否被覆盖
 
     :param mandatory_items: list[str] | None
@@ -47,39 +55,10 @@ def check_mandatory_coverage(mandatory_items, test_points):
           "限价单": False
         }
     """
-    result = {}
-
     if not mandatory_items:
-        return result
+        return {}
 
-    for item in mandatory_items:
-        covered = False
-
-        for tp in test_points:
-            # =========================
-            # 方式 1：新体系（最高优先）
-            # =========================
-            if tp.get("origin") == "mandatory":
-                # 如果 source_requirement 明确匹配
-                if tp.get("source_requirement") == item:
-                    covered = True
-                    break
-
-                # 兜底：名称语义匹配
-                if item and item in (tp.get("name") or ""):
-                    covered = True
-                    break
-
-            # =========================
-            # 方式 2：旧体系兼容
-            # =========================
-            if tp.get("source_requirement") == item:
-                covered = True
-                break
-
-        result[item] = covered
-
-    return result
+    return MandatoryCoverageIndex(test_points).check(mandatory_items)
 
 
 # ===============================
@@ -139,3 +118,222 @@ def calc_focus_hit_cases(cases):
         "total_cases": total,
         "focus_ratio": round(focus_cases / total, 3) if total else 0.0,
     }
+
+
+# ===============================
+# ⚡ 索引版覆盖计算（线性时间）
+# ===============================
+
+def _case_coverage_type(case):
+    return case.get("coverage") or case.get("coverage_type")
+
+
+def build_coverage_index(cases):
+    """
+    单次遍历用例，构建 test_point_id → 覆盖维度 bitmask
+
+    :return: dict[tp_id, int]
+    """
+    index = {}
+
+    for case in cases or []:
+        bit = COVERAGE_BITS.get(_case_coverage_type(case))
+        if not bit:
+            continue
+        tp_id = case.get("test_point_id")
+        index[tp_id] = index.get(tp_id, 0) | bit
+
+    return index
+
+
+def coverage_from_mask(mask):
+    """
+    bitmask → {维度: bool}（与 calc_coverage 返回结构一致）
+    """
+    return {c: bool(mask & bit) for c, bit in COVERAGE_BITS.items()}
+
+
+def calc_coverage_matrix(test_points, cases):
+    """
+    全部测试点的覆盖矩阵，O(test_points + cases)
+
+    :return: dict[tp_id, dict[str, bool]]
+        等价于 {tp["id"]: calc_coverage(tp["id"], cases) for tp in test_points}
+    """
+    index = build_coverage_index(cases)
+    return {
+        tp.get("id"): coverage_from_mask(index.get(tp.get("id"), 0))
+        for tp in test_points or []
+    }
+
+
+class MandatoryCoverageIndex:
+    """
+    mandatory item → 是否被测试点覆盖
+
+    构建一次（O(test_points)），每次查询：
+    - source_requirement 精确命中：集合查找 O(1)
+    - mandatory 测试点名称包含：在拼接后的名称串里查找（一次 C 级扫描）
+
+    批量查询用 check()：全部 item 建一个 KeywordMatcher，名称串只扫一遍
+    """
+
+    # 名称拼接分隔符，保证不会跨名称匹配
+    _SEP = "\x00"
+
+    def __init__(self, test_points):
+        self.sources = set()
+        mandatory_names = []
+
+        for tp in test_points or []:
+            source = tp.get("source_requirement")
+            if isinstance(source, str) or source is None:
+                self.sources.add(source)
+
+            if tp.get("origin") == "mandatory":
+                mandatory_names.append(tp.get("name") or "")
+
+        self._names = self._SEP.join(mandatory_names)
+
+    def _in_sources(self, item):
+        # sources 只含 str / None；不可哈希的 item 不可能命中
+        try:
+            return item in self.sources
+        except TypeError:
+            return False
+
+    def covers(self, item):
+        if self._in_sources(item):
+            return True
+        # 与原逐项扫描一致：空 item 不做名称匹配
+        return (
+            isinstance(item, str)
+            and bool(item)
+            and self._SEP not in item
+            and item in self._names
+        )
+
+    def check(self, items):
+        """
+        {item: 是否覆盖}，耗时与名称总长线性相关，与 item 数量无关
+
+        不可哈希的 item 无法作为结果键，直接跳过
+        """
+        found = build_keyword_matcher(
+            i for i in items if isinstance(i, str) and self._SEP not in i
+        ).find_all(self._names)
+
+        result = {}
+        for item in items:
+            if isinstance(item, str) and item:
+                result[item] = item in found or item in self.sources
+            else:
+                try:
+                    result[item] = self.covers(item)
+                except TypeError:
+                    continue
+        return result
+
+
+# ===============================
+# 📡 增量覆盖统计（生成过程中逐条更新）
+# ===============================
+
+class CoverageTracker:
+    """
+    随 run_streaming 逐条累计覆盖，口径与
+    calc_coverage_matrix / calc_focus_hit_cases / check_mandatory_coverage 一致
+
+    每条用例 O(1) 更新，snapshot() 只做计数汇总
+    """
+
+    def __init__(self, test_points, mandatory_items=None):
+        self.tp_ids = [tp.get("id") for tp in test_points or []]
+        self._tp_id_set = set(self.tp_ids)
+        self._tp_sources = {
+            tp.get("id"): tp.get("source_requirement")
+            for tp in test_points or []
+            if tp.get("origin") == "mandatory"
+        }
+
+        # 默认强制覆盖项 = mandatory 测试点的来源需求
+        if mandatory_items is None:
+            mandatory_items = sorted({s for s in self._tp_sources.values() if s})
+        self.mandatory_items = list(mandatory_items)
+        self.mandatory_result = check_mandatory_coverage(self.mandatory_items, test_points)
+
+        self._index = {}                # tp_id → 覆盖维度 bitmask
+        self._covered_cells = 0         # 仅统计已知测试点
+        self._covered_tps = 0
+        self._mandatory_hit = set()     # 已有用例命中的强制覆盖项
+
+        self.total_cases = 0
+        self.focus_cases = 0
+
+    def add(self, case):
+        self.total_cases += 1
+
+        coverage_item = case.get("coverage_item")
+        if case.get("origin") == "mandatory" or coverage_item:
+            self.focus_cases += 1
+
+        tp_id = case.get("test_point_id")
+        if coverage_item:
+            self._mandatory_hit.add(coverage_item)
+        if self._tp_sources.get(tp_id):
+            self._mandatory_hit.add(self._tp_sources[tp_id])
+
+        bit = COVERAGE_BITS.get(_case_coverage_type(case))
+        if bit:
+            mask = self._index.get(tp_id, 0)
+            if not mask & bit:
+                self._index[tp_id] = mask | bit
+                if tp_id in self._tp_id_set:
+                    self._covered_cells += 1
+                    self._covered_tps += not mask
+
+    def uncovered_cells(self, tp_ids=None):
+        """
+        [(tp_id, 覆盖维度)]：尚无用例的测试点 × 维度（可限定测试点范围）
+        """
+        return [
+            (tp_id, c)
+            for tp_id in dict.fromkeys(self.tp_ids if tp_ids is None else tp_ids)
+            for c, bit in COVERAGE_BITS.items()
+            if not self._index.get(tp_id, 0) & bit
+        ]
+
+    def meets_targets(self, min_coverage_ratio=1.0, require_mandatory=True):
+        """
+        覆盖目标：测试点 × 维度覆盖率达到阈值，且每个强制覆盖项都有用例命中
+        """
+        total_cells = len(self._tp_id_set) * len(COVERAGE)
+        if total_cells and self._covered_cells / total_cells < min_coverage_ratio:
+            return False
+        if require_mandatory and any(
+            i not in self._mandatory_hit for i in self.mandatory_items
+        ):
+            return False
+        return True
+
+    def snapshot(self):
+        total_cells = len(self._tp_id_set) * len(COVERAGE)
+        mandatory_missing = [i for i in self.mandatory_items if i not in self._mandatory_hit]
+
+        return {
+            "total_cases": self.total_cases,
+            "focus_cases": self.focus_cases,
+            "focus_ratio": (
+                round(self.focus_cases / self.total_cases, 3) if self.total_cases else 0.0
+            ),
+            "test_points_total": len(self._tp_id_set),
+            "test_points_covered": self._covered_tps,
+            "cells_total": total_cells,
+            "cells_covered": self._covered_cells,
+            "coverage_ratio": (
+                round(self._covered_cells / total_cells, 3) if total_cells else 0.0
+            ),
+            "mandatory_coverage": self.mandatory_result,
+            "mandatory_missing": mandatory_missing,
+            "overall_status": calc_overall_status(self.mandatory_result),
+        }
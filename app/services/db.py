@@ -1,89 +1,470 @@
-import pymysql
+# app/services/db.py
+"""
+会话持久化（可选组件）
+
+⚠️ 当前服务的请求链路不依赖本模块：workflow 状态由 app/workflow/store.py 管理，
+   main.py / router 都不 import 这里。保留给需要把会话 / 用例落到 MySQL 或
+   SQLite 的部署与脚本按需 import，后端由 SESSION_DB_BACKEND 选择，
+   首次调用时才建连接（pymysql 延迟导入）。
+"""
+
 import json
+import time
+import queue
+import sqlite3
+import threading
+import traceback
 from datetime import datetime
 from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.settings import (
+    SESSION_DB_BACKEND,
+    SESSION_DB_PATH,
+    MYSQL_HOST,
+    MYSQL_PORT,
+    MYSQL_USER,
+    MYSQL_PASSWORD,
+    MYSQL_DATABASE,
+)
+
+
+def _mysql_config() -> dict:
+    # ⚠️ pymysql 延迟导入：sqlite 后端（离线环境）不需要安装
+    import pymysql
+
+    return {
+        "host": MYSQL_HOST,
+        "port": MYSQL_PORT,
+        "user": MYSQL_USER,
+        "password": MYSQL_PASSWORD,
+        "database": MYSQL_DATABASE,
+        "charset": "utf8mb4",
+        "cursorclass": pymysql.cursors.DictCursor,
+        "autocommit": False,
+    }
+
+
+# 连接池
+DB_POOL_SIZE = 5
+DB_POOL_TIMEOUT = 10                 # 借连接最长等待（秒）
+DB_HEALTH_CHECK_INTERVAL = 30        # 空闲超过该时长的连接借出前先 ping
+
+# 批量写入
+SESSION_DATA_FLUSH_INTERVAL = 1.0
+SESSION_DATA_MAX_BATCH = 500
+
+
+# ===============================
+# 连接池
+# ===============================
+class ConnectionPool:
+    """
+    有界连接池：
+    - 最多 max_size 个连接（含借出中的），耗尽时等待 timeout 秒
+    - 空闲较久的连接借出前 ping，失效则丢弃重建
+    - 执行出错的连接直接关闭，不放回池中
+    """
+
+    def __init__(
+        self,
+        config: dict,
+        max_size: int = DB_POOL_SIZE,
+        timeout: float = DB_POOL_TIMEOUT,
+        health_check_interval: float = DB_HEALTH_CHECK_INTERVAL,
+    ):
+        self.config = config
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._slots = threading.BoundedSemaphore(max_size)
+        # LIFO：优先复用最近用过的连接，冷连接自然老化
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("数据库连接池已耗尽")
+
+        try:
+            while True:
+                try:
+                    conn, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    import pymysql
+                    return pymysql.connect(**self.config)
+
+                if time.monotonic() - last_used < self.health_check_interval:
+                    return conn
+                if self._is_healthy(conn):
+                    return conn
+                self._close_quietly(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken: bool = False):
+        try:
+            if broken:
+                self._close_quietly(conn)
+            else:
+                self._idle.put((conn, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close_quietly(conn)
+
+    @staticmethod
+    def _is_healthy(conn) -> bool:
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# ===============================
+# Session 持久化后端
+# ===============================
+# (session_id, data_type, content)
+SessionDataRow = Tuple[str, str, Any]
+
+
+class SessionBackend:
+    """
+    会话持久化接口（mysql / sqlite）
+    """
+
+    name = "base"
+
+    def create_session(self, session_id, file_name, file_path):
+        raise NotImplementedError
+
+    def update_session_status(self, session_id, status):
+        raise NotImplementedError
+
+    def get_session(self, session_id) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def insert_session_data_many(self, rows: Sequence[SessionDataRow]) -> int:
+        raise NotImplementedError
+
+    def get_session_data(self, session_id, data_type):
+        raise NotImplementedError
+
+    def get_conn(self):
+        """
+        原始连接（上下文管理器）：正常退出提交，异常回滚
+        """
+        raise NotImplementedError
+
+    def insert_session_data(self, session_id, data_type, content):
+        self.insert_session_data_many([(session_id, data_type, content)])
+
+    def close(self):
+        pass
+
+
+def _dump_rows(rows: Sequence[SessionDataRow]) -> List[Tuple[str, str, str]]:
+    return [
+        (session_id, data_type, json.dumps(content, ensure_ascii=False))
+        for session_id, data_type, content in rows
+    ]
+
+
+# -------------------------------
+# MySQL（连接池）
+# -------------------------------
+class MysqlSessionBackend(SessionBackend):
+    name = "mysql"
+
+    # ⚠️ VALUES 里只能是占位符，pymysql 才会把 executemany 改写为多行 INSERT
+    INSERT_SESSION_DATA_SQL = (
+        "INSERT INTO test_session_data (session_id, type, content, created_at) "
+        "VALUES (%s, %s, %s, %s)"
+    )
+
+    def __init__(self, config: Optional[dict] = None):
+        self.pool = ConnectionPool(config or _mysql_config())
+
+    @contextmanager
+    def get_conn(self):
+        conn = self.pool.acquire()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                broken = True
+            if not conn.open:
+                broken = True
+            raise
+        finally:
+            self.pool.release(conn, broken=broken)
+
+    def create_session(self, session_id, file_name, file_path):
+        sql = """
+        INSERT INTO test_session
+        (id, file_name, file_path, status, created_at, updated_at)
+        VALUES (%s, %s, %s, %s, NOW(), NOW())
+        """
+        with self.get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (session_id, file_name, file_path, "UPLOADED"))
+
+    def update_session_status(self, session_id, status):
+        sql = """
+        UPDATE test_session
+        SET status=%s, updated_at=NOW()
+        WHERE id=%s
+        """
+        with self.get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (status, session_id))
+
+    def get_session(self, session_id):
+        sql = """
+        SELECT *
+        FROM test_session
+        WHERE id=%s
+        """
+        with self.get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (session_id,))
+                return cur.fetchone()
+
+    def insert_session_data_many(self, rows):
+        """
+        批量写入（单连接 · 单事务 · executemany）
+        """
+        params = _dump_rows(rows)
+        if not params:
+            return 0
+
+        now = datetime.now()
+        with self.get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.executemany(
+                    self.INSERT_SESSION_DATA_SQL,
+                    [p + (now,) for p in params],
+                )
+        return len(params)
 
-DB_CONFIG = {
-    "host": "127.0.0.1",
-    "port": 3306,
-    "user": "root",
-    "password": "Lst201314",
-    "database": "ai-test-agent",
-    "charset": "utf8mb4",
-    "cursorclass": pymysql.cursors.DictCursor,
-    "autocommit": False,
-}
+    def get_session_data(self, session_id, data_type):
+        sql = """
+        SELECT content
+        FROM test_session_data
+        WHERE session_id=%s AND type=%s
+        ORDER BY created_at DESC
+        LIMIT 1
+        """
+        with self.get_conn() as conn:
+            with conn.cursor() as cur:
+                cur.execute(sql, (session_id, data_type))
+                row = cur.fetchone()
+                if not row:
+                    return None
+                return json.loads(row["content"])
+
+    def close(self):
+        self.pool.close_all()
+
+
+# -------------------------------
+# SQLite（嵌入式 · WAL · 无网络往返）
+# -------------------------------
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_session (
+    id TEXT PRIMARY KEY,
+    file_name TEXT,
+    file_path TEXT,
+    status TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS test_session_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL CHECK (json_valid(content)),
+    created_at TEXT NOT NULL
+);
+-- 最新一条 = 同 (session_id, type) 下 id 最大
+CREATE INDEX IF NOT EXISTS idx_session_data_lookup
+    ON test_session_data (session_id, type, id);
+"""
+
+
+class SqliteSessionBackend(SessionBackend):
+    """
+    - 每线程一个连接（sqlite3 连接不可跨线程共享）
+    - 参数化语句由 sqlite3 语句缓存复用（cached_statements）
+    - content 列用 JSON1 json_valid 约束
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._conn().executescript(_SQLITE_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=30,
+                isolation_level=None,
+                cached_statements=256,
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def get_conn(self):
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(sep=" ", timespec="seconds")
+
+    def create_session(self, session_id, file_name, file_path):
+        now = self._now()
+        self._conn().execute(
+            "INSERT INTO test_session "
+            "(id, file_name, file_path, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, file_name, file_path, "UPLOADED", now, now),
+        )
+
+    def update_session_status(self, session_id, status):
+        self._conn().execute(
+            "UPDATE test_session SET status=?, updated_at=? WHERE id=?",
+            (status, self._now(), session_id),
+        )
+
+    def get_session(self, session_id):
+        row = self._conn().execute(
+            "SELECT * FROM test_session WHERE id=?", (session_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def insert_session_data_many(self, rows):
+        params = _dump_rows(rows)
+        if not params:
+            return 0
+
+        now = self._now()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO test_session_data "
+                "(session_id, type, content, created_at) VALUES (?, ?, ?, ?)",
+                [p + (now,) for p in params],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(params)
+
+    def get_session_data(self, session_id, data_type):
+        row = self._conn().execute(
+            "SELECT content FROM test_session_data "
+            "WHERE session_id=? AND type=? ORDER BY id DESC LIMIT 1",
+            (session_id, data_type),
+        ).fetchone()
+        if not row:
+            return None
+        return json.loads(row["content"])
+
+
+def build_session_backend(backend: str, *, db_path: Optional[str] = None) -> SessionBackend:
+    if backend == "mysql":
+        return MysqlSessionBackend()
+    if backend == "sqlite":
+        return SqliteSessionBackend(db_path)
+    raise ValueError(f"Unknown session backend: {backend}")
+
+
+_BACKEND: Optional[SessionBackend] = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def get_backend() -> SessionBackend:
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            _BACKEND = build_session_backend(SESSION_DB_BACKEND, db_path=SESSION_DB_PATH)
+        return _BACKEND
 
 
 @contextmanager
 def get_conn():
-    conn = pymysql.connect(**DB_CONFIG)
-    try:
+    """
+    当前后端的原始连接：正常退出提交，异常回滚
+    （mysql：连接池中的 pymysql DictCursor 连接；sqlite：本线程的 sqlite3 连接）
+    """
+    with get_backend().get_conn() as conn:
         yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
 # ===============================
 # Session 表
 # ===============================
 def create_session(session_id, file_name, file_path):
-    sql = """
-    INSERT INTO test_session
-    (id, file_name, file_path, status, created_at, updated_at)
-    VALUES (%s, %s, %s, %s, NOW(), NOW())
-    """
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (session_id, file_name, file_path, "UPLOADED"))
+    get_backend().create_session(session_id, file_name, file_path)
 
 
 def update_session_status(session_id, status):
-    sql = """
-    UPDATE test_session
-    SET status=%s, updated_at=NOW()
-    WHERE id=%s
-    """
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (status, session_id))
+    get_backend().update_session_status(session_id, status)
 
 
 def get_session(session_id):
-    sql = """
-    SELECT *
-    FROM test_session
-    WHERE id=%s
-    """
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (session_id,))
-            return cur.fetchone()
+    return get_backend().get_session(session_id)
 
 
 # ===============================
 # Session Data 表
 # ===============================
 def insert_session_data(session_id, data_type, content):
-    sql = """
-    INSERT INTO test_session_data
-    (session_id, type, content, created_at)
-    VALUES (%s, %s, %s, NOW())
+    get_backend().insert_session_data(session_id, data_type, content)
+
+
+def insert_session_data_many(rows):
     """
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                sql,
-                (
-                    session_id,
-                    data_type,
-                    json.dumps(content, ensure_ascii=False),
-                ),
-            )
+    批量写入（单事务）
+
+    rows: [(session_id, data_type, content), ...]
+    """
+    return get_backend().insert_session_data_many(rows)
 
 
 # ⭐ 兼容 main.py / orchestrator
@@ -92,17 +473,89 @@ def save_session_data(session_id, data_type, content):
 
 
 def get_session_data(session_id, data_type):
-    sql = """
-    SELECT content
-    FROM test_session_data
-    WHERE session_id=%s AND type=%s
-    ORDER BY created_at DESC
-    LIMIT 1
+    return get_backend().get_session_data(session_id, data_type)
+
+
+# ===============================
+# 缓冲写入（逐条用例落库场景）
+# ===============================
+class SessionDataWriter:
+    """
+    write() 只入缓冲；后台线程每 flush_interval 秒
+    或攒满 max_batch 条时，用 insert_session_data_many 一次写入
     """
-    with get_conn() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, (session_id, data_type))
-            row = cur.fetchone()
-            if not row:
-                return None
-            return json.loads(row["content"])
+
+    def __init__(
+        self,
+        flush_interval: float = SESSION_DATA_FLUSH_INTERVAL,
+        max_batch: int = SESSION_DATA_MAX_BATCH,
+    ):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._loop,
+            name="session-data-writer",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def write(self, session_id, data_type, content):
+        with self._lock:
+            self._buffer.append((session_id, data_type, content))
+            full = len(self._buffer) >= self.max_batch
+        if full:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        # 串行 flush，保证批次按写入顺序落库
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            written = 0
+            # 每批最多 max_batch 条，避免单条 SQL 包过大
+            while written < len(rows):
+                batch = rows[written:written + self.max_batch]
+                try:
+                    insert_session_data_many(batch)
+                except Exception:
+                    traceback.print_exc()
+                    # 写失败放回缓冲头部，下个周期重试
+                    with self._lock:
+                        self._buffer[:0] = rows[written:]
+                    break
+                written += len(batch)
+            return written
+
+    @property
+    def closed(self) -> bool:
+        return self._stop.is_set()
+
+    def close(self):
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+
+_WRITER = None
+_WRITER_LOCK = threading.Lock()
+
+
+def get_session_data_writer() -> SessionDataWriter:
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None or _WRITER.closed:
+            _WRITER = SessionDataWriter()
+        return _WRITER
+
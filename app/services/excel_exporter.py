@@ -5,9 +5,8 @@
 from datetime import datetime
 import re
 import os
+import uuid
 from typing import List, Dict, Any
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
 
 from app.settings import TMP_DIR
 
@@ -176,62 +175,127 @@ def normalize_case(raw: Dict[str, Any]) -> Dict[str, Any]:
 
 
 # ===============================
-# ⭐ 原始导出逻辑（增强重点可见性）
+# ⭐ 流式导出（write-only · 边生成边写入 · 内存恒定）
 # ===============================
+COLUMN_WIDTHS = {"A": 40, "B": 30, "D": 35, "E": 70, "F": 60, "H": 40}
+
+# 需要自动换行的列（步骤描述 / 预期结果 / 备注）
+WRAP_COLUMNS = {4, 5, 7}
+
+WRAP_STYLE_NAME = "case_wrap"
+
+
+def case_to_row(c: Dict[str, Any]) -> list:
+    return [
+        _cell(c["case_name"]),
+        _cell(c["module"]),
+        c["tags"],
+        _cell(c["precondition"]),
+        _cell(c["steps"]),
+        _cell(c["expected"]),
+        "STEP",
+        _cell(c["remark"]),
+        "未开始",
+        "",
+        c["priority"],
+        c["automatable"],
+        "否"
+    ]
+
+
+def part_path(save_path: str) -> str:
+    """
+    临时文件路径：并发导出同一文件时各写各的临时文件，rename 覆盖保证原子
+    """
+    return f"{save_path}.{uuid.uuid4().hex}.part"
+
+
+class StreamingExcelWriter:
+    """
+    openpyxl write-only 模式：行直接写入临时 XML，不在内存保留 Cell 对象
+
+    - append(raw_case)：run_streaming 每产出一条即写入
+    - close()：落盘（先写 .part 再 rename，文件出现即完整）
+    - 换行样式注册为共享 NamedStyle，每个单元格只引用样式名
+    """
+
+    def __init__(self, save_path: str):
+        # ⚠️ openpyxl 延迟导入：API 进程启动时不加载（导出在导出进程中执行）
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Alignment, NamedStyle
+
+        self._cell_cls = WriteOnlyCell
+        self.save_path = save_path
+        self.count = 0
+
+        self._wb = Workbook(write_only=True)
+        self._wb.add_named_style(
+            NamedStyle(
+                name=WRAP_STYLE_NAME,
+                alignment=Alignment(wrap_text=True, vertical="top"),
+            )
+        )
+
+        self._ws = self._wb.create_sheet("测试用例")
+        self._ws.freeze_panes = "A2"
+        # ⚠️ write-only 模式下列宽必须在写入第一行之前设置
+        for col, width in COLUMN_WIDTHS.items():
+            self._ws.column_dimensions[col].width = width
+
+        self._ws.append(HEADERS)
+
+    def append(self, raw_case: Dict[str, Any]):
+        # 兼容 {"module", "test_cases": [...]} 分组结构
+        for raw in flatten_cases([raw_case]):
+            self._append_row(case_to_row(normalize_case(raw)))
+
+    def extend(self, raw_cases: list):
+        for raw in raw_cases:
+            self.append(raw)
+
+    def _append_row(self, values: list):
+        row = []
+        for idx, value in enumerate(values):
+            if idx in WRAP_COLUMNS:
+                cell = self._cell_cls(self._ws, value=value)
+                cell.style = WRAP_STYLE_NAME
+                row.append(cell)
+            else:
+                row.append(value)
+
+        self._ws.append(row)
+        self.count += 1
+
+    def close(self) -> str:
+        tmp_path = part_path(self.save_path)
+        try:
+            self._wb.save(tmp_path)
+            os.replace(tmp_path, self.save_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return self.save_path
+
+
 def export_excel(raw_cases: list, save_path: str) -> str:
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "测试用例"
-
-    ws.append(HEADERS)
-    ws.freeze_panes = "A2"
-
-    wrap = Alignment(wrap_text=True, vertical="top")
-
-    flat_cases = flatten_cases(raw_cases)
-
-    for raw in flat_cases:
-        c = normalize_case(raw)
-
-        ws.append([
-            _cell(c["case_name"]),
-            _cell(c["module"]),
-            c["tags"],
-            _cell(c["precondition"]),
-            _cell(c["steps"]),
-            _cell(c["expected"]),
-            "STEP",
-            _cell(c["remark"]),
-            "未开始",
-            "",
-            c["priority"],
-            c["automatable"],
-            "否"
-        ])
-
-        row = ws.max_row
-        ws[f"E{row}"].alignment = wrap
-        ws[f"F{row}"].alignment = wrap
-        ws[f"H{row}"].alignment = wrap
-
-    ws.column_dimensions["A"].width = 40
-    ws.column_dimensions["B"].width = 30
-    ws.column_dimensions["D"].width = 35
-    ws.column_dimensions["E"].width = 70
-    ws.column_dimensions["F"].width = 60
-    ws.column_dimensions["H"].width = 40
-
-    wb.save(save_path)
-    return save_path
+    writer = StreamingExcelWriter(save_path)
+    writer.extend(raw_cases)
+    return writer.close()
 
 
 # =====================================================
 # ✅ Workflow / Router 唯一依赖入口（保持不动）
 # =====================================================
+def excel_path_for(workflow_id: str) -> str:
+    os.makedirs(TMP_DIR, exist_ok=True)
+    return os.path.join(TMP_DIR, f"{workflow_id}.xlsx")
+
+
 def export_cases_to_excel(
     cases: List[Dict[str, Any]],
     workflow_id: str,
 ) -> str:
-    os.makedirs(TMP_DIR, exist_ok=True)
-    save_path = os.path.join(TMP_DIR, f"{workflow_id}.xlsx")
-    return export_excel(cases, save_path)
+    return export_excel(cases, excel_path_for(workflow_id))
+
@@ -0,0 +1,260 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/services/export_cache.py
+
+"""
+导出结果缓存（内容寻址）+ 条件下载
+
+- 用例集哈希 = sha256(逐条 normalize_case 后的规范 JSON)
+- 导出文件按 {hash}.{ext} 存放，相同用例集直接复用，不重写文件
+- 下载：强 ETag（导出文件字节的 sha256）、If-None-Match → 304、Range → 206
+  ⚠️ 不能用用例集哈希做强 ETag：xlsx 带生成时间，缓存被淘汰后重新生成字节会变
+- 缓存目录按 最久未使用 / 总大小 淘汰（evict_export_cache，同一用例集的文件整组淘汰）
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from app.settings import TMP_DIR, EXPORT_CACHE_MAX_BYTES, EXPORT_CACHE_TTL
+from app.services.excel_exporter import flatten_cases, normalize_case
+
+
+EXPORT_CACHE_DIR = os.path.join(TMP_DIR, "exports")
+
+FILE_HASH_CHUNK = 1024 * 1024
+
+
+# =====================================================
+# 用例集哈希（增量）
+# =====================================================
+class CaseSetHasher:
+    """
+    与导出同口径：分组结构先展开，再按 normalize_case 结果计算
+    """
+
+    def __init__(self):
+        self._h = hashlib.sha256()
+        self.count = 0
+
+    def update(self, raw_case: Dict[str, Any]):
+        for raw in flatten_cases([raw_case]):
+            self.count += 1
+            line = json.dumps(normalize_case(raw), ensure_ascii=False, sort_keys=True)
+            self._h.update(line.encode("utf-8"))
+            self._h.update(b"\n")
+
+    def hexdigest(self) -> str:
+        return self._h.hexdigest()
+
+
+def cached_export_path(content_hash: str, extension: str) -> str:
+    os.makedirs(EXPORT_CACHE_DIR, exist_ok=True)
+    return os.path.join(EXPORT_CACHE_DIR, f"{content_hash}{extension}")
+
+
+# =====================================================
+# 缓存淘汰（最久未使用优先）
+# =====================================================
+# 命中时刷新 mtime 作为 LRU 依据；限频避免 file_etag 的 (path, size, mtime) 记忆频繁失效
+TOUCH_INTERVAL = 3600
+# 最近刚用过的文件不淘汰（可能正在被下载）
+EVICT_GRACE_SECONDS = 300
+# 残留的临时文件（进程崩溃）超过该时间删除
+STALE_PART_SECONDS = 3600
+# 两次淘汰扫描的最小间隔
+EVICT_SCAN_INTERVAL = 60
+
+_EVICT_LOCK = threading.Lock()
+_last_evict_scan = 0.0
+
+
+def touch_cached_export(path: str):
+    try:
+        if time.time() - os.stat(path).st_mtime > TOUCH_INTERVAL:
+            os.utime(path)
+    except OSError:
+        pass
+
+
+def _cache_group(name: str) -> str:
+    # {hash}.cases.jsonl / {hash}.xlsx / {hash}.csv ... → hash
+    return name.split(".", 1)[0]
+
+
+def evict_export_cache(
+    max_bytes: int = EXPORT_CACHE_MAX_BYTES,
+    max_age: float = EXPORT_CACHE_TTL,
+) -> Dict[str, int]:
+    """
+    按用例集整组淘汰（spill 与各格式导出同生同灭）：
+    只要还有任一导出文件，spill 就在，其余格式随时可以重新转换
+
+    - 组内最近一次使用超过 max_age 的整组删除
+    - 总大小超过 max_bytes 时按最久未使用依次删除整组
+    - 返回 {"removed": 文件数, "freed_bytes": 字节数}
+    """
+    removed = freed = 0
+    if not os.path.isdir(EXPORT_CACHE_DIR):
+        return {"removed": 0, "freed_bytes": 0}
+
+    now = time.time()
+    # group → [最近使用时间, 总大小, [(path, size), ...]]
+    groups: Dict[str, list] = {}
+    stale_parts = []
+    for entry in os.scandir(EXPORT_CACHE_DIR):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if not entry.is_file():
+            continue
+
+        if entry.name.endswith(".part"):
+            # 正在写入的临时文件不动，只清理崩溃残留
+            if now - st.st_mtime > STALE_PART_SECONDS:
+                stale_parts.append((entry.path, st.st_size))
+            continue
+
+        group = groups.setdefault(_cache_group(entry.name), [0.0, 0, []])
+        group[0] = max(group[0], st.st_mtime)
+        group[1] += st.st_size
+        group[2].append((entry.path, st.st_size))
+
+    def remove(files) -> int:
+        nonlocal removed, freed
+        freed_now = 0
+        for path, size in files:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            forget_file_etag(path)
+            removed += 1
+            freed_now += size
+        freed += freed_now
+        return freed_now
+
+    remove(stale_parts)
+
+    total = sum(size for _, size, _ in groups.values())
+    for mtime, size, files in sorted(groups.values(), key=lambda g: g[0]):
+        expired = bool(max_age) and now - mtime > max_age
+        over_budget = bool(max_bytes) and total > max_bytes
+        if not expired and not over_budget:
+            continue
+        if not expired and now - mtime < EVICT_GRACE_SECONDS:
+            continue
+        total -= remove(files)
+
+    return {"removed": removed, "freed_bytes": freed}
+
+
+def maybe_evict_export_cache():
+    """
+    写入新缓存后调用；EVICT_SCAN_INTERVAL 内最多扫描一次
+    """
+    global _last_evict_scan
+    now = time.monotonic()
+    if now - _last_evict_scan < EVICT_SCAN_INTERVAL:
+        return
+    if not _EVICT_LOCK.acquire(blocking=False):
+        return
+    try:
+        _last_evict_scan = now
+        evict_export_cache()
+    except Exception as e:
+        print("⚠️ export cache eviction failed:", e)
+    finally:
+        _EVICT_LOCK.release()
+
+
+# =====================================================
+# 任意文件 ETag（legacy /download/{task_id}）
+# =====================================================
+# path → (size, mtime, etag)，按最近使用保留 _FILE_ETAGS_MAX 个文件
+_FILE_ETAGS: "OrderedDict[str, Tuple[int, float, str]]" = OrderedDict()
+_FILE_ETAGS_MAX = 1024
+_FILE_ETAGS_LOCK = threading.Lock()
+
+
+def file_etag(path: str) -> str:
+    """
+    文件内容 sha256 作为强 ETag，按 (path, size, mtime) 记忆，避免重复读盘
+    """
+    st = os.stat(path)
+
+    with _FILE_ETAGS_LOCK:
+        cached = _FILE_ETAGS.get(path)
+        if cached and cached[:2] == (st.st_size, st.st_mtime):
+            _FILE_ETAGS.move_to_end(path)
+            return cached[2]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(FILE_HASH_CHUNK), b""):
+            h.update(chunk)
+    etag = f'"{h.hexdigest()}"'
+
+    with _FILE_ETAGS_LOCK:
+        # 同一路径只保留最新版本
+        _FILE_ETAGS[path] = (st.st_size, st.st_mtime, etag)
+        _FILE_ETAGS.move_to_end(path)
+        while len(_FILE_ETAGS) > _FILE_ETAGS_MAX:
+            _FILE_ETAGS.popitem(last=False)
+    return etag
+
+
+def forget_file_etag(path: str):
+    with _FILE_ETAGS_LOCK:
+        _FILE_ETAGS.pop(path, None)
+
+
+# =====================================================
+# 条件下载
+# =====================================================
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    # If-None-Match 使用弱比较
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def conditional_file_response(
+    request: Request,
+    path: str,
+    *,
+    etag: Optional[str] = None,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+) -> Response:
+    """
+    - If-None-Match 命中 → 304（不读文件）
+    - Range / If-Range → 206（FileResponse 内置，使用这里给出的 ETag）
+    """
+    etag = etag or file_etag(path)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "no-cache",      # 每次都需校验，但可复用本地副本
+        "Accept-Ranges": "bytes",
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path,
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+    )
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# app/services/ingest.py
+
+"""
+上传文件接收（不阻塞事件循环）
+
+- 分块读取上传内容，磁盘写入放到线程池
+- 边写边算 sha256
+- 超过大小上限立即中止并删除半成品
+- UploadSizeLimitMiddleware：请求体在进入 multipart 解析前就按字节数拦截
+  （Content-Length 超限直接 413；chunked 上传边收边数，超限即中止）
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Any
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# multipart 边界 / 表单字段的额外字节（请求体上限 = 文件上限 + 该值）
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """
+    上传文件超过 MAX_UPLOAD_BYTES
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"上传文件超过大小上限（{max_bytes} 字节）")
+        self.max_bytes = max_bytes
+
+
+async def save_upload_streaming(
+    upload: UploadFile,
+    dest_path: str,
+    max_bytes: int,
+) -> Dict[str, Any]:
+    """
+    分块保存上传文件
+
+    返回：
+        {
+            "path": str,
+            "size": int,
+            "sha256": str
+        }
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    f = await run_in_threadpool(open, dest_path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+
+            digest.update(chunk)
+            await run_in_threadpool(f.write, chunk)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+    await run_in_threadpool(f.close)
+
+    return {
+        "path": dest_path,
+        "size": size,
+        "sha256": digest.hexdigest(),
+    }
+
+
+# =====================================================
+# 请求体大小限制（ASGI 中间件）
+# =====================================================
+class _BodyTooLarge(HTTPException):
+    """
+    在 receive 中抛出：FastAPI 解析请求体时只放行 HTTPException，
+    其余异常会被改写成 400，这里需要保留 413
+    """
+
+    def __init__(self, max_bytes: int):
+        super().__init__(413, str(UploadTooLargeError(max_bytes)))
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Starlette 会先把 multipart 整体读完（落到临时文件）才进入路由，
+    save_upload_streaming 的上限检查此时已太晚；这里在读取请求体时计数：
+
+    - Content-Length 超过 max_body_bytes：不读请求体，直接 413
+    - 未声明长度（chunked）：累计字节超限时中止读取并返回 413
+    """
+
+    def __init__(self, app, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_body_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers") or []:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > self.max_body_bytes:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    raise _BodyTooLarge(self.max_body_bytes)
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except _BodyTooLarge:
+            if not started:
+                await self._reject(send)
+
+    async def _reject(self, send):
+        body = json.dumps(
+            {"detail": str(UploadTooLargeError(self.max_body_bytes))},
+            ensure_ascii=False,
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+# app/services/job_queue.py
+
+"""
+本地任务队列（SQLite 落盘 · 无外部 broker）
+
+- API 进程 submit，worker 进程 claim / finish
+- claim 使用 BEGIN IMMEDIATE 抢占，多进程安全
+- running 任务带租约：worker 定期 heartbeat，租约过期（worker 崩溃 / 被杀）才放回队列，
+  多个 API 进程各自启动时不会抢走彼此正在执行的任务
+- 结果由 API 进程回写 workflow（claim_apply 条件更新保证只写一次）
+- 每种任务类型的并发上限在 claim 时按库中 running 数判断，
+  多个 API 进程（各自一组 worker）共享同一个库时上限仍是全局的
+"""
+
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    ERROR = "error"
+
+
+JOB_TYPES = ("parse", "analyze", "generate")
+
+
+class ActiveJobError(RuntimeError):
+    """
+    exclusive 提交时，同一 workflow 已有同类型任务在排队 / 执行
+    """
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    workflow_id TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    applied INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (type, status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_apply ON jobs (applied, status);
+"""
+
+
+class JobQueue:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+            # 旧库补列
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(jobs)")}
+            if "heartbeat_at" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    # =====================================================
+    # API 进程侧
+    # =====================================================
+    def submit(
+        self,
+        job_type: str,
+        payload: Dict[str, Any],
+        workflow_id: Optional[str] = None,
+        exclusive: bool = False,
+    ) -> str:
+        """
+        exclusive=True：同一 workflow 已有同类型的 queued / running 任务时抛 ActiveJobError
+        （检查与插入在同一个 BEGIN IMMEDIATE 事务内）
+        """
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unsupported job type: {job_type}")
+
+        job_id = str(uuid.uuid4())
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if exclusive and self._has_active(conn, job_type, workflow_id):
+                raise ActiveJobError(f"{job_type} job already active for {workflow_id}")
+            conn.execute(
+                "INSERT INTO jobs (id, type, workflow_id, payload, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    job_type,
+                    workflow_id,
+                    json.dumps(payload, ensure_ascii=False),
+                    JobStatus.QUEUED,
+                    time.time(),
+                ),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return job_id
+
+    def has_active(self, job_type: str, workflow_id: str) -> bool:
+        with closing(self._connect()) as conn:
+            return self._has_active(conn, job_type, workflow_id)
+
+    @staticmethod
+    def _has_active(conn: sqlite3.Connection, job_type: str, workflow_id: Optional[str]) -> bool:
+        return conn.execute(
+            "SELECT 1 FROM jobs WHERE type=? AND workflow_id=? AND status IN (?, ?) LIMIT 1",
+            (job_type, workflow_id, JobStatus.QUEUED, JobStatus.RUNNING),
+        ).fetchone() is not None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE id=?", (job_id,)
+            ).fetchone()
+        return _row_to_job(row) if row else None
+
+    def fetch_unapplied(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE applied=0 AND status IN (?, ?) "
+                "ORDER BY finished_at LIMIT ?",
+                (JobStatus.DONE, JobStatus.ERROR, limit),
+            ).fetchall()
+        return [_row_to_job(r) for r in rows]
+
+    def claim_apply(self, job_id: str) -> bool:
+        """
+        抢占结果回写权：只有把 applied 从 0 改成 1 的调用方返回 True
+        （多个 API 进程同时轮询时同一结果只回写一次）
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET applied=1 WHERE id=? AND applied=0",
+                (job_id,),
+            )
+            return cur.rowcount == 1
+
+    def requeue_expired(self, lease_seconds: float) -> int:
+        """
+        把租约过期（超过 lease_seconds 没有 heartbeat）的 running 任务放回队列
+        """
+        deadline = time.time() - lease_seconds
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status=?, worker=NULL, started_at=NULL, heartbeat_at=NULL "
+                "WHERE status=? AND COALESCE(heartbeat_at, started_at, 0) < ?",
+                (JobStatus.QUEUED, JobStatus.RUNNING, deadline),
+            )
+            return cur.rowcount
+
+    # =====================================================
+    # worker 进程侧
+    # =====================================================
+    def claim(
+        self,
+        job_type: str,
+        worker: str,
+        max_running: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        max_running：该类型已有这么多 running 任务（所有进程合计）时不再领取
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if max_running is not None:
+                running = conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE type=? AND status=?",
+                    (job_type, JobStatus.RUNNING),
+                ).fetchone()[0]
+                if running >= max_running:
+                    conn.execute("COMMIT")
+                    return None
+
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE type=? AND status=? "
+                "ORDER BY created_at LIMIT 1",
+                (job_type, JobStatus.QUEUED),
+            ).fetchone()
+
+            if not row:
+                conn.execute("COMMIT")
+                return None
+
+            started_at = time.time()
+            conn.execute(
+                "UPDATE jobs SET status=?, worker=?, started_at=?, heartbeat_at=? "
+                "WHERE id=?",
+                (JobStatus.RUNNING, worker, started_at, started_at, row["id"]),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        job = _row_to_job(row)
+        job.update(
+            status=JobStatus.RUNNING,
+            worker=worker,
+            started_at=started_at,
+            heartbeat_at=started_at,
+        )
+        return job
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """
+        续租；返回 False 表示任务已不属于该 worker（租约过期后被重新排队）
+        """
+        with closing(self._connect()) as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET heartbeat_at=? WHERE id=? AND status=? AND worker=?",
+                (time.time(), job_id, JobStatus.RUNNING, worker),
+            )
+            return cur.rowcount == 1
+
+    def finish(self, job_id: str, result: Dict[str, Any], worker: Optional[str] = None):
+        self._complete(
+            job_id,
+            worker,
+            "status=?, result=?, finished_at=?",
+            (JobStatus.DONE, json.dumps(result, ensure_ascii=False), time.time()),
+        )
+
+    def fail(self, job_id: str, error: str, worker: Optional[str] = None):
+        self._complete(
+            job_id,
+            worker,
+            "status=?, error=?, finished_at=?",
+            (JobStatus.ERROR, error, time.time()),
+        )
+
+    def _complete(
+        self,
+        job_id: str,
+        worker: Optional[str],
+        assignments: str,
+        params: tuple,
+    ):
+        # 传入 worker 时只有仍持有租约的 worker 能写结果（过期后被别人重跑的不覆盖）
+        sql = f"UPDATE jobs SET {assignments} WHERE id=?"
+        args = params + (job_id,)
+        if worker is not None:
+            sql += " AND status=? AND worker=?"
+            args += (JobStatus.RUNNING, worker)
+        with closing(self._connect()) as conn:
+            conn.execute(sql, args)
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["applied"] = bool(job["applied"])
+    return job
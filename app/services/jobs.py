@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+# app/services/jobs.py
+
+"""
+后台任务执行（worker 进程池）
+
+- 每种任务类型 N 个 worker 进程；N 同时是该类型的全局并发上限
+  （claim 时按队列库中的 running 数判断，多个 API 进程共享一个库也不会超）
+- worker 进程退出（崩溃 / OOM 被杀）后由监控线程回收并重启，连续快速退出时退避
+- handler 只做纯计算并返回结果，不直接写 workflow
+- API 进程内的 JobResultApplier 负责把结果回写 workflow
+- 执行中的任务按 JOB_LEASE_SECONDS 续租，租约过期的任务由 applier 放回队列
+"""
+
+import os
+import threading
+import time
+import traceback
+import multiprocessing
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.services.job_queue import JobQueue, JobStatus, JOB_TYPES
+from app.settings import JOB_LEASE_SECONDS
+
+
+IDLE_POLL_SECONDS = 0.5
+
+# worker 监控：检查间隔；存活不足 WORKER_STABLE_SECONDS 即退出视为快速失败，重启间隔指数退避
+WORKER_MONITOR_INTERVAL = 1.0
+WORKER_STABLE_SECONDS = 30.0
+WORKER_RESTART_BACKOFF_MAX = 30.0
+
+
+# =====================================================
+# Handler（运行在 worker 进程中）
+# =====================================================
+def _handle_parse(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.services.pdf_parser import parse_pdf
+
+    pdf_data = parse_pdf(payload["pdf_path"])
+    raw_text = (
+        (pdf_data.get("confirmed_text") or "")
+        + "\n"
+        + (pdf_data.get("ocr_text") or "")
+    ).strip()
+
+    if not raw_text:
+        raise RuntimeError("PDF 解析失败")
+
+    return {
+        "pdf_text": raw_text,
+        "total_pages": len(pdf_data.get("pages") or []),
+    }
+
+
+def _handle_analyze(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.workflow.analyze import run_analysis
+
+    analysis_result, test_points = run_analysis(payload["raw_requirements"])
+    return {
+        "analysis_result": analysis_result,
+        "test_points": test_points,
+    }
+
+
+def _handle_generate(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from app.agents.orchestrator import Orchestrator
+    from app.services.case_exporters import CaseOutputs, ensure_cached_export
+    from app.services.coverage import CoverageTracker
+    from app.workflow.analyze import run_analysis
+
+    result: Dict[str, Any] = {}
+
+    test_points = payload.get("test_points")
+    analysis_result = payload.get("analysis_result")
+
+    # 没有测试点则补生成（与 SSE 生成逻辑一致）
+    if not test_points:
+        analysis_result, test_points = run_analysis(payload["pdf_text"])
+        result.update(analysis_result=analysis_result, test_points=test_points)
+
+    writer = CaseOutputs()
+    tracker = CoverageTracker(test_points)
+    try:
+        for case in Orchestrator().run_streaming(
+            raw_requirements=payload["pdf_text"],
+            test_points=test_points,
+            confirmed_items=[],
+            requirement_hint=payload.get("requirement"),
+            analysis_result=analysis_result,
+            focus_requirements=payload.get("focus_requirements"),
+        ):
+            writer.append(case)
+            tracker.add(case)
+    except Exception:
+        writer.abort()
+        raise
+
+    # 已在 worker 进程中，直接导出（daemon 进程不能再开子进程）
+    content_hash = writer.close()
+    excel_path = ensure_cached_export(content_hash, "xlsx")
+    if not excel_path:
+        raise RuntimeError("Excel 导出失败：用例缓存已被清理")
+    result.update(
+        excel_path=excel_path,
+        total_cases=writer.count,
+        export_hash=content_hash,
+        focus_hit_cases=tracker.focus_cases,
+    )
+    return result
+
+
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "parse": _handle_parse,
+    "analyze": _handle_analyze,
+    "generate": _handle_generate,
+}
+
+
+def _heartbeat_loop(
+    queue: JobQueue,
+    job_id: str,
+    worker: str,
+    done: threading.Event,
+    interval: float,
+):
+    while not done.wait(interval):
+        try:
+            if not queue.heartbeat(job_id, worker):
+                return
+        except Exception:
+            traceback.print_exc()
+
+
+def _worker_main(
+    db_path: str,
+    job_type: str,
+    stop_event,
+    lease_seconds: float = JOB_LEASE_SECONDS,
+    max_running: Optional[int] = None,
+):
+    """
+    worker 进程主循环：claim → 执行（后台线程续租）→ finish / fail
+    """
+    queue = JobQueue(db_path)
+    worker_name = f"{job_type}-{os.getpid()}"
+    handler = JOB_HANDLERS[job_type]
+
+    while not stop_event.is_set():
+        job = queue.claim(job_type, worker_name, max_running)
+        if not job:
+            stop_event.wait(IDLE_POLL_SECONDS)
+            continue
+
+        done = threading.Event()
+        threading.Thread(
+            target=_heartbeat_loop,
+            args=(queue, job["id"], worker_name, done, max(lease_seconds / 3, 0.1)),
+            name="job-heartbeat",
+            daemon=True,
+        ).start()
+
+        try:
+            result = handler(job["payload"])
+        except Exception as e:
+            traceback.print_exc()
+            queue.fail(job["id"], str(e), worker=worker_name)
+        else:
+            queue.finish(job["id"], result, worker=worker_name)
+        finally:
+            done.set()
+
+
+# =====================================================
+# Worker 进程池（按任务类型限流）
+# =====================================================
+def parse_job_concurrency(spec: str) -> Dict[str, int]:
+    """
+    "parse=2,analyze=2,generate=1" → {"parse": 2, ...}
+    """
+    concurrency = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        job_type, count = part.split("=", 1)
+        job_type = job_type.strip()
+        if job_type in JOB_TYPES:
+            concurrency[job_type] = max(0, int(count))
+    return concurrency
+
+
+class JobWorkerPool:
+    def __init__(
+        self,
+        db_path: str,
+        concurrency: Dict[str, int],
+        lease_seconds: float = JOB_LEASE_SECONDS,
+    ):
+        self.db_path = db_path
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        # ⚠️ spawn：子进程不继承 API 进程的线程 / 事件循环
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop = self._ctx.Event()
+
+        # (任务类型, 序号) → 进程 / 启动时间 / 连续快速退出次数 / 计划重启时间
+        self._workers: Dict[Tuple[str, int], multiprocessing.Process] = {}
+        self._started_at: Dict[Tuple[str, int], float] = {}
+        self._failures: Dict[Tuple[str, int], int] = {}
+        self._restart_at: Dict[Tuple[str, int], float] = {}
+        self._monitor: Optional[threading.Thread] = None
+
+    def start(self):
+        # 只回收租约已过期的任务（其他 API 进程的 worker 仍在续租的不动）
+        JobQueue(self.db_path).requeue_expired(self.lease_seconds)
+
+        for job_type, count in self.concurrency.items():
+            for i in range(count):
+                self._spawn((job_type, i))
+
+        self._monitor = threading.Thread(
+            target=self._monitor_loop,
+            name="job-worker-monitor",
+            daemon=True,
+        )
+        self._monitor.start()
+
+    def _spawn(self, slot: Tuple[str, int]):
+        job_type, i = slot
+        p = self._ctx.Process(
+            target=_worker_main,
+            args=(
+                self.db_path,
+                job_type,
+                self._stop,
+                self.lease_seconds,
+                self.concurrency[job_type],
+            ),
+            name=f"job-worker-{job_type}-{i}",
+            daemon=True,
+        )
+        p.start()
+        self._workers[slot] = p
+        self._started_at[slot] = time.monotonic()
+
+    def _monitor_loop(self):
+        while not self._stop.wait(WORKER_MONITOR_INTERVAL):
+            try:
+                self.check_workers()
+            except Exception:
+                traceback.print_exc()
+
+    def check_workers(self):
+        """
+        回收已退出的 worker 并按退避间隔重启（监控线程周期调用）
+        """
+        now = time.monotonic()
+        for slot, p in list(self._workers.items()):
+            if self._stop.is_set():
+                return
+            if p.is_alive():
+                continue
+
+            if slot not in self._restart_at:
+                p.join(0)
+                quick = now - self._started_at[slot] < WORKER_STABLE_SECONDS
+                failures = self._failures.get(slot, 0) + 1 if quick else 0
+                self._failures[slot] = failures
+                self._restart_at[slot] = now + min(
+                    WORKER_RESTART_BACKOFF_MAX, 2 ** failures - 1
+                )
+                print(
+                    f"⚠️ job worker {p.name} exited (code={p.exitcode}), "
+                    f"restarting in {self._restart_at[slot] - now:.0f}s"
+                )
+
+            if now >= self._restart_at[slot]:
+                del self._restart_at[slot]
+                self._spawn(slot)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        # 先停监控，之后不会再有新进程被拉起
+        if self._monitor:
+            self._monitor.join(timeout)
+            self._monitor = None
+
+        for p in self._workers.values():
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._workers.clear()
+
+
+# =====================================================
+# 结果回写（运行在 API 进程中）
+# =====================================================
+class JobResultApplier:
+    """
+    轮询已完成任务，claim_apply 抢到回写权后调用 apply 回写 workflow；
+    顺带回收租约过期的 running 任务
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        apply: Callable[[Dict[str, Any]], None],
+        interval: float = IDLE_POLL_SECONDS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+    ):
+        self.queue = queue
+        self.apply = apply
+        self.interval = interval
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._loop,
+            name="job-result-applier",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _loop(self):
+        last_requeue = 0.0
+        while not self._stop.is_set():
+            try:
+                for job in self.queue.fetch_unapplied():
+                    # 先抢占再回写：其他 API 进程已抢到的直接跳过
+                    if not self.queue.claim_apply(job["id"]):
+                        continue
+                    try:
+                        self.apply(job)
+                    except Exception:
+                        traceback.print_exc()
+
+                now = time.monotonic()
+                if now - last_requeue >= self.lease_seconds / 3:
+                    self.queue.requeue_expired(self.lease_seconds)
+                    last_requeue = now
+            except Exception:
+                traceback.print_exc()
+
+            self._stop.wait(self.interval)
+
+
+def is_job_finished(job: Dict[str, Any]) -> bool:
+    return job["status"] in (JobStatus.DONE, JobStatus.ERROR)
@@ -0,0 +1,169 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/services/keyword_matcher.py
+
+"""
+多模式关键词匹配
+
+- 构建一次，扫描一遍文本即可找出所有关键词（含重叠 / 互为前缀）
+- 小词典（≤ REGEX_MAX_KEYWORDS）：单个预编译正则（长词优先的分支 + 前瞻），扫描在 C 里完成
+- 大词典：Aho-Corasick 自动机，扫描耗时与文本长度线性相关，与词典大小无关
+  （纯 Python 逐字符推进，常数大；默认词典上比正则慢约 4 倍，60~80 词时持平，见 tests/bench/bench_keyword_matcher.py）
+- build_keyword_matcher 按关键词集合缓存，同一 workflow 重复调用不重建
+"""
+
+import re
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# 词典规模不超过该值时用正则，超过则用 Aho-Corasick（分界点见 bench_keyword_matcher.py）
+REGEX_MAX_KEYWORDS = 64
+
+KEYWORD_BACKENDS = ("regex", "automaton")
+
+
+class KeywordMatcher:
+    def __init__(self, keywords: Iterable[str], backend: Optional[str] = None):
+        """
+        :param backend: "regex" / "automaton"，默认按词典规模选择
+        """
+        self.keywords: List[str] = []
+        seen = set()
+        for kw in keywords:
+            if not kw or kw in seen:
+                continue
+            seen.add(kw)
+            self.keywords.append(kw)
+
+        if backend is None:
+            backend = "regex" if len(self.keywords) <= REGEX_MAX_KEYWORDS else "automaton"
+        if backend not in KEYWORD_BACKENDS:
+            raise ValueError(f"Unsupported keyword backend: {backend}")
+        self.backend = backend
+
+        if backend == "regex":
+            self._build_regex()
+        else:
+            self._build_automaton()
+
+    # =====================================================
+    # 正则（小词典）
+    # =====================================================
+    def _build_regex(self):
+        # 前瞻不消耗字符：每个位置都尝试一次，得到从该位置开始的最长关键词；
+        # 同一位置开始的更短关键词必然是它的前缀，由 _prefixes 补齐
+        self._pattern = None
+        if self.keywords:
+            alternation = "|".join(
+                re.escape(kw) for kw in sorted(self.keywords, key=len, reverse=True)
+            )
+            self._pattern = re.compile(f"(?=({alternation}))")
+
+        keyword_set = set(self.keywords)
+        self._prefixes: Dict[str, List[str]] = {
+            kw: [kw[:i] for i in range(len(kw) - 1, 0, -1) if kw[:i] in keyword_set]
+            for kw in self.keywords
+        }
+
+    def _iter_regex(self, text: str) -> Iterator[Tuple[int, str]]:
+        prefixes = self._prefixes
+        for m in self._pattern.finditer(text):
+            pos, kw = m.start(), m.group(1)
+            yield pos, kw
+            for short in prefixes[kw]:
+                yield pos, short
+
+    # =====================================================
+    # Aho-Corasick（大词典）
+    # =====================================================
+    def _build_automaton(self):
+        # 状态 i：goto 表 / 失败指针 / 在该状态结束的关键词下标
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for index, kw in enumerate(self.keywords):
+            self._add(kw, index)
+
+        self._build_fail_links()
+
+    def _add(self, keyword: str, index: int):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(index)
+
+    def _build_fail_links(self):
+        # BFS：子状态的失败指针 = 父失败链上第一个有相同转移的状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _iter_automaton(self, text: str) -> Iterator[Tuple[int, str]]:
+        goto, fail, out, keywords = self._goto, self._fail, self._out, self.keywords
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for idx in out[state]:
+                kw = keywords[idx]
+                yield pos - len(kw) + 1, kw
+
+    # =====================================================
+    # 查询
+    # =====================================================
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        逐个产出 (起始位置, 关键词)；产出顺序随后端不同，不作保证
+        """
+        if not text or not self.keywords:
+            return iter(())
+        if self.backend == "regex":
+            return self._iter_regex(text)
+        return self._iter_automaton(text)
+
+    def find_all(self, text: str) -> Set[str]:
+        """
+        文本中出现过的全部关键词
+        """
+        if self.backend == "regex" and text and self.keywords:
+            # 只要词集时不必逐个产出位置：findall 一次取回，再补前缀
+            found = set(self._pattern.findall(text))
+            for kw in list(found):
+                found.update(self._prefixes[kw])
+            return found
+        return {kw for _, kw in self.iter_matches(text)}
+
+    def count(self, text: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for _, kw in self.iter_matches(text):
+            counts[kw] = counts.get(kw, 0) + 1
+        return counts
+
+
+@lru_cache(maxsize=128)
+def _cached_matcher(keywords: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(keywords)
+
+
+def build_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """
+    同一关键词集合（忽略顺序）复用同一个 matcher
+    """
+    return _cached_matcher(tuple(sorted({k for k in keywords if k})))
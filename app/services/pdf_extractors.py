@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+# app/services/pdf_extractors.py
+
+"""
+PDF 文本提取后端（可插拔）
+
+默认链路：pypdf（快）→ pdfplumber layout（准）→ OCR（兜底）
+- 前一个后端结果通过质量阈值就不再调用后面的后端
+- 每个后端按需打开文档，未被用到的后端零开销
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple, Type
+
+
+# ===============================
+# 质量阈值（工程经验值）
+# ===============================
+MIN_PAGE_TEXT_LENGTH = 80       # 单页有效文本最小长度
+MIN_OCR_TEXT_LENGTH = 50        # OCR 文本最小长度
+MIN_MEANINGFUL_RATIO = 0.5      # 中文 / 字母数字占比下限
+
+# pypdf 对 CID 字体常见的乱码输出
+_GARBAGE_PATTERN = re.compile(r"\(cid:\d+\)|\ufffd")
+_MEANINGFUL_PATTERN = re.compile(r"[\u4e00-\u9fffA-Za-z0-9]")
+
+
+def text_quality_ok(text: str, min_length: int = MIN_PAGE_TEXT_LENGTH) -> bool:
+    """
+    文本质量校验：长度够 + 不是乱码
+    """
+    if not text or len(text) < min_length:
+        return False
+
+    compact = re.sub(r"\s+", "", text)
+    if not compact:
+        return False
+
+    if len(_GARBAGE_PATTERN.findall(compact)) * 10 > len(compact):
+        return False
+
+    meaningful = len(_MEANINGFUL_PATTERN.findall(compact))
+    return meaningful / len(compact) >= MIN_MEANINGFUL_RATIO
+
+
+# =====================================================
+# 后端基类
+# =====================================================
+class TextExtractor:
+    """
+    单个文档的文本提取后端
+
+    - extract() 返回 (text, confidence)，未通过质量阈值返回 None
+    - target 决定结果写入 confirmed_text 还是 ocr_text
+    """
+
+    name: str = ""
+    target: str = "confirmed"
+
+    def __init__(self, pdf_path: str):
+        self.pdf_path = pdf_path
+
+    def page_count(self) -> int:
+        raise NotImplementedError
+
+    def extract(self, page_index: int) -> Optional[Tuple[str, str]]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# =====================================================
+# ⭐ pypdf：快速路径
+# =====================================================
+class PypdfExtractor(TextExtractor):
+    name = "pypdf"
+
+    def __init__(self, pdf_path: str):
+        super().__init__(pdf_path)
+        self._reader = None
+        self._fp = None
+
+    def _get_reader(self):
+        if self._reader is None:
+            from pypdf import PdfReader
+            # ⚠️ 传文件对象而不是路径：传路径时 pypdf 会把整个文件读进内存
+            self._fp = open(self.pdf_path, "rb")
+            self._reader = PdfReader(self._fp)
+        return self._reader
+
+    def page_count(self) -> int:
+        return len(self._get_reader().pages)
+
+    def extract(self, page_index: int) -> Optional[Tuple[str, str]]:
+        reader = self._get_reader()
+        try:
+            page = reader.pages[page_index]
+            try:
+                text = (page.extract_text() or "").strip()
+            finally:
+                # ⚠️ 释放 reader 缓存的本页内容流，保证内存有界
+                self._release_contents(reader, page)
+        except Exception:
+            return None
+
+        if text_quality_ok(text):
+            return text, "HIGH"
+        return None
+
+    @staticmethod
+    def _release_contents(reader, page):
+        from pypdf.generic import IndirectObject
+
+        contents = page.get("/Contents")
+        if isinstance(contents, IndirectObject):
+            refs = [contents]
+            contents = contents.get_object()
+        else:
+            refs = []
+        if isinstance(contents, list):
+            refs += [ref for ref in contents if isinstance(ref, IndirectObject)]
+
+        for ref in refs:
+            reader.resolved_objects.pop((ref.generation, ref.idnum), None)
+
+    def close(self):
+        self._reader = None
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+
+# =====================================================
+# pdfplumber：layout 提取 + 字符兜底
+# =====================================================
+class PdfplumberExtractor(TextExtractor):
+    name = "pdfplumber"
+
+    def __init__(self, pdf_path: str):
+        super().__init__(pdf_path)
+        self._pdf = None
+
+    def _get_pdf(self):
+        if self._pdf is None:
+            import pdfplumber
+            self._pdf = pdfplumber.open(self.pdf_path)
+        return self._pdf
+
+    def page_count(self) -> int:
+        return len(self._get_pdf().pages)
+
+    def extract(self, page_index: int) -> Optional[Tuple[str, str]]:
+        page = self._get_pdf().pages[page_index]
+        try:
+            return self._extract_page(page)
+        finally:
+            # ⚠️ 立即释放字符 / 布局缓存，保证内存有界
+            page.close()
+
+    def _extract_page(self, page) -> Optional[Tuple[str, str]]:
+        # ========= 1️⃣ 标准文本 =========
+        try:
+            text = page.extract_text(
+                x_tolerance=2,
+                y_tolerance=2,
+                layout=True
+            ) or ""
+        except Exception:
+            text = ""
+
+        text = text.strip()
+        if text and len(text) >= MIN_PAGE_TEXT_LENGTH:
+            return text, "HIGH"
+
+        # ========= 2️⃣ 字符兜底 =========
+        char_text = ""
+        try:
+            chars = page.chars or []
+            char_text = "".join(
+                c.get("text", "") for c in chars if c.get("text")
+            ).strip()
+        except Exception:
+            pass
+
+        if char_text and len(char_text) >= MIN_PAGE_TEXT_LENGTH:
+            return char_text, "MEDIUM"
+        return None
+
+    def close(self):
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+
+# =====================================================
+# OCR：最后兜底（仅前面全部失败时才渲染页面）
+# =====================================================
+class OcrExtractor(PdfplumberExtractor):
+    name = "ocr"
+    target = "ocr"
+
+    def _extract_page(self, page) -> Optional[Tuple[str, str]]:
+        import pytesseract
+
+        # ⚠️ 300 dpi 渲染图单页可达数十 MB，用完立即释放
+        page_image = None
+        try:
+            page_image = page.to_image(resolution=300).original
+            ocr_text = pytesseract.image_to_string(
+                page_image,
+                lang="chi_sim+eng",
+                config="--psm 6"
+            ).strip()
+        except Exception:
+            ocr_text = ""
+        finally:
+            if page_image is not None:
+                page_image.close()
+            del page_image
+
+        if ocr_text and len(ocr_text) >= MIN_OCR_TEXT_LENGTH:
+            return ocr_text, "LOW"
+        return None
+
+
+# =====================================================
+# 后端注册表
+# =====================================================
+EXTRACTOR_BACKENDS: Dict[str, Type[TextExtractor]] = {
+    PypdfExtractor.name: PypdfExtractor,
+    PdfplumberExtractor.name: PdfplumberExtractor,
+    OcrExtractor.name: OcrExtractor,
+}
+
+DEFAULT_EXTRACTOR_CHAIN = ["pypdf", "pdfplumber", "ocr"]
+
+
+def build_extractor_chain(
+    pdf_path: str,
+    names: Optional[List[str]] = None,
+) -> List[TextExtractor]:
+    chain = []
+    for name in names or DEFAULT_EXTRACTOR_CHAIN:
+        backend = EXTRACTOR_BACKENDS.get(name.strip())
+        if backend is None:
+            raise ValueError(f"Unknown PDF extractor backend: {name}")
+        chain.append(backend(pdf_path))
+    return chain
+
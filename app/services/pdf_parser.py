@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
-import pdfplumber
-import pytesseract
-from PIL import Image
 import os
 import re
+import tempfile
+from typing import Generator, List, Optional, Tuple
+
+from app.services.pdf_extractors import TextExtractor, build_extractor_chain
+from app.settings import TMP_DIR, PDF_EXTRACTORS
 
 
 MIN_AI_TEXT_LENGTH = 300   # ⭐ AI 分析最小文本长度（工程经验值）
@@ -16,81 +18,179 @@ def clean_text(text: str) -> str:
     return text
 
 
+def _parse_page(extractors: List[TextExtractor], page_index: int) -> dict:
+    """
+    解析单页：按后端链路依次尝试，通过质量阈值即停止
+    """
+    page_confirmed = ""
+    page_ocr = ""
+    page_confidence = "LOW"
+    page_extractor = None
+
+    for extractor in extractors:
+        try:
+            result = extractor.extract(page_index)
+        except Exception:
+            result = None
+
+        if not result:
+            continue
+
+        text, confidence = result
+        if extractor.target == "ocr":
+            page_ocr = clean_text(text)
+        else:
+            page_confirmed = clean_text(text)
+            page_confidence = confidence
+
+        page_extractor = extractor.name
+        break
+
+    return {
+        "page": page_index + 1,
+        "confirmed_text": page_confirmed,
+        "ocr_text": page_ocr,
+        "confidence": page_confidence,
+        "extractor": page_extractor,
+    }
+
+
+def iter_parse_pdf(
+    pdf_path: str,
+    extractors: Optional[List[str]] = None,
+) -> Generator[dict, None, None]:
+    """
+    逐页解析（流式）：每解析完一页立即 yield
+
+    - 提取后端链路见 PDF_EXTRACTORS（默认 pypdf → pdfplumber → ocr），可用 extractors 覆盖
+    - ⚠️ 内存有界：pdfplumber 后端每页处理完立即释放缓存
+
+    yield 结构：
+        {
+            "page": int,
+            "total_pages": int,
+            "confirmed_text": str,
+            "ocr_text": str,
+            "confidence": "HIGH | MEDIUM | LOW",
+            "extractor": str | None
+        }
+    """
+    chain = build_extractor_chain(pdf_path, extractors or PDF_EXTRACTORS)
+
+    try:
+        total_pages = _page_count(chain)
+
+        for page_index in range(total_pages):
+            page_result = _parse_page(chain, page_index)
+            page_result["total_pages"] = total_pages
+            yield page_result
+    finally:
+        for extractor in chain:
+            extractor.close()
+
+
+def _page_count(extractors: List[TextExtractor]) -> int:
+    # 第一个能打开文档的后端说了算（损坏文件 pypdf 打不开时回落）
+    last_error = None
+    for extractor in extractors:
+        try:
+            return extractor.page_count()
+        except Exception as e:
+            last_error = e
+    raise RuntimeError(f"无法打开 PDF：{last_error}")
+
+
+class PageTextSpill:
+    """
+    逐页文本落盘（spill file）
+
+    - 解析过程中整份文本不在内存中累积
+    - confirmed / OCR 分别写入临时文件，需要时一次性读回
+    - 拼接格式与原 parse_pdf 完全一致（带页码标记）
+    """
+
+    def __init__(self, spill_dir: Optional[str] = None):
+        spill_dir = spill_dir or TMP_DIR
+        self._confirmed = tempfile.TemporaryFile(
+            "w+", encoding="utf-8", dir=spill_dir
+        )
+        self._ocr = tempfile.TemporaryFile(
+            "w+", encoding="utf-8", dir=spill_dir
+        )
+        self._has_confirmed = False
+        self._has_ocr = False
+
+    def add(self, page_result: dict):
+        page_no = page_result["page"]
+
+        if page_result.get("confirmed_text"):
+            if self._has_confirmed:
+                self._confirmed.write("\n")
+            self._confirmed.write(
+                f"\n【第 {page_no} 页】\n{page_result['confirmed_text']}"
+            )
+            self._has_confirmed = True
+
+        if page_result.get("ocr_text"):
+            if self._has_ocr:
+                self._ocr.write("\n")
+            self._ocr.write(
+                f"\n【第 {page_no} 页 OCR】\n{page_result['ocr_text']}"
+            )
+            self._has_ocr = True
+
+    @property
+    def has_text(self) -> bool:
+        """
+        是否已写入过任何文本（不读文件）
+        """
+        return self._has_confirmed or self._has_ocr
+
+    def read(self) -> Tuple[str, str]:
+        """
+        读回 (confirmed_text, ocr_text)
+        """
+        return self._read(self._confirmed), self._read(self._ocr)
+
+    @staticmethod
+    def _read(f) -> str:
+        f.flush()
+        f.seek(0)
+        text = f.read().strip()
+        f.seek(0, os.SEEK_END)
+        return text
+
+    def close(self):
+        self._confirmed.close()
+        self._ocr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 def parse_pdf(pdf_path: str) -> dict:
     """
     工程级 PDF 解析（AI 友好 · 语义闭环版）
     """
 
+    # ⚠️ pages 只保留每页元信息，正文统一走 spill file
     pages_result = []
-    confirmed_all = []
-    ocr_all = []
-
-    with pdfplumber.open(pdf_path) as pdf:
-        for page_index, page in enumerate(pdf.pages):
-            page_no = page_index + 1
-
-            page_confirmed = ""
-            page_ocr = ""
-            page_confidence = "LOW"
-
-            # ========= 1️⃣ 标准文本 =========
-            try:
-                text = page.extract_text(
-                    x_tolerance=2,
-                    y_tolerance=2,
-                    layout=True
-                ) or ""
-            except Exception:
-                text = ""
-
-            text = text.strip()
-
-            # ========= 2️⃣ 字符兜底 =========
-            char_text = ""
-            try:
-                chars = page.chars or []
-                char_text = "".join(
-                    c.get("text", "") for c in chars if c.get("text")
-                ).strip()
-            except Exception:
-                pass
-
-            if text and len(text) >= 80:
-                page_confirmed = clean_text(text)
-                page_confidence = "HIGH"
-            elif char_text and len(char_text) >= 80:
-                page_confirmed = clean_text(char_text)
-                page_confidence = "MEDIUM"
-
-            # ========= 3️⃣ OCR =========
-            try:
-                page_image = page.to_image(resolution=300).original
-                ocr_text = pytesseract.image_to_string(
-                    page_image,
-                    lang="chi_sim+eng",
-                    config="--psm 6"
-                ).strip()
-            except Exception:
-                ocr_text = ""
-
-            if ocr_text and len(ocr_text) >= 50:
-                page_ocr = clean_text(ocr_text)
 
+    with PageTextSpill() as spill:
+        for page_result in iter_parse_pdf(pdf_path):
+            spill.add(page_result)
             pages_result.append({
-                "page": page_no,
-                "confirmed_text": page_confirmed,
-                "ocr_text": page_ocr,
-                "confidence": page_confidence
+                "page": page_result["page"],
+                "confidence": page_result["confidence"],
+                "extractor": page_result["extractor"],
+                "confirmed_length": len(page_result["confirmed_text"]),
+                "ocr_length": len(page_result["ocr_text"]),
             })
 
-            if page_confirmed:
-                confirmed_all.append(f"\n【第 {page_no} 页】\n{page_confirmed}")
-
-            if page_ocr:
-                ocr_all.append(f"\n【第 {page_no} 页 OCR】\n{page_ocr}")
-
-    confirmed_text = "\n".join(confirmed_all).strip()
-    ocr_text = "\n".join(ocr_all).strip()
+        confirmed_text, ocr_text = spill.read()
 
     # ========= ⭐ 是否可用于 AI =========
     usable_for_ai = len(confirmed_text) >= MIN_AI_TEXT_LENGTH
@@ -108,3 +208,4 @@ def parse_pdf(pdf_path: str) -> dict:
         "usable_for_ai": usable_for_ai,    # ⭐ 明确结论
         "pages": pages_result
     }
+
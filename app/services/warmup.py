@@ -0,0 +1,73 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/services/warmup.py
+
+"""
+启动预热
+
+- 重依赖（openai / openpyxl / pdfplumber / pytesseract / PIL）均在首次使用时导入，
+  API 进程启动只加载 FastAPI 与项目自身模块
+- start_background_warmup：服务开始接收请求后，在后台线程预先导入，
+  首个请求不再承担导入耗时
+- 启动导入的回归检查见 tests/test_startup_imports.py
+"""
+
+import importlib
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from app.settings import WARMUP_DELAY_SECONDS
+
+
+WARMUP_MODULES = (
+    "openai",
+    "openpyxl",
+    "pdfplumber",
+    "pypdf",
+    "pytesseract",
+    "PIL.Image",
+)
+
+
+# =====================================================
+# 后台预热
+# =====================================================
+def warmup_imports(modules: Iterable[str] = WARMUP_MODULES) -> Dict[str, Optional[float]]:
+    """
+    依次导入，返回 {模块: 耗时秒}；未安装的模块记为 None
+    """
+    timings: Dict[str, Optional[float]] = {}
+    for name in modules:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            timings[name] = None
+            continue
+        timings[name] = round(time.perf_counter() - started, 4)
+    return timings
+
+
+def start_background_warmup(
+    delay: float = WARMUP_DELAY_SECONDS,
+    modules: Iterable[str] = WARMUP_MODULES,
+) -> threading.Thread:
+    """
+    lifespan 启动阶段调用：先等待 delay 秒（服务已开始监听），再在守护线程中导入
+    """
+    modules = tuple(modules)
+
+    def _run():
+        time.sleep(delay)
+        try:
+            timings = warmup_imports(modules)
+            print(f"🔥 import warmup done: {timings}")
+        except Exception as e:
+            # 预热失败不影响服务，首次使用时仍会正常导入
+            print("⚠️ import warmup failed:", e)
+
+    thread = threading.Thread(target=_run, name="import-warmup", daemon=True)
+    thread.start()
+    return thread
+
@@ -42,8 +42,13 @@ def _get_env_or_config(key: str, default=None):
     """
     优先级：
     ENV > config.yaml > default
+
+    ⚠️ 只有环境变量缺失时才读取 config.yaml（get_settings 首次调用时加载并缓存）
     """
-    return os.getenv(key, get_settings().get(key, default))
+    value = os.getenv(key)
+    if value is not None:
+        return value
+    return get_settings().get(key, default)
 
 
 # =====================================================
@@ -79,6 +84,140 @@ MAX_CONCURRENT_TASKS = int(
     _get_env_or_config("MAX_CONCURRENT_TASKS", 3)
 )
 
+# ========= 上传限制 =========
+MAX_UPLOAD_BYTES = int(
+    _get_env_or_config("MAX_UPLOAD_BYTES", 100 * 1024 * 1024)
+)
+
+# ========= PDF 流式解析 =========
+# 解析完前 N 页即可提前开始需求分析
+EARLY_ANALYZE_PAGES = int(
+    _get_env_or_config("EARLY_ANALYZE_PAGES", 5)
+)
+
+# 文本提取后端链路（按顺序尝试，前者通过质量阈值即停止）
+PDF_EXTRACTORS = [
+    name.strip()
+    for name in str(
+        _get_env_or_config("PDF_EXTRACTORS", "pypdf,pdfplumber,ocr")
+    ).split(",")
+    if name.strip()
+]
+
+# ========= Workflow 存储 =========
+# memory（默认，单进程）/ sqlite（落盘，可多 worker 共享）
+WORKFLOW_STORE = _get_env_or_config("WORKFLOW_STORE", "memory")
+WORKFLOW_DB_PATH = _get_env_or_config(
+    "WORKFLOW_DB_PATH", os.path.join(TMP_DIR, "workflows.sqlite3")
+)
+# 进度类更新批量落盘间隔（秒）
+WORKFLOW_FLUSH_INTERVAL = float(
+    _get_env_or_config("WORKFLOW_FLUSH_INTERVAL", 0.2)
+)
+
+# memory 后端内存上限：空闲超时 / 常驻字节上限触发大字段 spill
+WORKFLOW_SPILL_DIR = _get_env_or_config(
+    "WORKFLOW_SPILL_DIR", os.path.join(TMP_DIR, "workflows")
+)
+WORKFLOW_IDLE_TTL = float(
+    _get_env_or_config("WORKFLOW_IDLE_TTL", 30 * 60)
+)
+WORKFLOW_MAX_RESIDENT_BYTES = int(
+    _get_env_or_config("WORKFLOW_MAX_RESIDENT_BYTES", 512 * 1024 * 1024)
+)
+# 超过该时长未访问的 workflow 整体删除（0 = 永不删除）
+WORKFLOW_EXPIRE_SECONDS = float(
+    _get_env_or_config("WORKFLOW_EXPIRE_SECONDS", 7 * 24 * 3600)
+)
+
+# legacy /download/{task_id} 映射上限
+TASK_EXCEL_MAP_MAX = int(_get_env_or_config("TASK_EXCEL_MAP_MAX", 1000))
+TASK_EXCEL_TTL = float(_get_env_or_config("TASK_EXCEL_TTL", 24 * 3600))
+
+# ========= 后台任务队列 =========
+JOB_QUEUE_DB = _get_env_or_config(
+    "JOB_QUEUE_DB", os.path.join(TMP_DIR, "jobs.sqlite3")
+)
+# 每种任务类型的 worker 进程数，0 表示不启动；每个 API 进程各启动这么多 worker，
+# 该数同时是该类型的全局并发上限（claim 时按队列库中的 running 数判断）
+JOB_CONCURRENCY = _get_env_or_config(
+    "JOB_CONCURRENCY", "parse=2,analyze=2,generate=1"
+)
+# running 任务租约（秒）：worker 每 1/3 租约 heartbeat 一次，超时未续租才重新排队
+JOB_LEASE_SECONDS = float(_get_env_or_config("JOB_LEASE_SECONDS", 60))
+
+# ========= 用例生成 SSE =========
+# 每个 run 保留的最近事件数（Last-Event-ID 断线重连回放）
+GENERATION_EVENT_BUFFER = int(
+    _get_env_or_config("GENERATION_EVENT_BUFFER", 1000)
+)
+# run 结束后保留多久（秒），期间重连仍可回放 done / error
+GENERATION_RUN_RETENTION = float(
+    _get_env_or_config("GENERATION_RUN_RETENTION", 600)
+)
+# 单个 SSE 订阅方的待发送队列上限，写满即断开该订阅方（重连后从 spill 补齐）
+GENERATION_SUBSCRIBER_QUEUE = int(
+    _get_env_or_config("GENERATION_SUBSCRIBER_QUEUE", 1000)
+)
+# run 级用例回放 spill 目录
+GENERATION_SPILL_DIR = _get_env_or_config(
+    "GENERATION_SPILL_DIR", os.path.join(TMP_DIR, "generation")
+)
+# 每产出多少条用例推送一次 coverage 事件（结束前总会再推一次）
+COVERAGE_EVENT_EVERY = int(_get_env_or_config("COVERAGE_EVENT_EVERY", 10))
+# 用例生成上下文的 token 预算（app/workflow/merge.py，0 = 不限制）
+GENERATION_CONTEXT_TOKENS = int(
+    _get_env_or_config("GENERATION_CONTEXT_TOKENS", 16000)
+)
+
+# ========= 覆盖目标模式（app/agents/orchestrator.py） =========
+# 开启后测试点分批生成：达到覆盖目标即停止，未达成则只对缺口补生成
+COVERAGE_GOAL_MODE = str(
+    _get_env_or_config("COVERAGE_GOAL_MODE", "false")
+).lower() in ("1", "true", "yes", "on")
+# 目标：测试点 × 覆盖维度的覆盖率（强制覆盖项总是要求命中）
+COVERAGE_TARGET_RATIO = float(_get_env_or_config("COVERAGE_TARGET_RATIO", 0.8))
+# 每批测试点数
+COVERAGE_BATCH_SIZE = int(_get_env_or_config("COVERAGE_BATCH_SIZE", 5))
+# 补生成轮数 / 每个补生成 prompt 最多包含的缺口单元格数
+COVERAGE_TOPUP_ROUNDS = int(_get_env_or_config("COVERAGE_TOPUP_ROUNDS", 2))
+COVERAGE_TOPUP_CELLS = int(_get_env_or_config("COVERAGE_TOPUP_CELLS", 10))
+
+# ========= 启动预热（app/services/warmup.py） =========
+# 服务开始接收请求后，在后台线程预先导入重依赖（openai / openpyxl / pdfplumber ...）
+WARMUP_IMPORTS = str(
+    _get_env_or_config("WARMUP_IMPORTS", "true")
+).lower() in ("1", "true", "yes", "on")
+WARMUP_DELAY_SECONDS = float(_get_env_or_config("WARMUP_DELAY_SECONDS", 1.0))
+
+# ========= 导出 =========
+# 导出进程数（0 = 在调用线程内直接导出）
+EXPORT_PROCESSES = int(_get_env_or_config("EXPORT_PROCESSES", 2))
+# 导出缓存目录（TMP_DIR/exports）上限：总字节数 / 最久未使用时间（秒），0 = 不限制
+EXPORT_CACHE_MAX_BYTES = int(
+    _get_env_or_config("EXPORT_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+)
+EXPORT_CACHE_TTL = float(_get_env_or_config("EXPORT_CACHE_TTL", 7 * 24 * 3600))
+
+# ========= 会话持久化（app/services/db.py，可选组件，服务本身不使用） =========
+# mysql | sqlite（sqlite 为嵌入式，离线环境可用）
+SESSION_DB_BACKEND = _get_env_or_config("SESSION_DB_BACKEND", "mysql")
+SESSION_DB_PATH = _get_env_or_config(
+    "SESSION_DB_PATH", os.path.join(TMP_DIR, "sessions.sqlite3")
+)
+MYSQL_HOST = _get_env_or_config("MYSQL_HOST", "127.0.0.1")
+MYSQL_PORT = int(_get_env_or_config("MYSQL_PORT", 3306))
+MYSQL_USER = _get_env_or_config("MYSQL_USER", "root")
+MYSQL_PASSWORD = _get_env_or_config("MYSQL_PASSWORD", "")
+MYSQL_DATABASE = _get_env_or_config("MYSQL_DATABASE", "ai-test-agent")
+
+# ========= 领域关键词（app/services/confirmed_extractor.py） =========
+# config.yaml: domain_keywords: {分类: [关键词, ...]}；环境变量为同结构 JSON
+# 未配置时使用内置词典；首次使用时才读取（config.yaml 不在导入期加载）
+def get_domain_keywords():
+    return os.getenv("DOMAIN_KEYWORDS") or get_settings().get("domain_keywords")
+
+
 # ========= CORS / 前端 =========
 FRONTEND_ORIGIN = _get_env_or_config("FRONTEND_ORIGIN", "*")
 
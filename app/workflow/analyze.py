@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import traceback
 
 from app.agents.orchestrator import Orchestrator
@@ -18,6 +18,28 @@ def analyze_requirements(
     - ✅ 生成 test_points（供后续用例生成）
     - ❌ 不控制 workflow 阶段
     """
+    analysis_result, test_points = run_analysis(raw_requirements)
+
+    # =====================================================
+    # 5️⃣ 写回 workflow（只写业务数据）
+    # =====================================================
+    update_workflow(
+        workflow_id=workflow_id,
+        analysis_result=analysis_result,
+        test_points=test_points,
+    )
+
+    return analysis_result
+
+
+def run_analysis(
+    raw_requirements: str,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    纯计算部分（不读写 workflow），可在后台 worker 进程中执行
+
+    返回：(analysis_result, test_points)
+    """
 
     # =====================================================
     # 1️⃣ 输入校验
@@ -76,13 +98,4 @@ def analyze_requirements(
         "suggestions": suggestions,
     }
 
-    # =====================================================
-    # 5️⃣ 写回 workflow（只写业务数据）
-    # =====================================================
-    update_workflow(
-        workflow_id=workflow_id,
-        analysis_result=analysis_result,
-        test_points=test_points,
-    )
-
-    return analysis_result
+    return analysis_result, test_points
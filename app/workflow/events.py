@@ -0,0 +1,106 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/workflow/events.py
+
+"""
+Workflow 事件总线（进程内 pub/sub）
+
+- state.py 每次写入后 publish 状态快照
+- SSE 端点 subscribe 一个或多个 workflow，事件到达即推送（无轮询）
+- publish 可在任意线程调用，通过 call_soon_threadsafe 投递到订阅方事件循环
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, Iterable, Optional, Set
+
+
+SUBSCRIPTION_QUEUE_SIZE = 256
+
+
+class Subscription:
+    def __init__(
+        self,
+        bus: "WorkflowEventBus",
+        workflow_ids: Optional[Set[str]],
+        loop: asyncio.AbstractEventLoop,
+    ):
+        self.bus = bus
+        self.workflow_ids = workflow_ids      # None = 订阅全部
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    def wants(self, workflow_id: str) -> bool:
+        return self.workflow_ids is None or workflow_id in self.workflow_ids
+
+    def _deliver(self, event: Dict[str, Any]):
+        # 运行在订阅方事件循环内；慢消费者丢最旧的事件（状态快照可合并）
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        等待下一条事件，超时返回 None
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WorkflowEventBus:
+    def __init__(self):
+        self._subs: Set[Subscription] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(
+        self,
+        workflow_ids: Optional[Iterable[str]] = None,
+    ) -> Subscription:
+        """
+        ⚠️ 必须在事件循环内调用（绑定当前 running loop）
+        """
+        sub = Subscription(
+            self,
+            set(workflow_ids) if workflow_ids is not None else None,
+            asyncio.get_running_loop(),
+        )
+        with self._lock:
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def publish(self, workflow_id: str, event: str, data: Dict[str, Any]):
+        with self._lock:
+            targets = [s for s in self._subs if s.wants(workflow_id)]
+
+        if not targets:
+            return
+
+        payload = {"workflow_id": workflow_id, "event": event, "data": data}
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub._deliver, payload)
+            except RuntimeError:
+                # 订阅方事件循环已关闭
+                self.unsubscribe(sub)
+
+    def subscriber_count(self) -> int:
+        return len(self._subs)
+
+
+# 进程内单例
+event_bus = WorkflowEventBus()
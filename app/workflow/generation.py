@@ -0,0 +1,548 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/workflow/generation.py
+
+"""
+用例生成运行（GenerationRun）
+
+- 每个 workflow 同一时间只有一个 run（单例），在共享线程池中执行
+- 后来的调用方（双击 / 多标签页 / 重连）订阅同一 run：
+  先收到已产出的全部用例，再接收实时事件，不重复调用 LLM
+- 每条事件带 run 级 id（"<run_id>.<seq>"）；最近事件保存在环形缓冲里，
+  用例另追加到 run 级 JSONL spill
+- 断线重连携带 Last-Event-ID：只回放缺失部分（属于其他 run 的 id 视为全量回放）
+- 订阅队列有上限，跟不上的订阅方被断开，重连后从 spill 补齐
+- 生成过程中增量统计覆盖，定期推送 coverage 事件
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple, TypeVar
+
+from app.agents.orchestrator import Orchestrator
+from app.services.case_exporters import CaseOutputs, export_in_process
+from app.services.coverage import CoverageTracker
+from app.settings import (
+    COVERAGE_EVENT_EVERY,
+    MAX_CONCURRENT_TASKS,
+    GENERATION_EVENT_BUFFER,
+    GENERATION_RUN_RETENTION,
+    GENERATION_SPILL_DIR,
+    GENERATION_SUBSCRIBER_QUEUE,
+)
+from app.workflow.analyze import analyze_requirements
+from app.workflow.models import WorkflowStage
+from app.workflow.state import (
+    get_workflow,
+    update_workflow,
+    update_workflow_stage,
+)
+
+# 订阅队列中的结束标记
+RUN_FINISHED = object()
+# 订阅方消费过慢被断开
+SUBSCRIBER_DROPPED = object()
+
+# (seq, event, payload)，对外 id 见 GenerationRun.event_id
+GenerationEvent = Tuple[int, str, Dict[str, Any]]
+
+# 用例生成后台 worker（同时生成的 workflow 数上限，SSE 连接本身不占线程）
+_GENERATE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_TASKS,
+    thread_name_prefix="generate",
+)
+
+
+# =====================================================
+# 生成主体（运行在 _GENERATE_EXECUTOR 中）
+# =====================================================
+def run_generation(
+    workflow_id: str,
+    requirement: str,
+    emit: Callable[[str, Dict[str, Any]], None],
+):
+    """
+    同步生成主体，每产出一个事件调用 emit(event, payload)
+    """
+    writer: Optional[CaseOutputs] = None
+    try:
+        update_workflow_stage(workflow_id, WorkflowStage.GENERATING)
+
+        emit("meta", {"message": "generation_started"})
+
+        task = get_workflow(workflow_id)
+
+        # 没有测试点则补生成（保留原逻辑）
+        if not task.test_points:
+            analyze_requirements(
+                workflow_id=workflow_id,
+                raw_requirements=task.pdf_text,
+            )
+
+        refreshed = get_workflow(workflow_id)
+        if not refreshed or not refreshed.test_points:
+            raise RuntimeError("未生成测试点")
+
+        orch = Orchestrator()
+        # 生成过程只追加原始用例 spill，导出在结束后交给进程池
+        writer = CaseOutputs()
+
+        # 覆盖计数随用例增量更新（不必等生成结束再整体计算）
+        tracker = CoverageTracker(refreshed.test_points)
+
+        def emit_coverage():
+            snapshot = tracker.snapshot()
+            update_workflow(
+                workflow_id=workflow_id,
+                focus_hit_cases=snapshot["focus_cases"],
+            )
+            emit("coverage", snapshot)
+
+        # ⭐ 从 workflow 里拿到 focus_requirements（即使为空也不影响）
+        focus_requirements = getattr(refreshed, "focus_requirements", None)
+
+        for case in orch.run_streaming(
+            raw_requirements=refreshed.pdf_text,
+            test_points=refreshed.test_points,
+            confirmed_items=[],
+            requirement_hint=requirement,
+            analysis_result=refreshed.analysis_result,
+            focus_requirements=focus_requirements,  # ⭐ 透传给生成阶段
+        ):
+            writer.append(case)
+            tracker.add(case)
+            emit("case", case)
+
+            if COVERAGE_EVENT_EVERY > 0 and tracker.total_cases % COVERAGE_EVENT_EVERY == 0:
+                emit_coverage()
+
+        emit_coverage()
+
+        content_hash = writer.close()
+
+        # Excel 在导出进程中生成，生成线程只等待结果（不持有 GIL）
+        emit("meta", {"message": "exporting", "total": writer.count})
+        excel_path = export_in_process(content_hash, "xlsx")
+        if not excel_path:
+            raise RuntimeError("Excel 导出失败：用例缓存已被清理")
+
+        update_workflow(
+            workflow_id=workflow_id,
+            excel_path=excel_path,
+            total_cases=writer.count,
+            export_hash=content_hash,
+        )
+        update_workflow_stage(workflow_id, WorkflowStage.GENERATED)
+
+        emit("done", {
+            "total": writer.count,
+            "download_url": f"/workflow/download/{workflow_id}",
+        })
+
+    except Exception as e:
+        traceback.print_exc()
+        if writer is not None:
+            writer.abort()
+        update_workflow_stage(
+            workflow_id,
+            WorkflowStage.ERROR,
+            message=str(e),
+        )
+        emit("error", {"message": str(e)})
+
+
+# =====================================================
+# GenerationRun：事件缓冲 + 订阅分发
+# =====================================================
+class RunSubscription:
+    """
+    订阅队列有上限：消费过慢（队列写满）的订阅方被摘除并收到 SUBSCRIBER_DROPPED，
+    由客户端携带 Last-Event-ID 重连后从 spill 补齐，生成线程不会因此堆积内存
+    """
+
+    def __init__(
+        self,
+        run: "GenerationRun",
+        loop: asyncio.AbstractEventLoop,
+        maxsize: int = GENERATION_SUBSCRIBER_QUEUE,
+    ):
+        self.run = run
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+        self.dropped = False
+
+    def _put(self, item):
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped = True
+            self.run.unsubscribe(self)
+            # 丢弃积压，只留下断开标记
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(SUBSCRIBER_DROPPED)
+
+    async def get(self, timeout: Optional[float] = None):
+        """
+        下一条 GenerationEvent / RUN_FINISHED / SUBSCRIBER_DROPPED，超时返回 None
+        """
+        # 已有积压时直接取（wait_for 每次都要建 Task + 定时器）
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.run.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _put_all(subs: List[RunSubscription], item):
+    for sub in subs:
+        sub._put(item)
+
+
+class GenerationRun:
+    """
+    - 事件 id 为 "<run_id>.<seq>"：seq 在 run 内从 1 递增，
+      其他 run（或进程重启前）的 Last-Event-ID 不会误过滤本 run 的事件
+    - 内存中只保留最近 buffer_size 条事件；用例另追加到 run 级 JSONL spill，
+      晚到 / 重连的订阅方从 spill 回放更早的用例
+    """
+
+    def __init__(
+        self,
+        workflow_id: str,
+        requirement: str = "",
+        buffer_size: int = GENERATION_EVENT_BUFFER,
+    ):
+        self.workflow_id = workflow_id
+        self.requirement = requirement
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+        self._seq = 0
+        self._events: Deque[GenerationEvent] = deque(maxlen=max(1, buffer_size))
+        self._evicted_upto = 0          # 已被环形缓冲淘汰的最大非用例事件 seq
+        self._case_count = 0
+        self._subs: Set[RunSubscription] = set()      # 接收实时事件的订阅方
+        self._open: Set[RunSubscription] = set()      # 尚未关闭的订阅（可能仍在读 spill 回放）
+        self._discarded = False
+        self._lock = threading.Lock()
+
+        # 用例回放 spill：每行 [seq, payload]
+        os.makedirs(GENERATION_SPILL_DIR, exist_ok=True)
+        self._spill_path = os.path.join(
+            GENERATION_SPILL_DIR, f"{workflow_id}-{self.run_id}.jsonl"
+        )
+        self._spill = open(self._spill_path, "w", encoding="utf-8")
+        self._spill_bytes = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def case_count(self) -> int:
+        return self._case_count
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.run_id}.{seq}"
+
+    def start(self):
+        _GENERATE_EXECUTOR.submit(self._run)
+
+    def _run(self):
+        try:
+            run_generation(self.workflow_id, self.requirement, self.emit)
+        finally:
+            self.finish()
+
+    # -------------------------
+    # 生产侧（任意线程）
+    # -------------------------
+    def emit(self, event: str, payload: Dict[str, Any]):
+        with self._lock:
+            self._seq += 1
+            item = (self._seq, event, payload)
+
+            if event == "case":
+                self._case_count += 1
+                if self._spill is not None:
+                    line = json.dumps([self._seq, payload], ensure_ascii=False) + "\n"
+                    self._spill.write(line)
+                    self._spill.flush()
+                    self._spill_bytes += len(line.encode("utf-8"))
+
+            if len(self._events) == self._events.maxlen:
+                oldest = self._events[0]
+                if oldest[1] != "case":
+                    self._evicted_upto = oldest[0]
+            self._events.append(item)
+            targets = list(self._subs)
+
+        self._deliver(targets, item)
+
+    def finish(self):
+        with self._lock:
+            self.finished_at = time.time()
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+            targets = list(self._subs)
+
+        self._deliver(targets, RUN_FINISHED)
+
+    def _deliver(self, targets: List[RunSubscription], item):
+        """
+        生成线程 → 订阅方事件循环：事件到达即唤醒，无轮询
+
+        同一事件循环上的订阅方合并为一次 call_soon_threadsafe（每次都会写唤醒管道）
+        """
+        by_loop: Dict[asyncio.AbstractEventLoop, List[RunSubscription]] = {}
+        for sub in targets:
+            by_loop.setdefault(sub.loop, []).append(sub)
+
+        for loop, subs in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_put_all, subs, item)
+            except RuntimeError:
+                # 订阅方事件循环已关闭
+                for sub in subs:
+                    self.unsubscribe(sub)
+
+    def discard(self):
+        """
+        run 被清理时删除回放 spill；仍有未关闭的订阅（可能在回放）时推迟到最后一个关闭
+        """
+        with self._lock:
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+            self._discarded = True
+            remove = not self._open
+        if remove:
+            self._remove_spill()
+
+    def _remove_spill(self):
+        try:
+            os.remove(self._spill_path)
+        except OSError:
+            pass
+
+    # -------------------------
+    # 订阅侧（事件循环内）
+    # -------------------------
+    def subscribe(
+        self,
+        last_event_id: Optional[Tuple[str, int]] = None,
+    ) -> Tuple[RunSubscription, Iterator[GenerationEvent], bool]:
+        """
+        返回 (订阅, 需回放的事件迭代器, 是否有事件已被环形缓冲淘汰)
+
+        - last_event_id 为空或属于其他 run：新订阅方，回放全部已产出用例 + 缓冲内事件
+        - 否则只回放 seq 更大的事件
+
+        ⚠️ 回放快照（缓冲副本 + spill 偏移）与注册订阅在同一把锁内完成，保证不丢不重；
+        spill 在锁外按快照偏移读取（迭代器可能做文件 IO，调用方应放到线程池里消费）
+        """
+        sub = RunSubscription(self, asyncio.get_running_loop())
+
+        since = None
+        if last_event_id is not None and last_event_id[0] == self.run_id:
+            since = last_event_id[1]
+
+        with self._lock:
+            buffered = [e for e in self._events if e[0] > (since or 0)]
+            first_buffered = self._events[0][0] if self._events else self._seq + 1
+            spill_bytes = self._spill_bytes
+            truncated = since is not None and self._evicted_upto > since
+
+            if self.finished:
+                sub.queue.put_nowait(RUN_FINISHED)
+            else:
+                self._subs.add(sub)
+            self._open.add(sub)
+
+        backlog = itertools.chain(
+            self._replay_spill(since or 0, first_buffered, spill_bytes),
+            buffered,
+        )
+        return sub, backlog, truncated
+
+    def _replay_spill(
+        self,
+        since: int,
+        before: int,
+        upto_bytes: int,
+    ) -> Iterator[GenerationEvent]:
+        """
+        spill 中 since < seq < before 的用例（只读到快照时的偏移）
+        """
+        if since + 1 >= before or upto_bytes <= 0:
+            return
+        try:
+            fp = open(self._spill_path, "rb")
+        except OSError:
+            return
+        with fp:
+            read = 0
+            for raw in fp:
+                read += len(raw)
+                if read > upto_bytes:
+                    break
+                seq, payload = json.loads(raw)
+                if seq >= before:
+                    break
+                if seq > since:
+                    yield seq, "case", payload
+
+    def unsubscribe(self, sub: RunSubscription):
+        """
+        停止向 sub 投递实时事件
+        """
+        with self._lock:
+            self._subs.discard(sub)
+
+    def release(self, sub: RunSubscription):
+        """
+        订阅关闭：run 已被清理且这是最后一个订阅时删除 spill
+        """
+        with self._lock:
+            self._subs.discard(sub)
+            self._open.discard(sub)
+            remove = self._discarded and not self._open
+        if remove:
+            self._remove_spill()
+
+
+# =====================================================
+# 进程内 run 注册表（workflow_id → 最近一次 run）
+# =====================================================
+_RUNS: Dict[str, GenerationRun] = {}
+_RUNS_LOCK = threading.Lock()
+
+T = TypeVar("T")
+
+
+class GenerationInProgressError(RuntimeError):
+    """
+    同一 workflow 已有生成在进行（SSE run 或后台 generate 任务），不再重复启动
+    """
+
+
+def _purge_finished_runs(now: float):
+    for wid, run in list(_RUNS.items()):
+        if run.finished and now - run.finished_at > GENERATION_RUN_RETENTION:
+            del _RUNS[wid]
+            run.discard()
+
+
+# 进程退出 / 崩溃时遗留的回放 spill：按 mtime 定期清理（进行中的 run 每条用例都会刷新 mtime）
+SPILL_SWEEP_INTERVAL = 600
+_last_spill_sweep = 0.0
+
+
+def _sweep_stale_spills(now: float):
+    global _last_spill_sweep
+    if now - _last_spill_sweep < SPILL_SWEEP_INTERVAL:
+        return
+    _last_spill_sweep = now
+
+    live = {os.path.basename(run._spill_path) for run in _RUNS.values()}
+    max_age = GENERATION_RUN_RETENTION + 3600
+    try:
+        names = os.listdir(GENERATION_SPILL_DIR)
+    except OSError:
+        return
+
+    for name in names:
+        path = os.path.join(GENERATION_SPILL_DIR, name)
+        if name in live or not name.endswith(".jsonl"):
+            continue
+        try:
+            if now - os.path.getmtime(path) > max_age:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def get_generation_run(workflow_id: str) -> Optional[GenerationRun]:
+    with _RUNS_LOCK:
+        _purge_finished_runs(time.time())
+        return _RUNS.get(workflow_id)
+
+
+def get_or_start_generation_run(
+    workflow_id: str,
+    requirement: str = "",
+) -> Tuple[GenerationRun, bool]:
+    """
+    workflow 级单例：已有进行中的 run 则直接复用
+
+    返回 (run, 是否新启动)
+    """
+    with _RUNS_LOCK:
+        now = time.time()
+        _purge_finished_runs(now)
+        _sweep_stale_spills(now)
+
+        previous = _RUNS.get(workflow_id)
+        if previous and not previous.finished:
+            return previous, False
+
+        # 后台 generate 任务（worker 进程）进行中时不再起 SSE run
+        from app.workflow.jobs import get_job_queue
+        if get_job_queue().has_active("generate", workflow_id):
+            raise GenerationInProgressError("后台生成任务进行中，请通过任务接口查看进度")
+
+        run = GenerationRun(workflow_id, requirement)
+        _RUNS[workflow_id] = run
+
+    if previous:
+        previous.discard()
+
+    run.start()
+    return run, True
+
+
+def unless_generation_running(workflow_id: str, action: Callable[[], T]) -> T:
+    """
+    没有进行中的 SSE run 时执行 action（提交后台 generate 任务），
+    与 get_or_start_generation_run 在同一把锁内判断，两条生成路径不会同时启动
+    """
+    with _RUNS_LOCK:
+        run = _RUNS.get(workflow_id)
+        if run and not run.finished:
+            raise GenerationInProgressError("该 workflow 正在生成用例（SSE）")
+        return action()
+
+
+def parse_last_event_id(value: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    Last-Event-ID 请求头 "<run_id>.<seq>" → (run_id, seq)（非法值视为未携带）
+    """
+    run_id, _, seq = (value or "").strip().rpartition(".")
+    try:
+        return (run_id, int(seq)) if run_id else None
+    except ValueError:
+        return None
+
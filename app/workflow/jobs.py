@@ -0,0 +1,221 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/workflow/jobs.py
+
+from typing import Dict, Any, Optional
+
+from app.services.job_queue import JobQueue, JobStatus, ActiveJobError
+from app.services.jobs import (
+    JobWorkerPool,
+    JobResultApplier,
+    parse_job_concurrency,
+)
+from app.settings import JOB_QUEUE_DB, JOB_CONCURRENCY
+from app.workflow.generation import GenerationInProgressError, unless_generation_running
+from app.workflow.models import WorkflowStage
+from app.workflow.state import (
+    get_workflow,
+    update_workflow,
+    update_workflow_stage,
+)
+
+# =====================================================
+# 单例（API 进程内）
+# =====================================================
+_QUEUE: Optional[JobQueue] = None
+_POOL: Optional[JobWorkerPool] = None
+_APPLIER: Optional[JobResultApplier] = None
+
+# 提交时的阶段 / 完成时的阶段
+_RUNNING_STAGE = {
+    "parse": WorkflowStage.IDLE,
+    "analyze": WorkflowStage.ANALYZING,
+    "generate": WorkflowStage.GENERATING,
+}
+_DONE_STAGE = {
+    "parse": WorkflowStage.FILE_READY,
+    "analyze": WorkflowStage.ANALYSIS_DONE,
+    "generate": WorkflowStage.GENERATED,
+}
+
+
+def get_job_queue() -> JobQueue:
+    global _QUEUE
+    if _QUEUE is None:
+        _QUEUE = JobQueue(JOB_QUEUE_DB)
+    return _QUEUE
+
+
+class ParseInProgressError(RuntimeError):
+    """
+    PDF 仍在后台解析（只有部分文本），不能生成
+    """
+
+
+# =====================================================
+# 提交任务（payload 从 workflow 当前状态构建）
+# =====================================================
+def submit_workflow_job(
+    workflow_id: str,
+    job_type: str,
+    *,
+    requirement: str = "",
+) -> str:
+    task = get_workflow(workflow_id)
+    if not task:
+        raise LookupError("Workflow not found")
+
+    if job_type == "parse":
+        if not task.pdf_path:
+            raise ValueError("PDF 尚未上传")
+        payload: Dict[str, Any] = {"pdf_path": task.pdf_path}
+
+    elif job_type == "analyze":
+        if not task.pdf_text:
+            raise ValueError("PDF 尚未上传")
+        payload = {"raw_requirements": task.pdf_text}
+
+    elif job_type == "generate":
+        if not task.pdf_text:
+            raise ValueError("PDF 尚未上传")
+        # ⚠️ 提前分析可用部分文本，生成必须等全文解析完成
+        if not task.parse_done:
+            raise ParseInProgressError("PDF 仍在解析中，解析完成后再生成用例")
+        payload = {
+            "workflow_id": workflow_id,
+            "pdf_text": task.pdf_text,
+            "test_points": task.test_points,
+            "analysis_result": task.analysis_result,
+            "focus_requirements": task.focus_requirements,
+            "requirement": requirement,
+        }
+
+    else:
+        raise ValueError(f"Unsupported job type: {job_type}")
+
+    # 提交时的 PDF 版本：回写时 workflow 已换了 PDF / 被重置则丢弃结果
+    payload["pdf_sha256"] = task.pdf_sha256
+
+    queue = get_job_queue()
+    if job_type == "generate":
+        # ⭐ 与 SSE 生成（GenerationRun）互斥，同一 workflow 同时只跑一次生成
+        try:
+            job_id = unless_generation_running(
+                workflow_id,
+                lambda: queue.submit(
+                    job_type, payload, workflow_id=workflow_id, exclusive=True
+                ),
+            )
+        except ActiveJobError:
+            raise GenerationInProgressError("后台生成任务已在排队 / 执行")
+    else:
+        job_id = queue.submit(job_type, payload, workflow_id=workflow_id)
+    update_workflow_stage(
+        workflow_id,
+        _RUNNING_STAGE[job_type],
+        message=f"后台任务排队中（{job_type}）",
+    )
+    return job_id
+
+
+# =====================================================
+# 结果回写 workflow（由 JobResultApplier 调用）
+# =====================================================
+def apply_job_result(job: Dict[str, Any]):
+    workflow_id = job.get("workflow_id")
+    if not workflow_id:
+        return
+
+    task = get_workflow(workflow_id, include_blobs=False)
+    if not task:
+        return
+
+    # 过期结果（提交后重新上传 / 重置过）不覆盖当前 workflow
+    if (job.get("payload") or {}).get("pdf_sha256") != task.pdf_sha256:
+        return
+
+    if job["status"] == JobStatus.ERROR:
+        update_workflow_stage(
+            workflow_id,
+            WorkflowStage.ERROR,
+            message=job.get("error"),
+        )
+        return
+
+    result = job.get("result") or {}
+
+    if job["type"] == "parse":
+        update_workflow(
+            workflow_id=workflow_id,
+            pdf_text=result.get("pdf_text"),
+            total_pages=result.get("total_pages"),
+            parsed_pages=result.get("total_pages") or 0,
+            parse_done=True,
+        )
+    else:
+        update_workflow(
+            workflow_id=workflow_id,
+            **{
+                k: v for k, v in result.items()
+                if k in (
+                    "analysis_result",
+                    "test_points",
+                    "excel_path",
+                    "total_cases",
+                    "export_hash",
+                    "focus_hit_cases",
+                )
+            },
+        )
+
+    update_workflow_stage(workflow_id, _DONE_STAGE[job["type"]])
+
+
+def public_job_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    对外返回的任务视图（不回传 pdf_text 等大字段）
+    """
+    result = job.get("result") or {}
+    return {
+        "job_id": job["id"],
+        "job_type": job["type"],
+        "workflow_id": job.get("workflow_id"),
+        "status": job["status"],
+        "error": job.get("error"),
+        "created_at": job.get("created_at"),
+        "started_at": job.get("started_at"),
+        "finished_at": job.get("finished_at"),
+        "result": {
+            k: v for k, v in result.items()
+            if k in ("total_pages", "excel_path", "total_cases")
+        },
+    }
+
+
+# =====================================================
+# 生命周期（main.py lifespan 调用）
+# =====================================================
+def start_job_runtime():
+    global _POOL, _APPLIER
+
+    concurrency = parse_job_concurrency(JOB_CONCURRENCY)
+    if not any(concurrency.values()):
+        return
+
+    _POOL = JobWorkerPool(JOB_QUEUE_DB, concurrency)
+    _POOL.start()
+
+    _APPLIER = JobResultApplier(get_job_queue(), apply_job_result)
+    _APPLIER.start()
+
+
+def stop_job_runtime():
+    global _POOL, _APPLIER
+
+    if _APPLIER:
+        _APPLIER.stop()
+        _APPLIER = None
+
+    if _POOL:
+        _POOL.stop()
+        _POOL = None
@@ -2,7 +2,10 @@
 # coding=utf-8
 # app/workflow/merge.py
 
-from typing import List, Optional, Dict, Any
+import re
+from typing import List, Optional, Dict, Any, Tuple
+
+from app.settings import GENERATION_CONTEXT_TOKENS
 
 
 # =====================================================
@@ -16,6 +19,94 @@ DEFAULT_WEIGHTS = {
 }
 
 
+# =====================================================
+# token 估算 / 句子边界截断
+# =====================================================
+# 中日韩字符约 1 token / 字，其余约 4 字符 / token（无需 tokenizer 依赖）
+_CJK_PATTERN = re.compile(r"[\u3000-\u30ff\u3400-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+# 句末标点 / 换行之后切分
+_SENTENCE_PATTERN = re.compile(r"[^。！？!?；;\n]*(?:[。！？!?；;]+|\n+|$)")
+
+TRUNCATED_MARK = "……（以下内容因长度限制已省略）"
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    if not text:
+        return 0
+    _, cjk = _CJK_PATTERN.subn("", text)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> Tuple[str, bool]:
+    """
+    按句子边界截断到 max_tokens 以内，返回 (文本, 是否截断)
+
+    首句本身超长时按字符硬截断
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text, False
+
+    budget = max_tokens - estimate_tokens(TRUNCATED_MARK)
+    kept: List[str] = []
+    used = 0
+
+    for m in _SENTENCE_PATTERN.finditer(text):
+        sentence = m.group()
+        if not sentence:
+            break
+        cost = estimate_tokens(sentence)
+        if used + cost > budget:
+            if not kept and budget > 0:
+                # 单句超长：按字符逐步收缩
+                cut = sentence[: budget]
+                while cut and estimate_tokens(cut) > budget:
+                    cut = cut[: len(cut) * 3 // 4]
+                kept.append(cut)
+            break
+        kept.append(sentence)
+        used += cost
+
+    kept_text = "".join(kept).rstrip()
+    return (kept_text + "\n" if kept_text else "") + TRUNCATED_MARK, True
+
+
+def allocate_token_budget(
+    sizes: Dict[str, int],
+    weights: Dict[str, float],
+    total: int,
+) -> Dict[str, int]:
+    """
+    按权重分配预算（水位法）：
+
+    - 每个块按 权重 / 权重和 分得份额
+    - 实际需要少于份额的块只拿所需，剩余预算按权重分给其余块
+    - 最终仍超出份额的块拿到自己的份额（需要截断）
+    """
+    allocation: Dict[str, int] = {}
+    remaining = dict(sizes)
+    budget = max(0, total)
+
+    while remaining:
+        weight_sum = sum(max(weights.get(k, 0), 0.01) for k in remaining)
+        share = {
+            k: budget * max(weights.get(k, 0), 0.01) / weight_sum
+            for k in remaining
+        }
+
+        fitting = [k for k, size in remaining.items() if size <= share[k]]
+        if not fitting:
+            for k in remaining:
+                allocation[k] = int(share[k])
+            break
+
+        for k in fitting:
+            allocation[k] = remaining.pop(k)
+            budget -= allocation[k]
+
+    return allocation
+
+
 # =====================================================
 # 核心：合并生成上下文
 # =====================================================
@@ -26,11 +117,15 @@ def merge_generation_context(
     focus_requirements: Optional[str] = None,   # ⭐ 新增
     analysis_result: Optional[Dict[str, Any]] = None,
     weights: Dict[str, float] = DEFAULT_WEIGHTS,
+    max_tokens: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     将【测试重点 + 用户需求 + AI 分析结果 + 原始需求】合并，
     生成测试用例生成阶段的统一输入上下文。
 
+    - 总长度受 max_tokens 约束（默认 GENERATION_CONTEXT_TOKENS，<= 0 不限制），
+      各块按权重分配预算，超出的块在句子边界截断（低权重的原始需求最先被压缩）
+
     返回：
         {
             "merged_requirements": str,
@@ -38,33 +133,40 @@ def merge_generation_context(
             "meta": {...}
         }
     """
+    if max_tokens is None:
+        max_tokens = GENERATION_CONTEXT_TOKENS
 
-    merged_blocks: List[str] = []
+    # (预算 key, 标题, 正文, 结尾附注)
+    blocks: List[Tuple[str, str, str, str]] = []
     priority_items: List[str] = []
 
     # =================================================
     # 0️⃣ 用户明确指定的测试重点（最高优先级）
     # =================================================
     if focus_requirements:
-        merged_blocks.append(
-            f"""【用户指定测试重点｜权重 {weights['focus_requirements']}｜最高优先级】
-{focus_requirements.strip()}
+        blocks.append((
+            "focus_requirements",
+            f"【用户指定测试重点｜权重 {weights['focus_requirements']}｜最高优先级】\n",
+            focus_requirements.strip(),
+            """
 
 ⚠️ 要求：
 - 以下测试用例必须明显偏向上述重点
 - 不允许只覆盖 happy path
-"""
-        )
+""",
+        ))
         priority_items.append("focus_requirements")
 
     # =================================================
     # 1️⃣ 用户手写 requirement
     # =================================================
     if user_requirement:
-        merged_blocks.append(
-            f"""【用户补充测试要求｜权重 {weights['user_requirement']}】
-{user_requirement.strip()}"""
-        )
+        blocks.append((
+            "user_requirement",
+            f"【用户补充测试要求｜权重 {weights['user_requirement']}】\n",
+            user_requirement.strip(),
+            "",
+        ))
         priority_items.append("user_requirement")
 
     # =================================================
@@ -76,38 +178,75 @@ def merge_generation_context(
         risks = analysis_result.get("risks") or []
 
         if suggestions:
-            merged_blocks.append(
-                f"""【AI 测试建议｜权重 {weights['ai_suggestion']}】
-""" + "\n".join(f"- {s}" for s in suggestions)
-            )
+            blocks.append((
+                "ai_suggestion",
+                f"【AI 测试建议｜权重 {weights['ai_suggestion']}】\n",
+                "\n".join(f"- {s}" for s in suggestions),
+                "",
+            ))
             priority_items.append("ai_suggestions")
 
+        # 缺陷 / 风险与 AI 建议同权重
         if issues:
-            merged_blocks.append(
-                """【AI 识别的需求缺陷】
-""" + "\n".join(f"- {i}" for i in issues)
-            )
+            blocks.append((
+                "ai_issues",
+                "【AI 识别的需求缺陷】\n",
+                "\n".join(f"- {i}" for i in issues),
+                "",
+            ))
 
         if risks:
-            merged_blocks.append(
-                """【AI 识别的风险点】
-""" + "\n".join(f"- {r}" for r in risks)
-            )
+            blocks.append((
+                "ai_risks",
+                "【AI 识别的风险点】\n",
+                "\n".join(f"- {r}" for r in risks),
+                "",
+            ))
 
     # =================================================
     # 3️⃣ 原始需求文本（兜底）
     # =================================================
     if raw_requirements:
-        merged_blocks.append(
-            f"""【原始需求文档｜权重 {weights['raw_requirement']}】
-{raw_requirements.strip()}"""
-        )
+        blocks.append((
+            "raw_requirement",
+            f"【原始需求文档｜权重 {weights['raw_requirement']}】\n",
+            raw_requirements.strip(),
+            "",
+        ))
         priority_items.append("raw_requirement")
 
     # =================================================
-    # 4️⃣ 合并结果
+    # 4️⃣ 按权重分配 token 预算
+    # =================================================
+    truncated: List[str] = []
+
+    if max_tokens and max_tokens > 0:
+        block_weights = {
+            key: weights.get(key, weights.get("ai_suggestion", 0.8))
+            for key, _, _, _ in blocks
+        }
+        overhead = sum(
+            estimate_tokens(title) + estimate_tokens(tail) + 1
+            for _, title, _, tail in blocks
+        )
+        allocation = allocate_token_budget(
+            {key: estimate_tokens(body) for key, _, body, _ in blocks},
+            block_weights,
+            max_tokens - overhead,
+        )
+
+        fitted = []
+        for key, title, body, tail in blocks:
+            body, cut = truncate_to_tokens(body, allocation[key])
+            if cut:
+                truncated.append(key)
+            fitted.append((key, title, body, tail))
+        blocks = fitted
+
+    # =================================================
+    # 5️⃣ 合并结果
     # =================================================
-    merged_text = "\n\n".join(merged_blocks)
+    merged_text = "\n\n".join(title + body + tail for _, title, body, tail in blocks)
 
     return {
         "merged_requirements": merged_text,
@@ -117,5 +256,8 @@ def merge_generation_context(
             "has_focus_requirements": bool(focus_requirements),
             "has_user_requirement": bool(user_requirement),
             "has_analysis": bool(analysis_result),
+            "token_budget": max_tokens,
+            "estimated_tokens": estimate_tokens(merged_text),
+            "truncated_blocks": truncated,
         },
     }
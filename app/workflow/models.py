@@ -32,10 +32,12 @@ class WorkflowStage(str, Enum):
 # =====================================================
 # WorkflowTask（内存态 Workflow，全量）
 # =====================================================
-@dataclass
+@dataclass(frozen=True)
 class WorkflowTask:
     """
     一个 workflow = 用户一次完整操作
+
+    ⚠️ 不可变快照：修改只能走 state.py（内部用 dataclasses.replace 生成新版本）
     """
 
     # =================================================
@@ -63,6 +65,12 @@ class WorkflowTask:
     # =================================================
     pdf_path: Optional[str] = None
     pdf_text: Optional[str] = None
+    pdf_sha256: Optional[str] = None
+
+    # ⭐ 流式解析进度（后台逐页解析）
+    parsed_pages: int = 0
+    total_pages: Optional[int] = None
+    parse_done: bool = False
 
     # =================================================
     # 🤖 AI 分析 / 生成相关
@@ -73,6 +81,7 @@ class WorkflowTask:
     task_id: Optional[str] = None
     excel_path: Optional[str] = None
     total_cases: Optional[int] = None
+    export_hash: Optional[str] = None       # 用例集内容哈希（导出缓存键 / 下载 ETag）
 
     # =================================================
     # 🎯 补充测试重点（⭐核心新增）
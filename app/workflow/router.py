@@ -8,18 +8,20 @@ from fastapi import (
     UploadFile,
     File,
     Form,
+    Header,
+    Request,
 )
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Generator
+from starlette.concurrency import run_in_threadpool
+from typing import Optional, AsyncGenerator
+import itertools
 import uuid
 import os
-import shutil
-import json
 import time
-import queue
-import threading
+import asyncio
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 from app.workflow.models import WorkflowStage
 from app.workflow.state import (
@@ -29,17 +31,67 @@ from app.workflow.state import (
     update_workflow_stage,
     reset_workflow,
     get_workflow_progress,
+    get_store_stats,
+    workflow_status_snapshot,
+)
+from app.workflow.events import event_bus
+from app.workflow.sse import (
+    SSE_HEARTBEAT_SECONDS,
+    SSE_HEADERS,
+    SseCaseBatcher,
+    compress_sse_stream,
+    negotiate_sse_encoding,
+    sse_headers,
+    sse_pack,
+    sse_ping,
 )
 from app.workflow.analyze import analyze_requirements
-from app.services.pdf_parser import parse_pdf
-from app.services.excel_exporter import export_cases_to_excel
-from app.agents.orchestrator import Orchestrator
-from app.settings import TMP_DIR
+from app.workflow.generation import (
+    RUN_FINISHED,
+    SUBSCRIBER_DROPPED,
+    get_generation_run,
+    get_or_start_generation_run,
+    parse_last_event_id,
+    GenerationInProgressError,
+)
+from app.workflow.jobs import (
+    get_job_queue,
+    submit_workflow_job,
+    public_job_view,
+    ParseInProgressError,
+)
+from app.services.job_queue import JobStatus
+from app.services.jobs import is_job_finished
+from app.services.pdf_parser import iter_parse_pdf, PageTextSpill
+from app.services.case_exporters import (
+    CASE_WRITERS,
+    EXPORT_FORMATS,
+    ExportFormatUnavailable,
+    export_in_process,
+)
+from app.services.export_cache import conditional_file_response
+from app.services.ingest import save_upload_streaming, UploadTooLargeError
+from app.settings import (
+    TMP_DIR,
+    EARLY_ANALYZE_PAGES,
+    MAX_UPLOAD_BYTES,
+    MAX_CONCURRENT_TASKS,
+)
 
 router = APIRouter(tags=["workflow"])
 os.makedirs(TMP_DIR, exist_ok=True)
 
-DONE = object()
+# PDF 解析后台 worker（避免每次上传起一个线程）
+_PARSE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_TASKS,
+    thread_name_prefix="pdf-parse",
+)
+
+# SSE 重连回放每次写出的事件数（回放大量用例时分块，不一次拼成大字符串）
+REPLAY_CHUNK_EVENTS = 500
+
+# /jobs/{job_id}/stream 轮询任务表的间隔（秒）
+JOB_STREAM_POLL_SECONDS = 0.5
 
 
 # =====================================================
@@ -58,12 +110,22 @@ class WorkflowStatusResponse(BaseModel):
     message: Optional[str] = None
     excel_path: Optional[str] = None
     total_cases: Optional[int] = None
+    focus_hit_cases: Optional[int] = None
+    parsed_pages: int = 0
+    total_pages: Optional[int] = None
+    parse_done: bool = False
 
 
 class WorkflowAnalyzeRequest(BaseModel):
     workflow_id: str
 
 
+class JobSubmitRequest(BaseModel):
+    workflow_id: str
+    job_type: str               # parse | analyze | generate
+    requirement: str = ""
+
+
 class WorkflowAnalyzeResponse(BaseModel):
     summary: dict
     requirements: list
@@ -72,19 +134,6 @@ class WorkflowAnalyzeResponse(BaseModel):
     suggestions: list
 
 
-# =====================================================
-# SSE helpers
-# =====================================================
-
-def sse_pack(event: str, data: dict) -> str:
-    # ✅ ensure_ascii=False 保证中文不被转义
-    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
-
-
-def sse_ping() -> str:
-    return ": ping\n\n"
-
-
 # =====================================================
 # 1️⃣ 创建 workflow
 # =====================================================
@@ -105,7 +154,7 @@ def create_new_workflow():
 # =====================================================
 @router.get("/status/{workflow_id}", response_model=WorkflowStatusResponse)
 def get_workflow_status(workflow_id: str):
-    task = get_workflow(workflow_id)
+    task = get_workflow(workflow_id, include_blobs=False)
     if not task:
         raise HTTPException(404, "Workflow not found")
 
@@ -120,49 +169,215 @@ def get_workflow_status(workflow_id: str):
         message=progress.message,
         excel_path=task.excel_path,
         total_cases=task.total_cases,
+        focus_hit_cases=task.focus_hit_cases,
+        parsed_pages=task.parsed_pages,
+        total_pages=task.total_pages,
+        parse_done=task.parse_done,
     )
 
 
 # =====================================================
-# 3️⃣ 上传 PDF
+# 3️⃣ 上传 PDF（202 立即返回 · 后台逐页解析）
 # =====================================================
-@router.post("/upload-pdf")
-def upload_pdf(
+def _parse_pdf_in_background(workflow_id: str, file_path: str):
+    """
+    后台逐页解析：
+    - 每页解析完更新进度
+    - 前 EARLY_ANALYZE_PAGES 页完成后即写入 pdf_text，允许提前分析
+    - 全部完成后写入完整文本
+
+    ⚠️ file_path 每次上传唯一，作为本次解析的令牌：所有写入都以
+       pdf_path == file_path 为条件，重新上传后旧解析线程写不进去并尽快退出
+    """
+    early_ready = False
+    spill = PageTextSpill()
+    token = {"pdf_path": file_path}
+
+    try:
+        for page_result in iter_parse_pdf(file_path):
+            spill.add(page_result)
+            page_no = page_result["page"]
+            total_pages = page_result["total_pages"]
+
+            if not update_workflow(
+                workflow_id=workflow_id,
+                expect=token,
+                parsed_pages=page_no,
+                total_pages=total_pages,
+            ):
+                return  # 已被重新上传 / 重置 / 删除
+
+            # ⚠️ 先看 has_text 再读回：前几页无文本（扫描件 / 空白页）时
+            #    不会每页都把 spill 整个重读一遍
+            if (
+                not early_ready
+                and spill.has_text
+                and page_no >= min(EARLY_ANALYZE_PAGES, total_pages)
+            ):
+                confirmed_text, ocr_text = spill.read()
+                partial_text = (confirmed_text + "\n" + ocr_text).strip()
+                if partial_text:
+                    early_ready = True
+                    if not update_workflow(
+                        workflow_id=workflow_id,
+                        expect=token,
+                        pdf_text=partial_text,
+                    ):
+                        return
+                    _mark_file_ready(
+                        workflow_id,
+                        file_path,
+                        f"已解析前 {page_no}/{total_pages} 页，可开始需求分析",
+                    )
+
+        confirmed_text, ocr_text = spill.read()
+        raw_text = (confirmed_text + "\n" + ocr_text).strip()
+
+        if not raw_text:
+            raise RuntimeError("PDF 解析失败")
+
+        if update_workflow(
+            workflow_id=workflow_id,
+            expect=token,
+            pdf_text=raw_text,
+            parse_done=True,
+        ):
+            _mark_file_ready(workflow_id, file_path, "需求文档解析完成")
+
+    except Exception as e:
+        traceback.print_exc()
+        # ⚠️ 先置 ERROR 再标记完成，订阅方看到 parse_done 时阶段已确定
+        if update_workflow_stage(
+            workflow_id,
+            WorkflowStage.ERROR,
+            message=str(e),
+            expect=token,
+        ):
+            update_workflow(workflow_id=workflow_id, expect=token, parse_done=True)
+    finally:
+        spill.close()
+
+
+def _mark_file_ready(workflow_id: str, file_path: str, message: str):
+    # ⚠️ 分析 / 生成已开始时不回退阶段（阶段与上传令牌一起作为写入条件）
+    task = get_workflow(workflow_id, include_blobs=False)
+    if task and task.stage in (WorkflowStage.IDLE, WorkflowStage.FILE_READY):
+        update_workflow_stage(
+            workflow_id,
+            WorkflowStage.FILE_READY,
+            message=message,
+            expect={"pdf_path": file_path, "stage": task.stage},
+        )
+
+
+@router.post("/upload-pdf", status_code=202)
+async def upload_pdf(
     workflow_id: str = Form(...),
     file: UploadFile = File(...),
 ):
-    task = get_workflow(workflow_id)
+    # ⚠️ workflow 存储是同步调用（sqlite / spill 读写），放到线程池
+    task = await run_in_threadpool(get_workflow, workflow_id, include_blobs=False)
     if not task:
         raise HTTPException(404, "Workflow not found")
 
-    file_path = os.path.join(TMP_DIR, f"{workflow_id}_{file.filename}")
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
-
-    pdf_data = parse_pdf(file_path)
-    raw_text = (
-        (pdf_data.get("confirmed_text") or "")
-        + "\n"
-        + (pdf_data.get("ocr_text") or "")
-    ).strip()
+    filename = os.path.basename(file.filename or "upload.pdf")
+    # ⭐ 每次上传一个新路径：同时作为后台解析的令牌（见 _parse_pdf_in_background）
+    file_path = os.path.join(
+        TMP_DIR, f"{workflow_id}_{uuid.uuid4().hex[:8]}_{filename}"
+    )
 
-    if not raw_text:
-        raise HTTPException(400, "PDF 解析失败")
+    # ⭐ 分块落盘 + 边写边算 hash，不阻塞事件循环
+    try:
+        saved = await save_upload_streaming(file, file_path, MAX_UPLOAD_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(413, str(e))
 
-    update_workflow(
+    await run_in_threadpool(
+        update_workflow,
         workflow_id=workflow_id,
         pdf_path=file_path,
-        pdf_text=raw_text,
+        pdf_text=None,
+        pdf_sha256=saved["sha256"],
+        parsed_pages=0,
+        total_pages=None,
+        parse_done=False,
     )
-    update_workflow_stage(workflow_id, WorkflowStage.FILE_READY)
+    await run_in_threadpool(
+        update_workflow_stage,
+        workflow_id,
+        WorkflowStage.IDLE,
+        message="正在解析需求文档",
+    )
+
+    # ⭐ 解析交给后台 worker（有界线程池）
+    _PARSE_EXECUTOR.submit(_parse_pdf_in_background, workflow_id, file_path)
 
     return {
         "workflow_id": workflow_id,
-        "filename": file.filename,
-        "text_length": len(raw_text),
+        "filename": filename,
+        "size": saved["size"],
+        "sha256": saved["sha256"],
+        "progress_url": f"/workflow/upload-pdf/stream/{workflow_id}",
     }
 
 
+@router.get("/upload-pdf/stream/{workflow_id}")
+async def upload_pdf_progress_stream(workflow_id: str):
+    """
+    解析进度 SSE（事件总线推送）：
+    - progress：每解析完一页
+    - done：全部解析完成
+    - error：解析失败
+    """
+    if not await run_in_threadpool(get_workflow, workflow_id, include_blobs=False):
+        raise HTTPException(404, "Workflow not found")
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        # ⚠️ 先订阅再读快照，避免漏掉中间的事件
+        with event_bus.subscribe([workflow_id]) as sub:
+            yield sse_pack("meta", {"message": "connected"})
+
+            last_parsed = -1
+            task = await run_in_threadpool(get_workflow, workflow_id, include_blobs=False)
+
+            while True:
+                if not task:
+                    yield sse_pack("error", {"message": "Workflow not found"})
+                    break
+
+                if task.parsed_pages != last_parsed:
+                    last_parsed = task.parsed_pages
+                    yield sse_pack("progress", {
+                        "parsed_pages": task.parsed_pages,
+                        "total_pages": task.total_pages,
+                        "analyzable": task.stage == WorkflowStage.FILE_READY,
+                    })
+
+                if task.parse_done:
+                    if task.is_error():
+                        yield sse_pack("error", {"message": task.message})
+                    else:
+                        full = await run_in_threadpool(get_workflow, workflow_id)
+                        yield sse_pack("done", {
+                            "parsed_pages": task.parsed_pages,
+                            "total_pages": task.total_pages,
+                            "text_length": len((full and full.pdf_text) or ""),
+                        })
+                    break
+
+                if await sub.get(timeout=SSE_HEARTBEAT_SECONDS) is None:
+                    yield sse_ping()
+                    continue
+
+                task = await run_in_threadpool(get_workflow, workflow_id, include_blobs=False)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream; charset=utf-8",
+        headers=SSE_HEADERS,
+    )
+
+
 # =====================================================
 # 4️⃣ AI 需求分析
 # =====================================================
@@ -203,129 +418,169 @@ def analyze_workflow(req: WorkflowAnalyzeRequest):
 # 5️⃣ AI 测试用例生成（SSE · 工程级稳定版）
 # =====================================================
 @router.get("/generate/stream")
-def generate_testcases_stream(
+async def generate_testcases_stream(
     workflow_id: str,
     requirement: str = "",
+    batch_size: int = 1,
+    batch_ms: int = 50,
+    compress: bool = False,
+    last_event_id: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
 ):
-    task = get_workflow(workflow_id)
-    if not task:
-        raise HTTPException(404, "Workflow not found")
-
-    if not task.pdf_text:
-        raise HTTPException(400, "PDF 尚未上传")
-
-    q: "queue.Queue" = queue.Queue()
-
-    def worker():
-        try:
-            update_workflow_stage(workflow_id, WorkflowStage.GENERATING)
-
-            q.put(("meta", {"message": "generation_started"}))
-
-            # 没有测试点则补生成（保留你原逻辑）
-            if not task.test_points:
-                analyze_requirements(
-                    workflow_id=workflow_id,
-                    raw_requirements=task.pdf_text,
-                )
-
-            refreshed = get_workflow(workflow_id)
-            if not refreshed or not refreshed.test_points:
-                raise RuntimeError("未生成测试点")
+    """
+    用例生成 SSE
+
+    - 同一 workflow 同时只跑一次生成，重复调用订阅同一 run
+      （先补发已产出用例，再接收实时事件）
+    - 每条事件带 id（"<run_id>.<seq>"），断线后浏览器 EventSource 自动携带 Last-Event-ID 重连
+    - 重连时回放缺失事件，并接上仍在进行的生成（不重新生成）；
+      id 不属于当前 run（新 run / 进程重启）时全量回放
+    - 消费过慢的连接收到 meta: slow_consumer 后被断开，重连即可从断点补齐
+    - batch_size > 1：连续用例合并为 cases 帧（攒满或超过 batch_ms 即发送）
+    - compress=true：按 Accept-Encoding 协商 gzip / deflate，每帧同步刷新
+    - coverage 事件：每 COVERAGE_EVENT_EVERY 条用例推送一次覆盖快照
+    """
+    resume_from = parse_last_event_id(last_event_id)
+    # ⚠️ run 注册表操作会做文件 IO（spill 创建 / 过期 spill 清理），放到线程池
+    run = (
+        await run_in_threadpool(get_generation_run, workflow_id)
+        if resume_from is not None else None
+    )
+    attached = run is not None
 
-            orch = Orchestrator()
-            collected = []
+    if run is None:
+        task = await run_in_threadpool(get_workflow, workflow_id)
+        if not task:
+            raise HTTPException(404, "Workflow not found")
 
-            # ⭐ 从 workflow 里拿到 focus_requirements（即使为空也不影响）
-            focus_requirements = getattr(refreshed, "focus_requirements", None)
+        if not task.pdf_text:
+            raise HTTPException(400, "PDF 尚未上传")
 
-            for case in orch.run_streaming(
-                raw_requirements=refreshed.pdf_text,
-                test_points=refreshed.test_points,
-                confirmed_items=[],
-                requirement_hint=requirement,
-                analysis_result=refreshed.analysis_result,
-                focus_requirements=focus_requirements,  # ⭐ 透传给生成阶段
-            ):
-                collected.append(case)
-                q.put(("case", case))
+        # ⚠️ 提前分析可用部分文本，生成必须等全文解析完成
+        if not task.parse_done:
+            raise HTTPException(409, "PDF 仍在解析中，解析完成后再生成用例")
 
-            excel_path = export_cases_to_excel(collected, workflow_id)
-            update_workflow(
-                workflow_id=workflow_id,
-                excel_path=excel_path,
-                total_cases=len(collected),
-            )
-            update_workflow_stage(workflow_id, WorkflowStage.GENERATED)
-
-            q.put((
-                "done",
-                {
-                    "total": len(collected),
-                    "download_url": f"/workflow/download/{workflow_id}",
-                },
-            ))
-
-        except Exception as e:
-            traceback.print_exc()
-            update_workflow_stage(
-                workflow_id,
-                WorkflowStage.ERROR,
-                message=str(e),
+        try:
+            run, started = await run_in_threadpool(
+                get_or_start_generation_run, workflow_id, requirement
             )
-            q.put(("error", {"message": str(e)}))
-        finally:
-            q.put(DONE)
-
-    threading.Thread(target=worker, daemon=True).start()
-
-    def event_stream() -> Generator[str, None, None]:
-        # ⭐ 首包，立刻防止前端超时
-        yield sse_pack("meta", {"message": "connected"})
-
-        last_send = time.time()
-
-        while True:
-            try:
-                item = q.get(timeout=0.5)
-                if item is DONE:
+        except GenerationInProgressError as e:
+            raise HTTPException(409, str(e))
+        attached = not started
+
+    encoding = negotiate_sse_encoding(accept_encoding) if compress else None
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        sub, backlog, truncated = run.subscribe(resume_from)
+        batcher = SseCaseBatcher(batch_size, batch_ms)
+
+        with sub:
+            # ⭐ 首包，立刻防止前端超时
+            yield sse_pack("meta", {
+                "message": "connected",
+                # attached=True：复用进行中 / 刚结束的 run，未重新生成
+                "attached": attached,
+                "backlog_cases": run.case_count,
+            })
+
+            if truncated:
+                # 部分非用例事件已被环形缓冲淘汰（用例全量保留，不受影响）
+                yield sse_pack("meta", {"message": "replay_truncated"})
+
+            def frame(item) -> str:
+                seq, event, payload = item
+                return batcher.add(run.event_id(seq), event, payload)
+
+            # 回放按块写出（早期用例来自 spill 文件，在线程池中读取）
+            while True:
+                chunk = await run_in_threadpool(
+                    list, itertools.islice(backlog, REPLAY_CHUNK_EVENTS)
+                )
+                if not chunk:
+                    break
+                replay = "".join(frame(item) for item in chunk)
+                if replay:
+                    yield replay
+
+            tail = batcher.flush()
+            if tail:
+                yield tail
+
+            while True:
+                item = await sub.get(timeout=batcher.timeout(SSE_HEARTBEAT_SECONDS))
+                if item is None:
+                    if batcher.has_pending:
+                        # 延迟预算用完，发送当前批次
+                        yield batcher.flush()
+                    else:
+                        # 心跳保活
+                        yield sse_ping()
+                    continue
+
+                if item is RUN_FINISHED or item is SUBSCRIBER_DROPPED:
+                    tail = batcher.flush()
+                    if tail:
+                        yield tail
+                    if item is SUBSCRIBER_DROPPED:
+                        # 客户端带 Last-Event-ID 重连即可续上
+                        yield sse_pack("meta", {"message": "slow_consumer"})
                     break
 
-                event, payload = item
-                yield sse_pack(event, payload)
-                last_send = time.time()
+                data = frame(item)
+                if data:
+                    yield data
 
-            except queue.Empty:
-                # 心跳保活
-                if time.time() - last_send > 10:
-                    yield sse_ping()
-                    last_send = time.time()
+    body = event_stream()
+    if encoding:
+        body = compress_sse_stream(body, encoding)
 
     return StreamingResponse(
-        event_stream(),
+        body,
         # ✅ 关键：明确 charset，避免 EventStream 中文乱码
         media_type="text/event-stream; charset=utf-8",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no",
-            # ✅ 双保险：某些代理/中间层会覆盖 media_type
-            "Content-Type": "text/event-stream; charset=utf-8",
-        },
+        headers=sse_headers(encoding),
     )
 
 
 # =====================================================
-# 6️⃣ 下载 Excel
+# 6️⃣ 下载用例（xlsx / csv / jsonl / parquet）
 # =====================================================
 @router.get("/download/{workflow_id}")
-def download_excel(workflow_id: str):
-    task = get_workflow(workflow_id)
-    if task and task.excel_path and os.path.exists(task.excel_path):
-        return FileResponse(
-            task.excel_path,
-            filename=os.path.basename(task.excel_path),
+def download_excel(request: Request, workflow_id: str, format: str = "xlsx"):
+    """
+    format：
+    - xlsx（默认）：生成时增量写入的 Excel
+    - csv / jsonl / parquet：首次请求时从原始用例 spill 流式转换并缓存
+
+    ETag = 导出文件字节的 sha256（按文件记忆）；支持 If-None-Match（304）与 Range（206）
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(400, f"不支持的导出格式：{format}")
+
+    task = get_workflow(workflow_id, include_blobs=False)
+    if not task:
+        raise HTTPException(404, "Workflow not found")
+
+    path = None
+    if task.export_hash:
+        try:
+            path = export_in_process(task.export_hash, format)
+        except ExportFormatUnavailable as e:
+            raise HTTPException(501, str(e))
+    elif format == "xlsx":
+        # 旧数据没有 export_hash：直接使用生成时的文件
+        path = task.excel_path
+
+    if path and os.path.exists(path):
+        # ETag 由 conditional_file_response 按文件内容计算：
+        # 缓存被淘汰后重新生成的文件字节不同，ETag 随之变化，Range 续传不会拼接两份文件
+        return conditional_file_response(
+            request,
+            path,
+            filename=f"{workflow_id}{CASE_WRITERS[format].extension}",
+            media_type=CASE_WRITERS[format].media_type,
         )
-    raise HTTPException(404, "Excel 不存在")
+    raise HTTPException(404, "导出文件不存在")
 
 
 # =====================================================
@@ -341,3 +596,130 @@ def reset_workflow_api(workflow_id: str):
         "workflow_id": task.workflow_id,
         "stage": task.stage.value,
     }
+
+
+# =====================================================
+# 8️⃣ 状态推送（替代 /status 轮询）
+# =====================================================
+@router.get("/events")
+async def workflow_events(workflow_ids: str):
+    """
+    订阅一个或多个 workflow 的状态变化（逗号分隔）
+
+    - 连接后先推送每个 workflow 的当前状态
+    - 之后每次 stage / progress / 业务字段变化推送一条 status 事件
+    """
+    ids = [w.strip() for w in workflow_ids.split(",") if w.strip()]
+    if not ids:
+        raise HTTPException(400, "workflow_ids 不能为空")
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        with event_bus.subscribe(ids) as sub:
+            yield sse_pack("meta", {"message": "connected"})
+
+            for wid in ids:
+                task = await run_in_threadpool(get_workflow, wid, include_blobs=False)
+                if task:
+                    yield sse_pack("status", workflow_status_snapshot(task))
+                else:
+                    yield sse_pack("error", {
+                        "workflow_id": wid,
+                        "message": "Workflow not found",
+                    })
+
+            while True:
+                event = await sub.get(timeout=SSE_HEARTBEAT_SECONDS)
+                if event is None:
+                    yield sse_ping()
+                    continue
+                yield sse_pack(event["event"], event["data"])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream; charset=utf-8",
+        headers=SSE_HEADERS,
+    )
+
+
+# =====================================================
+# 9️⃣ 存储指标（常驻 workflow 字节数 gauge）
+# =====================================================
+@router.get("/metrics/store")
+def workflow_store_metrics():
+    return get_store_stats()
+
+
+# =====================================================
+# 🔟 后台任务（parse / analyze / generate）
+# =====================================================
+@router.post("/jobs", status_code=202)
+def submit_job(req: JobSubmitRequest):
+    try:
+        job_id = submit_workflow_job(
+            req.workflow_id,
+            req.job_type,
+            requirement=req.requirement,
+        )
+    except LookupError:
+        raise HTTPException(404, "Workflow not found")
+    except (ParseInProgressError, GenerationInProgressError) as e:
+        raise HTTPException(409, str(e))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+    return {
+        "job_id": job_id,
+        "status": JobStatus.QUEUED,
+        "status_url": f"/workflow/jobs/{job_id}",
+        "stream_url": f"/workflow/jobs/{job_id}/stream",
+    }
+
+
+@router.get("/jobs/{job_id}")
+def get_job_status(job_id: str):
+    job = get_job_queue().get(job_id)
+    if not job:
+        raise HTTPException(404, "Job not found")
+    return public_job_view(job)
+
+
+@router.get("/jobs/{job_id}/stream")
+async def job_status_stream(job_id: str):
+    """
+    任务状态 SSE：状态变化时推送，空闲期发送心跳（轮询 sqlite 在线程池中执行）
+    """
+    queue = get_job_queue()
+    if not await run_in_threadpool(queue.get, job_id):
+        raise HTTPException(404, "Job not found")
+
+    async def event_stream() -> AsyncGenerator[str, None]:
+        yield sse_pack("meta", {"message": "connected"})
+
+        last_status = None
+        last_send = time.monotonic()
+
+        while True:
+            job = await run_in_threadpool(queue.get, job_id)
+            if not job:
+                yield sse_pack("error", {"message": "Job not found"})
+                break
+
+            if job["status"] != last_status:
+                last_status = job["status"]
+                yield sse_pack("status", public_job_view(job))
+                last_send = time.monotonic()
+
+            if is_job_finished(job):
+                break
+
+            if time.monotonic() - last_send > SSE_HEARTBEAT_SECONDS:
+                yield sse_ping()
+                last_send = time.monotonic()
+
+            await asyncio.sleep(JOB_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream; charset=utf-8",
+        headers=SSE_HEADERS,
+    )
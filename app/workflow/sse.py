@@ -0,0 +1,155 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/workflow/sse.py
+
+"""
+SSE 帧编码 / 用例批量合并 / gzip·deflate 压缩
+"""
+
+import json
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+
+
+# SSE 事件 id（生成 run 内为 "<run_id>.<seq>"）
+EventId = Union[int, str]
+
+
+SSE_HEARTBEAT_SECONDS = 10
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+    # ✅ 双保险：某些代理/中间层会覆盖 media_type
+    "Content-Type": "text/event-stream; charset=utf-8",
+}
+
+# 按优先级排列
+SSE_ENCODINGS = ("gzip", "deflate")
+
+
+def sse_pack(event: str, data: dict, event_id: Optional[EventId] = None) -> str:
+    # ✅ ensure_ascii=False 保证中文不被转义
+    frame = f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    if event_id is not None:
+        # 带 id 的事件可通过 Last-Event-ID 断线续传
+        frame = f"id: {event_id}\n" + frame
+    return frame
+
+
+def sse_ping() -> str:
+    return ": ping\n\n"
+
+
+# =====================================================
+# 用例批量合并（case → cases）
+# =====================================================
+class SseCaseBatcher:
+    """
+    连续的 case 事件合并为一帧：
+
+        event: cases
+        data: {"cases": [...]}
+
+    - 攒满 batch_size 条，或首条入批后超过 batch_ms，立即发送
+    - 遇到非 case 事件先发送已攒的批次，保证顺序
+    - 批次 id 取最后一条用例的 id，Last-Event-ID 续传语义不变
+    - batch_size <= 1 时逐条发送（与原行为一致）
+    """
+
+    def __init__(self, batch_size: int = 1, batch_ms: int = 50):
+        self.batch_size = max(1, batch_size)
+        self.batch_seconds = max(0, batch_ms) / 1000
+        self._pending: List[Tuple[EventId, Dict[str, Any]]] = []
+        self._deadline: Optional[float] = None
+
+    @property
+    def has_pending(self) -> bool:
+        return bool(self._pending)
+
+    def add(self, event_id: EventId, event: str, payload: Dict[str, Any]) -> str:
+        """
+        返回此刻需要发送的帧（可能为空串）
+        """
+        if event != "case" or self.batch_size == 1:
+            return self.flush() + sse_pack(event, payload, event_id=event_id)
+
+        self._pending.append((event_id, payload))
+        if self._deadline is None:
+            self._deadline = time.monotonic() + self.batch_seconds
+
+        if len(self._pending) >= self.batch_size:
+            return self.flush()
+        return ""
+
+    def flush(self) -> str:
+        if not self._pending:
+            return ""
+
+        frame = sse_pack(
+            "cases",
+            {"cases": [payload for _, payload in self._pending]},
+            event_id=self._pending[-1][0],
+        )
+        self._pending = []
+        self._deadline = None
+        return frame
+
+    def timeout(self, idle_timeout: float) -> float:
+        """
+        下一次等待的超时：有待发批次时取剩余延迟预算，否则为心跳间隔
+        """
+        if self._deadline is None:
+            return idle_timeout
+        return max(0.0, self._deadline - time.monotonic())
+
+
+# =====================================================
+# 压缩（每批 Z_SYNC_FLUSH，浏览器可立即解出完整帧）
+# =====================================================
+def negotiate_sse_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    根据 Accept-Encoding 选择 gzip / deflate，不支持则返回 None
+    """
+    accepted = set()
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip())
+
+    for encoding in SSE_ENCODINGS:
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+class SseCompressor:
+    def __init__(self, encoding: str):
+        wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+        self._z = zlib.compressobj(6, zlib.DEFLATED, wbits)
+
+    def compress(self, text: str) -> bytes:
+        return self._z.compress(text.encode("utf-8")) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._z.flush()
+
+
+async def compress_sse_stream(
+    stream: AsyncIterator[str],
+    encoding: str,
+) -> AsyncIterator[bytes]:
+    compressor = SseCompressor(encoding)
+    async for chunk in stream:
+        yield compressor.compress(chunk)
+    yield compressor.finish()
+
+
+def sse_headers(encoding: Optional[str] = None) -> Dict[str, str]:
+    headers = dict(SSE_HEADERS)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["Vary"] = "Accept-Encoding"
+    return headers
@@ -2,18 +2,49 @@
 # coding=utf-8
 # app/workflow/state.py
 
-from typing import Dict, Optional
-from threading import Lock
+from typing import Optional
+from dataclasses import fields
 from datetime import datetime
 import uuid
 
+from app.settings import (
+    WORKFLOW_STORE,
+    WORKFLOW_DB_PATH,
+    WORKFLOW_FLUSH_INTERVAL,
+    WORKFLOW_SPILL_DIR,
+    WORKFLOW_IDLE_TTL,
+    WORKFLOW_MAX_RESIDENT_BYTES,
+    WORKFLOW_EXPIRE_SECONDS,
+)
 from .models import WorkflowTask, WorkflowStage, WorkflowProgress
+from .store import WorkflowStore, build_workflow_store
+from .events import event_bus
 
 # =====================================================
-# 内存态 Workflow Store（不落库）
+# Workflow Store（memory / sqlite，见 store.py）
 # =====================================================
-_WORKFLOWS: Dict[str, WorkflowTask] = {}
-_LOCK = Lock()
+_STORE: WorkflowStore = build_workflow_store(
+    WORKFLOW_STORE,
+    db_path=WORKFLOW_DB_PATH,
+    flush_interval=WORKFLOW_FLUSH_INTERVAL,
+    spill_dir=WORKFLOW_SPILL_DIR,
+    idle_ttl=WORKFLOW_IDLE_TTL,
+    max_resident_bytes=WORKFLOW_MAX_RESIDENT_BYTES,
+    expire_seconds=WORKFLOW_EXPIRE_SECONDS,
+)
+
+_TASK_FIELDS = frozenset(f.name for f in fields(WorkflowTask))
+
+
+def get_store() -> WorkflowStore:
+    return _STORE
+
+
+def get_store_stats() -> dict:
+    """
+    存储指标（resident_bytes = 当前常驻内存的大字段字节数）
+    """
+    return _STORE.stats()
 
 
 # =====================================================
@@ -31,31 +62,38 @@ def create_workflow(
     新建 workflow：
     - 默认 stage=IDLE（允许直接上传 PDF）
     """
-    with _LOCK:
-        wid = workflow_id or str(uuid.uuid4())
-
-        task = WorkflowTask(
-            workflow_id=wid,
-            stage=stage,
-            progress=progress,
-            message=message or _default_message_for_stage(stage),
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow(),
-            test_points=None,
-
-            # ⭐ 补充测试重点（核心新增）
-            focus_requirements=focus_requirements,
-        )
+    wid = workflow_id or str(uuid.uuid4())
+
+    task = WorkflowTask(
+        workflow_id=wid,
+        stage=stage,
+        progress=progress,
+        message=message or _default_message_for_stage(stage),
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+        test_points=None,
+
+        # ⭐ 补充测试重点（核心新增）
+        focus_requirements=focus_requirements,
+    )
 
-        _WORKFLOWS[wid] = task
-        return task
+    with _STORE.locked(wid):
+        return _publish_status(_STORE.put(task))
 
 
 # =====================================================
 # 获取 Workflow
 # =====================================================
-def get_workflow(workflow_id: str) -> Optional[WorkflowTask]:
-    return _WORKFLOWS.get(workflow_id)
+def get_workflow(
+    workflow_id: str,
+    *,
+    include_blobs: bool = True,
+) -> Optional[WorkflowTask]:
+    """
+    include_blobs=False 时不加载 pdf_text / analysis_result / test_points
+    （只看状态时用，sqlite 后端可省掉大字段反序列化）
+    """
+    return _STORE.get(workflow_id, include_blobs=include_blobs)
 
 
 # =====================================================
@@ -63,25 +101,22 @@ def get_workflow(workflow_id: str) -> Optional[WorkflowTask]:
 # =====================================================
 def update_workflow(
     workflow_id: str,
+    *,
+    expect: Optional[dict] = None,
     **kwargs,
 ) -> Optional[WorkflowTask]:
+    """
+    expect：条件写（如 {"pdf_path": ...}），当前值不符时不写入、返回 None
+    """
     if "stage" in kwargs or "progress" in kwargs or "message" in kwargs:
         raise RuntimeError(
             "禁止通过 update_workflow 修改 stage/progress/message，"
             "请使用 update_workflow_stage"
         )
 
-    with _LOCK:
-        task = _WORKFLOWS.get(workflow_id)
-        if not task:
-            return None
-
-        for key, value in kwargs.items():
-            if hasattr(task, key):
-                setattr(task, key, value)
-
-        task.updated_at = datetime.utcnow()
-        return task
+    changes = {k: v for k, v in kwargs.items() if k in _TASK_FIELDS}
+    changes["updated_at"] = datetime.utcnow()
+    return _update_and_publish(workflow_id, changes, expect)
 
 
 # =====================================================
@@ -92,20 +127,17 @@ def update_workflow_stage(
     stage: WorkflowStage,
     *,
     message: Optional[str] = None,
+    expect: Optional[dict] = None,
 ) -> Optional[WorkflowTask]:
     """
     所有 stage 变化必须走这里
     """
-    with _LOCK:
-        task = _WORKFLOWS.get(workflow_id)
-        if not task:
-            return None
-
-        task.stage = stage
-        task.progress = _default_progress_for_stage(stage)
-        task.message = message or _default_message_for_stage(stage)
-        task.updated_at = datetime.utcnow()
-        return task
+    return _update_and_publish(workflow_id, {
+        "stage": stage,
+        "progress": _default_progress_for_stage(stage),
+        "message": message or _default_message_for_stage(stage),
+        "updated_at": datetime.utcnow(),
+    }, expect)
 
 
 # =====================================================
@@ -139,7 +171,7 @@ def _default_message_for_stage(stage: WorkflowStage) -> str:
 # 前端状态快照（唯一权威）
 # =====================================================
 def get_workflow_progress(workflow_id: str) -> Optional[WorkflowProgress]:
-    task = _WORKFLOWS.get(workflow_id)
+    task = _STORE.get(workflow_id, include_blobs=False)
     if not task:
         return None
 
@@ -154,29 +186,73 @@ def get_workflow_progress(workflow_id: str) -> Optional[WorkflowProgress]:
 # 重置 Workflow（安全重置）
 # =====================================================
 def reset_workflow(workflow_id: str) -> Optional[WorkflowTask]:
-    with _LOCK:
-        task = _WORKFLOWS.get(workflow_id)
-        if not task:
-            return None
-
-        task.stage = WorkflowStage.IDLE
-        task.progress = 0
-        task.message = "已重置，等待上传需求文档"
+    return _update_and_publish(workflow_id, {
+        "stage": WorkflowStage.IDLE,
+        "progress": 0,
+        "message": "已重置，等待上传需求文档",
 
         # 清理业务数据
-        task.task_id = None
-        task.excel_path = None
-        task.total_cases = None
-        task.analysis_result = None
-        task.test_points = None
-        task.pdf_path = None
-        task.pdf_text = None
+        "task_id": None,
+        "excel_path": None,
+        "total_cases": None,
+        "export_hash": None,
+        "focus_hit_cases": None,
+        "analysis_result": None,
+        "test_points": None,
+        "pdf_path": None,
+        "pdf_text": None,
+        "pdf_sha256": None,
+        "parsed_pages": 0,
+        "total_pages": None,
+        "parse_done": False,
 
         # ⭐ 同时清空补充测试重点（符合直觉）
-        task.focus_requirements = None
+        "focus_requirements": None,
 
-        task.updated_at = datetime.utcnow()
-        return task
+        "updated_at": datetime.utcnow(),
+    })
+
+
+# =====================================================
+# 状态推送（事件总线）
+# =====================================================
+def workflow_status_snapshot(task: WorkflowTask) -> dict:
+    """
+    推送给前端的状态快照（只含热字段，与 /status 返回一致）
+    """
+    return {
+        "workflow_id": task.workflow_id,
+        "stage": task.stage.value,
+        "progress": task.progress,
+        "message": task.message,
+        "excel_path": task.excel_path,
+        "total_cases": task.total_cases,
+        "focus_hit_cases": task.focus_hit_cases,
+        "parsed_pages": task.parsed_pages,
+        "total_pages": task.total_pages,
+        "parse_done": task.parse_done,
+    }
+
+
+# 写入与推送在同一把锁（store 的按 workflow 分片写锁）内完成：
+# 快照严格按写入顺序进入事件总线，订阅方不会停在旧的 stage / progress
+def _update_and_publish(
+    workflow_id: str,
+    changes: dict,
+    expect: Optional[dict] = None,
+) -> Optional[WorkflowTask]:
+    with _STORE.locked(workflow_id):
+        return _publish_status(_STORE.update(workflow_id, changes, expect))
+
+
+def _publish_status(task: Optional[WorkflowTask]) -> Optional[WorkflowTask]:
+    if task is not None:
+        event_bus.publish(
+            task.workflow_id,
+            "status",
+            workflow_status_snapshot(task),
+        )
+    return task
 
 
 # =====================================================
@@ -194,6 +270,10 @@ def serialize_workflow(task: WorkflowTask) -> dict:
         "analysis_result": task.analysis_result,
         "test_points": task.test_points,
         "pdf_path": task.pdf_path,
+        "pdf_sha256": task.pdf_sha256,
+        "parsed_pages": task.parsed_pages,
+        "total_pages": task.total_pages,
+        "parse_done": task.parse_done,
 
         # ⭐ 新增可观测字段
         "focus_requirements": task.focus_requirements,
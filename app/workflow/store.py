@@ -0,0 +1,644 @@
+#! /usr/bin/python3
+# coding=utf-8
+# app/workflow/store.py
+
+"""
+Workflow 存储后端（可插拔）
+
+- memory：进程内 dict（默认），冷 workflow 的大字段 spill 到磁盘
+- sqlite：WAL 落盘，重启不丢、多 worker 进程共享
+    - 热行（workflows）只存小字段，pdf_text / analysis_result / test_points
+      等大字段放在 workflow_blobs，读状态不必反序列化整份需求文本
+    - 纯进度类更新（progress / message / parsed_pages …）写后合并（write-behind），
+      由后台线程按 flush_interval 批量落盘
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from dataclasses import fields, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from .models import WorkflowTask, WorkflowStage
+
+
+# 存到 workflow_blobs 的大字段
+BLOB_FIELDS = ("pdf_text", "analysis_result", "test_points")
+
+# 允许 write-behind 的纯进度字段（stage 变化必须同步落盘）
+PROGRESS_FIELDS = frozenset((
+    "progress",
+    "message",
+    "parsed_pages",
+    "total_pages",
+    "updated_at",
+))
+
+_TASK_FIELDS = tuple(f.name for f in fields(WorkflowTask))
+
+
+# =====================================================
+# 存储接口
+# =====================================================
+class WorkflowStore:
+    """
+    state.py 只依赖以下接口
+    """
+
+    # 按 workflow_id 分片的可重入写锁（子类在 __init__ 中创建）
+    _shard_locks: List[threading.RLock]
+
+    def locked(self, workflow_id: str) -> threading.RLock:
+        """
+        该 workflow 的写锁：store 的写操作都在这把锁内完成，
+        调用方持有它即可把「写入 + 推送状态」做成一个原子步骤
+        """
+        return self._shard_locks[hash(workflow_id) % len(self._shard_locks)]
+
+    def get(
+        self,
+        workflow_id: str,
+        *,
+        include_blobs: bool = True,
+    ) -> Optional[WorkflowTask]:
+        raise NotImplementedError
+
+    def put(self, task: WorkflowTask) -> WorkflowTask:
+        raise NotImplementedError
+
+    def update(
+        self,
+        workflow_id: str,
+        changes: Dict[str, Any],
+        expect: Optional[Dict[str, Any]] = None,
+    ) -> Optional[WorkflowTask]:
+        """
+        原子地修改若干字段，workflow 不存在返回 None
+
+        expect：仅当当前值与之相等时才写入（比较与写入原子），不满足也返回 None
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        存储指标（含常驻大字段字节数 gauge）
+        """
+        return {}
+
+    def close(self):
+        self.flush()
+
+
+# =====================================================
+# 内存实现（默认）
+# =====================================================
+class MemoryWorkflowStore(WorkflowStore):
+    """
+    进程内 dict + 内存上限
+
+    - 超过 idle_ttl 未访问的 workflow，大字段落盘（spill），热字段留在内存
+    - 常驻大字段总量超过 max_resident_bytes 时，按最久未访问顺序 spill
+    - 访问 spill 过的 workflow 时按需读回（rehydrate）
+    - 超过 expire_seconds 未访问的 workflow 整体删除（0 = 永不删除）
+
+    ⭐ 并发模型（copy-on-write）：
+    - dict 中的 WorkflowTask 是不可变快照，写入总是生成新版本并整体替换
+    - 读：直接取 dict 中的当前版本，不加锁，也不会看到写了一半的状态
+    - 写：按 workflow_id 分片加锁，不同 workflow 的写互不阻塞
+    """
+
+    def __init__(
+        self,
+        *,
+        spill_dir: Optional[str] = None,
+        idle_ttl: float = 0,
+        max_resident_bytes: int = 0,
+        expire_seconds: float = 0,
+        sweep_interval: float = 30,
+        shards: int = 64,
+    ):
+        self._workflows: Dict[str, WorkflowTask] = {}
+        self._shard_locks = [threading.RLock() for _ in range(shards)]
+        # 同一时刻只允许一个线程做内存预算回收
+        self._budget_lock = threading.Lock()
+
+        self.spill_dir = spill_dir
+        self.idle_ttl = idle_ttl
+        self.max_resident_bytes = max_resident_bytes
+        self.expire_seconds = expire_seconds
+
+        self._last_access: Dict[str, float] = {}
+        self._resident_bytes: Dict[str, int] = {}
+        self._spilled: set = set()
+
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        self._stop = threading.Event()
+        if spill_dir and (idle_ttl or expire_seconds):
+            threading.Thread(
+                target=self._sweep_loop,
+                args=(sweep_interval,),
+                name="workflow-store-sweeper",
+                daemon=True,
+            ).start()
+
+    def get(self, workflow_id, *, include_blobs=True):
+        task = self._workflows.get(workflow_id)
+        if task is None:
+            return None
+
+        if include_blobs and workflow_id in self._spilled:
+            # ⚠️ 检查与读回在同一分片锁内：期间可能已被过期清理删除
+            with self.locked(workflow_id):
+                task = self._rehydrate(workflow_id)
+                if task is None:
+                    return None
+                self._last_access[workflow_id] = time.monotonic()
+            self._enforce_budget()
+            return task
+
+        self._last_access[workflow_id] = time.monotonic()
+        return task
+
+    def put(self, task):
+        wid = task.workflow_id
+        with self.locked(wid):
+            self._drop_spill(wid)
+            self._workflows[wid] = task
+            self._last_access[wid] = time.monotonic()
+            self._resident_bytes[wid] = _estimate_blob_bytes(task)
+
+        self._enforce_budget()
+        return task
+
+    def update(self, workflow_id, changes, expect=None):
+        touches_blobs = any(k in BLOB_FIELDS for k in changes)
+
+        with self.locked(workflow_id):
+            task = self._workflows.get(workflow_id)
+            if not task or not _matches(task, expect):
+                return None
+
+            if touches_blobs and workflow_id in self._spilled:
+                task = self._rehydrate(workflow_id)
+
+            task = replace(task, **changes)
+            self._workflows[workflow_id] = task
+
+            self._last_access[workflow_id] = time.monotonic()
+            if touches_blobs:
+                self._resident_bytes[workflow_id] = _estimate_blob_bytes(task)
+
+        if touches_blobs:
+            self._enforce_budget()
+        return task
+
+    # -------------------------------------------------
+    # spill / rehydrate（调用方需持有该 workflow 的分片锁）
+    # -------------------------------------------------
+    def _spill_path(self, workflow_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{workflow_id}.json")
+
+    def _spill(self, workflow_id: str):
+        task = self._workflows.get(workflow_id)
+        if task is None or workflow_id in self._spilled:
+            return
+
+        blobs = {name: getattr(task, name) for name in BLOB_FIELDS}
+
+        if any(v is not None for v in blobs.values()):
+            with open(self._spill_path(workflow_id), "w", encoding="utf-8") as f:
+                json.dump(blobs, f, ensure_ascii=False)
+
+        # ⚠️ 先标记再替换：无锁读者拿到无大字段版本时一定能看到 spilled 标记
+        self._spilled.add(workflow_id)
+        self._workflows[workflow_id] = replace(
+            task, **{name: None for name in BLOB_FIELDS}
+        )
+        self._resident_bytes[workflow_id] = 0
+
+    def _rehydrate(self, workflow_id: str) -> Optional[WorkflowTask]:
+        task = self._workflows.get(workflow_id)
+        if task is None:
+            # 已被 sweep 删除
+            return None
+        if workflow_id not in self._spilled:
+            return task
+
+        path = self._spill_path(workflow_id)
+
+        blobs = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                blobs = json.load(f)
+
+        task = replace(task, **blobs)
+        self._workflows[workflow_id] = task
+        self._drop_spill(workflow_id)
+        self._resident_bytes[workflow_id] = _estimate_blob_bytes(task)
+        return task
+
+    def _drop_spill(self, workflow_id: str):
+        if workflow_id in self._spilled:
+            self._spilled.discard(workflow_id)
+            path = self._spill_path(workflow_id)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _enforce_budget(self):
+        if not self.spill_dir or not self.max_resident_bytes:
+            return
+
+        # 已有线程在回收则跳过
+        if not self._budget_lock.acquire(blocking=False):
+            return
+
+        try:
+            sizes = dict(self._resident_bytes)
+            total = sum(sizes.values())
+            if total <= self.max_resident_bytes:
+                return
+
+            # 最久未访问优先；正在运行的 workflow 不动
+            for wid in sorted(sizes, key=lambda w: self._last_access.get(w, 0)):
+                if total <= self.max_resident_bytes:
+                    break
+
+                size = sizes[wid]
+                if not size:
+                    continue
+
+                # ⚠️ 阶段检查与 spill 在同一分片锁内：检查后才进入运行态的不会被 spill
+                with self.locked(wid):
+                    task = self._workflows.get(wid)
+                    if task is None or task.is_running():
+                        continue
+                    self._spill(wid)
+                total -= size
+        finally:
+            self._budget_lock.release()
+
+    def sweep(self):
+        """
+        idle 超时 spill + 过期删除（正在分析 / 生成的 workflow 两者都跳过）
+        """
+        now = time.monotonic()
+        for wid in list(self._workflows):
+            with self.locked(wid):
+                task = self._workflows.get(wid)
+                if task is None:
+                    continue
+
+                if task.is_running():
+                    continue
+
+                idle = now - self._last_access.get(wid, now)
+
+                if self.expire_seconds and idle > self.expire_seconds:
+                    self._drop_spill(wid)
+                    self._workflows.pop(wid, None)
+                    self._last_access.pop(wid, None)
+                    self._resident_bytes.pop(wid, None)
+                    continue
+
+                if (
+                    self.idle_ttl
+                    and idle > self.idle_ttl
+                    and self._resident_bytes.get(wid)
+                ):
+                    self._spill(wid)
+
+    def _sweep_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.sweep()
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "workflows": len(self._workflows),
+            "spilled": len(self._spilled),
+            "resident_bytes": sum(dict(self._resident_bytes).values()),
+            "max_resident_bytes": self.max_resident_bytes,
+        }
+
+    def close(self):
+        self._stop.set()
+
+
+def _matches(task: Optional[WorkflowTask], expect: Optional[Dict[str, Any]]) -> bool:
+    if task is None:
+        return False
+    return not expect or all(getattr(task, k) == v for k, v in expect.items())
+
+
+def _estimate_blob_bytes(task: WorkflowTask) -> int:
+    """
+    估算大字段常驻内存（pdf_text 用实际对象大小，其余按 JSON 长度近似）
+    """
+    size = sys.getsizeof(task.pdf_text) if task.pdf_text else 0
+    for name in ("analysis_result", "test_points"):
+        value = getattr(task, name)
+        if value:
+            size += len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+    return size
+
+
+# =====================================================
+# SQLite（WAL）实现
+# =====================================================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS workflows (
+    workflow_id TEXT PRIMARY KEY,
+    stage TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS workflow_blobs (
+    workflow_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (workflow_id, name)
+);
+"""
+
+
+class SqliteWorkflowStore(WorkflowStore):
+    def __init__(self, db_path: str, flush_interval: float = 0.2, shards: int = 64):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self._shard_locks = [threading.RLock() for _ in range(shards)]
+
+        self._local = threading.local()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._pending_lock = threading.Lock()
+        # 串行化「取 pending + 落盘」，避免旧进度覆盖新的同步写
+        self._write_lock = threading.Lock()
+
+        self._conn().executescript(_SCHEMA)
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_loop,
+            name="workflow-store-flusher",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    # -------------------------------------------------
+    # 连接（每线程一个）
+    # -------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _begin(self) -> sqlite3.Connection:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    # -------------------------------------------------
+    # 读
+    # -------------------------------------------------
+    def get(self, workflow_id, *, include_blobs=True):
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT data FROM workflows WHERE workflow_id=?",
+            (workflow_id,),
+        ).fetchone()
+        if not row:
+            return None
+
+        data = json.loads(row["data"])
+
+        if include_blobs:
+            for blob in conn.execute(
+                "SELECT name, value FROM workflow_blobs WHERE workflow_id=?",
+                (workflow_id,),
+            ):
+                data[blob["name"]] = json.loads(blob["value"])
+
+        # ⭐ 叠加尚未落盘的进度更新
+        with self._pending_lock:
+            pending = dict(self._pending.get(workflow_id) or {})
+        data.update(_encode(pending))
+
+        return _decode_task(data)
+
+    # -------------------------------------------------
+    # 写
+    # -------------------------------------------------
+    def put(self, task):
+        with self.locked(task.workflow_id):
+            data = _encode({name: getattr(task, name) for name in _TASK_FIELDS})
+            blobs = {name: data.pop(name) for name in BLOB_FIELDS}
+
+            with self._write_lock:
+                with self._pending_lock:
+                    self._pending.pop(task.workflow_id, None)
+
+                conn = self._begin()
+                try:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO workflows (workflow_id, stage, data, updated_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (task.workflow_id, data["stage"], json.dumps(data, ensure_ascii=False), data["updated_at"]),
+                    )
+                    conn.execute(
+                        "DELETE FROM workflow_blobs WHERE workflow_id=?",
+                        (task.workflow_id,),
+                    )
+                    self._write_blobs(conn, task.workflow_id, blobs)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            return task
+
+    def update(self, workflow_id, changes, expect=None):
+        with self.locked(workflow_id):
+            # ⭐ 纯进度更新：写后合并，由 flusher 批量落盘
+            if changes and set(changes) <= PROGRESS_FIELDS:
+                # 同一 workflow 的写都持有 locked(workflow_id)，检查与入队之间不会插入其他写
+                if expect:
+                    if not _matches(self.get(workflow_id, include_blobs=False), expect):
+                        return None
+                elif not self._exists(workflow_id):
+                    return None
+                with self._pending_lock:
+                    self._pending.setdefault(workflow_id, {}).update(changes)
+                return self.get(workflow_id, include_blobs=False)
+
+            with self._write_lock:
+                with self._pending_lock:
+                    pending = self._pending.pop(workflow_id, {})
+
+                conn = self._begin()
+                try:
+                    ok = not expect or _matches(
+                        self.get(workflow_id, include_blobs=False), expect
+                    )
+                    # 条件不满足时仍要把已取出的进度更新落盘
+                    merged = {**pending, **changes} if ok else pending
+                    if merged:
+                        ok = self._apply(conn, workflow_id, merged) and ok
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+            if not ok:
+                return None
+            return self.get(workflow_id, include_blobs=False)
+
+    def _exists(self, workflow_id: str) -> bool:
+        return self._conn().execute(
+            "SELECT 1 FROM workflows WHERE workflow_id=?",
+            (workflow_id,),
+        ).fetchone() is not None
+
+    def _apply(self, conn, workflow_id: str, changes: Dict[str, Any]) -> bool:
+        row = conn.execute(
+            "SELECT data FROM workflows WHERE workflow_id=?",
+            (workflow_id,),
+        ).fetchone()
+        if not row:
+            return False
+
+        encoded = _encode(changes)
+        blobs = {k: encoded.pop(k) for k in BLOB_FIELDS if k in encoded}
+
+        data = json.loads(row["data"])
+        data.update(encoded)
+
+        conn.execute(
+            "UPDATE workflows SET stage=?, data=?, updated_at=? WHERE workflow_id=?",
+            (data["stage"], json.dumps(data, ensure_ascii=False), data["updated_at"], workflow_id),
+        )
+        self._write_blobs(conn, workflow_id, blobs)
+        return True
+
+    @staticmethod
+    def _write_blobs(conn, workflow_id: str, blobs: Dict[str, Any]):
+        for name, value in blobs.items():
+            if value is None:
+                conn.execute(
+                    "DELETE FROM workflow_blobs WHERE workflow_id=? AND name=?",
+                    (workflow_id, name),
+                )
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO workflow_blobs (workflow_id, name, value) "
+                    "VALUES (?, ?, ?)",
+                    (workflow_id, name, json.dumps(value, ensure_ascii=False)),
+                )
+
+    # -------------------------------------------------
+    # write-behind 批量落盘
+    # -------------------------------------------------
+    def flush(self):
+        with self._write_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+
+            if not pending:
+                return
+
+            conn = self._begin()
+            try:
+                for workflow_id, changes in pending.items():
+                    self._apply(conn, workflow_id, changes)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                traceback.print_exc()
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._conn()
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            "backend": "sqlite",
+            "workflows": conn.execute("SELECT COUNT(*) FROM workflows").fetchone()[0],
+            "blob_bytes": conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM workflow_blobs"
+            ).fetchone()[0],
+            "pending_updates": pending,
+            "resident_bytes": 0,
+        }
+
+    def close(self):
+        self._stop.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+
+
+# =====================================================
+# 编解码
+# =====================================================
+def _encode(values: Dict[str, Any]) -> Dict[str, Any]:
+    encoded = {}
+    for key, value in values.items():
+        if isinstance(value, WorkflowStage):
+            value = value.value
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        encoded[key] = value
+    return encoded
+
+
+def _decode_task(data: Dict[str, Any]) -> WorkflowTask:
+    kwargs = {k: v for k, v in data.items() if k in _TASK_FIELDS}
+    kwargs["stage"] = WorkflowStage(kwargs.get("stage") or WorkflowStage.IDLE.value)
+    for key in ("created_at", "updated_at"):
+        if isinstance(kwargs.get(key), str):
+            kwargs[key] = datetime.fromisoformat(kwargs[key])
+    return WorkflowTask(**kwargs)
+
+
+def build_workflow_store(
+    backend: str,
+    *,
+    db_path: Optional[str] = None,
+    flush_interval: float = 0.2,
+    spill_dir: Optional[str] = None,
+    idle_ttl: float = 0,
+    max_resident_bytes: int = 0,
+    expire_seconds: float = 0,
+) -> WorkflowStore:
+    backend = (backend or "memory").lower()
+    if backend == "memory":
+        return MemoryWorkflowStore(
+            spill_dir=spill_dir,
+            idle_ttl=idle_ttl,
+            max_resident_bytes=max_resident_bytes,
+            expire_seconds=expire_seconds,
+        )
+    if backend == "sqlite":
+        return SqliteWorkflowStore(db_path, flush_interval=flush_interval)
+    raise ValueError(f"Unsupported WORKFLOW_STORE: {backend}")
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# tests/bench/bench_excel_export.py
+"""
+流式 Excel 导出：N 条合成用例的耗时与 Python 堆峰值
+
+    python tests/bench/bench_excel_export.py [count]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_MODEL", "bench")
+
+from app.services.excel_exporter import StreamingExcelWriter  # noqa: E402
+
+SAMPLE_CASE = {
+    "title": "TP-001: 用户使用正确的用户名和密码登录成功",
+    "module": "账户中心 (登录)",
+    "precondition": ["用户已注册", "账号状态正常"],
+    "steps": ["打开登录页", "输入正确的用户名和密码", "点击登录按钮"],
+    "expected": ["跳转到首页", "右上角显示用户昵称"],
+}
+
+
+def benchmark_export(count: int = 100_000) -> Dict[str, Any]:
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        writer = StreamingExcelWriter(path)
+        for _ in range(count):
+            writer.append(SAMPLE_CASE)
+        writer.close()
+        seconds = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        size = os.path.getsize(path)
+    finally:
+        tracemalloc.stop()
+        os.remove(path)
+
+    return {
+        "cases": count,
+        "seconds": round(seconds, 2),
+        "cases_per_sec": round(count / seconds, 1) if seconds else 0.0,
+        "peak_mb": round(peak / 1024 / 1024, 1),
+        "file_mb": round(size / 1024 / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    print(benchmark_export(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# tests/bench/bench_keyword_matcher.py
+"""
+关键词匹配：正则（长词优先分支）与 Aho-Corasick 在不同词典规模下的 find_all 耗时
+
+    python tests/bench/bench_keyword_matcher.py                 # 默认 20 万字文本
+    python tests/bench/bench_keyword_matcher.py --chars 50000
+
+用于确定 keyword_matcher.REGEX_MAX_KEYWORDS 的分界点
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+for key, value in (("OPENAI_API_KEY", "bench"), ("OPENAI_MODEL", "bench")):
+    os.environ.setdefault(key, value)
+
+from app.services.confirmed_extractor import DEFAULT_DOMAIN_KEYWORDS  # noqa: E402
+from app.services.keyword_matcher import KEYWORD_BACKENDS, KeywordMatcher  # noqa: E402
+
+# 合成文本 / 词典用的常用汉字
+_CHARS = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所"
+    "民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处府"
+)
+
+
+def make_text(chars: int, keywords: List[str], seed: int = 0) -> str:
+    """
+    随机汉字文本，约每 40 字插入一个词典中的关键词
+    """
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < chars:
+        chunk = "".join(rng.choice(_CHARS) for _ in range(rng.randint(20, 60)))
+        kw = rng.choice(keywords)
+        parts.append(chunk)
+        parts.append(kw)
+        size += len(chunk) + len(kw)
+    return "".join(parts)
+
+
+def make_keywords(n: int, seed: int = 1) -> List[str]:
+    """
+    默认领域词典 + 随机 2~5 字词，凑满 n 个
+    """
+    rng = random.Random(seed)
+    words = [w for ws in DEFAULT_DOMAIN_KEYWORDS.values() for w in ws]
+    seen = set(words)
+    while len(words) < n:
+        w = "".join(rng.choice(_CHARS) for _ in range(rng.randint(2, 5)))
+        if w not in seen:
+            seen.add(w)
+            words.append(w)
+    return words[:n] if n >= len(seen) else words
+
+
+def _timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def benchmark(sizes: List[int], chars: int, repeat: int = 3) -> List[Dict]:
+    """
+    返回 [{"keywords", "build_ms": {backend}, "scan_ms": {backend}, "same_result"}]
+    """
+    report = []
+    for n in sizes:
+        keywords = make_keywords(n)
+        text = make_text(chars, keywords)
+
+        row = {"keywords": len(keywords), "build_ms": {}, "scan_ms": {}}
+        results = {}
+        for backend in KEYWORD_BACKENDS:
+            started = time.perf_counter()
+            matcher = KeywordMatcher(keywords, backend=backend)
+            row["build_ms"][backend] = round((time.perf_counter() - started) * 1000, 1)
+            row["scan_ms"][backend] = round(_timed(lambda: matcher.find_all(text), repeat) * 1000, 1)
+            results[backend] = matcher.find_all(text)
+
+        row["same_result"] = results["regex"] == results["automaton"]
+        report.append(row)
+    return report
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, default=200_000)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+",
+        default=[19, 100, 250, 500, 1000, 2000, 5000],
+    )
+    args = parser.parse_args(argv)
+
+    print(f"text: {args.chars} chars")
+    print(f"{'keywords':>8}  {'regex ms':>9}  {'automaton ms':>12}  {'ratio':>6}  {'build regex/ac ms':>18}  same")
+    for row in benchmark(args.sizes, args.chars):
+        regex, automaton = row["scan_ms"]["regex"], row["scan_ms"]["automaton"]
+        build = f"{row['build_ms']['regex']}/{row['build_ms']['automaton']}"
+        print(
+            f"{row['keywords']:>8}  {regex:>9}  {automaton:>12}  "
+            f"{automaton / regex if regex else 0:>6.1f}  {build:>18}  {row['same_result']}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# tests/bench/bench_session_backends.py
+"""
+会话持久化后端：逐条写 / 批量写 / 读最新，每秒操作数
+
+    python tests/bench/bench_session_backends.py [sqlite_path]
+
+MySQL 使用 MYSQL_* 配置，连不上则跳过
+"""
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_MODEL", "bench")
+
+from app.services.db import (  # noqa: E402
+    MysqlSessionBackend,
+    SessionBackend,
+    SqliteSessionBackend,
+)
+
+CONTENT = {"title": "用户使用正确的用户名和密码登录成功", "steps": ["打开登录页", "登录"]}
+
+
+def benchmark_session_backends(
+    backends: Sequence[SessionBackend],
+    rows: int = 5000,
+    batch: int = 500,
+) -> List[Dict[str, Any]]:
+    report = []
+
+    for backend in backends:
+        session_id = f"bench-{uuid.uuid4().hex[:8]}"
+        backend.create_session(session_id, "bench.pdf", "/tmp/bench.pdf")
+
+        started = time.perf_counter()
+        for _ in range(rows // 10):
+            backend.insert_session_data(session_id, "case", CONTENT)
+        single = (rows // 10) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(rows // batch):
+            backend.insert_session_data_many([(session_id, "case", CONTENT)] * batch)
+        bulk = (rows // batch * batch) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for _ in range(rows // 10):
+            backend.get_session_data(session_id, "case")
+        reads = (rows // 10) / (time.perf_counter() - started)
+
+        report.append({
+            "backend": backend.name,
+            "single_writes_per_sec": round(single, 1),
+            "bulk_rows_per_sec": round(bulk, 1),
+            "reads_per_sec": round(reads, 1),
+        })
+
+    return report
+
+
+def main(argv: List[str]):
+    tmp_path = None
+    if argv:
+        sqlite_path = argv[0]
+    else:
+        fd, tmp_path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        sqlite_path = tmp_path
+
+    try:
+        targets: List[SessionBackend] = [SqliteSessionBackend(sqlite_path)]
+        try:
+            mysql = MysqlSessionBackend()
+            mysql.get_session("__ping__")
+            targets.append(mysql)
+        except Exception as e:
+            print(f"skip mysql: {e}")
+
+        for row in benchmark_session_backends(targets):
+            print(row)
+    finally:
+        if tmp_path:
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(tmp_path + suffix)
+                except OSError:
+                    pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
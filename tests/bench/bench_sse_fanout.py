@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+# tests/bench/bench_sse_fanout.py
+"""
+生成 SSE 扇出压测：N 个客户端经 ASGI app 订阅同一 workflow 的 /workflow/generate/stream
+
+    python tests/bench/bench_sse_fanout.py [subscribers] [cases] [interval]
+
+- 请求走完整 ASGI 栈（中间件 → 路由 → StreamingResponse），客户端是同一事件循环里的
+  原始 ASGI 调用方（不经过 socket，只计服务端开销）
+- 生成主体替换为按 interval 秒产出一条用例的假生成器（不调用 LLM），
+  全部客户端收到 connected 后才开始产出
+- 统计：每个订阅方建立连接的内存（tracemalloc）、emit → 客户端收到该帧的延迟
+  （每 10 个客户端采样一个）、送达数 / slow_consumer 断开数
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("OPENAI_MODEL", "bench")
+os.environ.setdefault("TMP_DIR", tempfile.mkdtemp(prefix="bench-sse-"))
+
+from app.main import app  # noqa: E402
+from app.workflow import generation  # noqa: E402
+from app.workflow.state import create_workflow, update_workflow  # noqa: E402
+
+SAMPLE_EVERY = 10
+
+
+def fake_generation(cases: int, interval: float, connected: threading.Event):
+    def run_generation(workflow_id, requirement, emit):
+        connected.wait()
+        emit("meta", {"message": "generation_started"})
+        for i in range(cases):
+            emit("case", {"case_name": f"case-{i}", "ts": time.perf_counter()})
+            time.sleep(interval)
+        emit("done", {"total": cases})
+    return run_generation
+
+
+async def sse_client(path: str, query: Dict[str, Any], on_body) -> int:
+    """
+    原始 ASGI 客户端：发 GET，把每个 body 片段交给 on_body，返回状态码
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": urlencode(query).encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"accept", b"text/event-stream")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    requested = False
+    closed = asyncio.Event()
+    status = 0
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await closed.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            on_body(message.get("body", b""))
+            if not message.get("more_body"):
+                closed.set()
+
+    await app(scope, receive, send)
+    return status
+
+
+def benchmark(subscribers: int = 1000, cases: int = 200, interval: float = 0.02) -> Dict[str, Any]:
+    connected = threading.Event()
+    generation.run_generation = fake_generation(cases, interval, connected)
+
+    wid = create_workflow().workflow_id
+    update_workflow(wid, pdf_text="bench", parse_done=True, test_points=[{"id": "TP-1"}])
+
+    latencies: List[float] = []
+    counts = {"connected": 0, "cases": 0, "slow_consumer": 0}
+
+    async def client(index: int, all_connected: asyncio.Event):
+        sample = index % SAMPLE_EVERY == 0
+        seen_meta = False
+
+        def on_body(body: bytes):
+            nonlocal seen_meta
+            now = time.perf_counter()
+            if not seen_meta and b"connected" in body:
+                seen_meta = True
+                counts["connected"] += 1
+                if counts["connected"] == subscribers:
+                    all_connected.set()
+            counts["cases"] += body.count(b"event: case\n")
+            counts["slow_consumer"] += body.count(b"slow_consumer")
+            if sample:
+                for line in body.split(b"\n"):
+                    if line.startswith(b"data: ") and b'"ts"' in line:
+                        latencies.append(now - json.loads(line[6:])["ts"])
+
+        return await sse_client(
+            "/workflow/generate/stream", {"workflow_id": wid}, on_body
+        )
+
+    async def main() -> Dict[str, Any]:
+        all_connected = asyncio.Event()
+
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        tasks = [
+            asyncio.ensure_future(client(i, all_connected))
+            for i in range(subscribers)
+        ]
+        await all_connected.wait()
+        after, _ = tracemalloc.get_traced_memory()
+        # 分发阶段不开 tracemalloc（追踪开销会拖慢事件循环，延迟失真）
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        connected.set()
+        statuses = await asyncio.gather(*tasks)
+        return {
+            "statuses": sorted(set(statuses)),
+            "subscriber_kb": round((after - before) / 1024 / subscribers, 2),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    report = asyncio.run(main())
+    latencies.sort()
+
+    def pct(p: float) -> float:
+        if not latencies:
+            return 0.0
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    report.update(
+        subscribers=subscribers,
+        cases=cases,
+        delivered=counts["cases"],
+        slow_consumer=counts["slow_consumer"],
+        p50_ms=pct(0.50),
+        p99_ms=pct(0.99),
+        max_ms=pct(1.0),
+    )
+    return report
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    print(benchmark(
+        int(args[0]) if len(args) > 0 else 1000,
+        int(args[1]) if len(args) > 1 else 200,
+        float(args[2]) if len(args) > 2 else 0.02,
+    ))
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+# tests/conftest.py
+
+import os
+import sys
+
+# 仓库根目录加入 sys.path（import app.*）
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# ⚠️ app.settings 导入时会读取这些变量，测试环境给占位值（不会真正请求模型）
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("OPENAI_MODEL", "test")
+os.environ.setdefault("OPENAI_BASE_URL", "http://127.0.0.1:9")
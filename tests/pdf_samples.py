@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# tests/pdf_samples.py
+"""
+测试 / 压测共用的合成 PDF
+"""
+
+from typing import List
+
+
+def make_synthetic_pdf(path: str, pages: int, lines_per_page: int = 40) -> str:
+    """
+    生成每页 lines_per_page 行英文文本的 PDF（手写最小结构，不依赖绘图库）
+    """
+    line = "Page {page} line {line}: the user login requirement must validate the password field."
+
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Pages 占位，页对象编号确定后回填
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for p in range(1, pages + 1):
+        body = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(
+            f"({line.format(page=p, line=i)}) '" for i in range(lines_per_page)
+        ) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(
+            b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % i for i in page_ids), pages,
+    )
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for i, obj in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % i + obj + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for off in offsets:
+            f.write(b"%010d 00000 n \n" % off)
+        f.write(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(objects) + 1, xref)
+        )
+    return path
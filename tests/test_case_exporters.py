@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# tests/test_case_exporters.py
+
+import pytest
+
+from app.services.case_exporters import (
+    CsvCaseWriter,
+    JsonlCaseWriter,
+    export_spilled_cases,
+)
+
+
+def test_failed_append_removes_part_file(tmp_path):
+    save_path = tmp_path / "cases.jsonl"
+    writer = JsonlCaseWriter(str(save_path), normalized=False)
+    writer.append({"case_name": "ok"})
+
+    with pytest.raises(TypeError):
+        writer.append({"case_name": object()})
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_spill_conversion_removes_part_file(tmp_path):
+    spill_path = tmp_path / "spill.cases.jsonl"
+    spill_path.write_text('{"case_name": "ok"}\n{broken\n', encoding="utf-8")
+    save_path = tmp_path / "cases.csv"
+
+    with pytest.raises(ValueError):
+        export_spilled_cases(str(spill_path), "csv", str(save_path))
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["spill.cases.jsonl"]
+
+
+def test_close_renames_part_file(tmp_path):
+    save_path = tmp_path / "cases.csv"
+    writer = CsvCaseWriter(str(save_path))
+    writer.append({"case_name": "ok", "steps": ["a"]})
+
+    assert writer.close() == str(save_path)
+    assert [p.name for p in tmp_path.iterdir()] == ["cases.csv"]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+# tests/test_export_cache.py
+
+import os
+
+from app.services import export_cache
+
+
+def test_file_etags_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_cache, "_FILE_ETAGS_MAX", 3)
+    export_cache._FILE_ETAGS.clear()
+
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"{i}.csv"
+        path.write_text(str(i))
+        paths.append(str(path))
+        export_cache.file_etag(str(path))
+
+    assert list(export_cache._FILE_ETAGS) == paths[-3:]
+
+
+def test_evicted_files_drop_their_etag(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_cache, "EXPORT_CACHE_DIR", str(tmp_path))
+    export_cache._FILE_ETAGS.clear()
+
+    path = tmp_path / "old.csv"
+    path.write_text("x")
+    os.utime(path, (0, 0))
+    export_cache.file_etag(str(path))
+
+    result = export_cache.evict_export_cache(max_bytes=0, max_age=60)
+
+    assert result["removed"] == 1
+    assert str(path) not in export_cache._FILE_ETAGS
+
+
+def test_spill_lives_as_long_as_any_export_of_the_case_set(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_cache, "EXPORT_CACHE_DIR", str(tmp_path))
+
+    # a：spill / csv 很久没用，但 xlsx 刚下载过；b：整组都过期
+    for name in ("a.cases.jsonl", "a.csv", "b.cases.jsonl", "b.xlsx"):
+        (tmp_path / name).write_text("x")
+        os.utime(tmp_path / name, (0, 0))
+    (tmp_path / "a.xlsx").write_text("x")
+
+    export_cache.evict_export_cache(max_bytes=0, max_age=60)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.cases.jsonl", "a.csv", "a.xlsx"]
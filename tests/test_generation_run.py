@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# tests/test_generation_run.py
+
+import asyncio
+import os
+
+from app.workflow import generation
+
+
+def _fake_generation(workflow_id, requirement, emit):
+    for i in range(10):
+        emit("case", {"i": i})
+    emit("done", {"total": 10})
+
+
+async def _wait_finished(run):
+    while not run.finished:
+        await asyncio.sleep(0.01)
+
+
+def test_replaced_run_keeps_spill_until_last_subscriber_closes(monkeypatch):
+    monkeypatch.setattr(generation, "run_generation", _fake_generation)
+
+    async def scenario():
+        old, _ = generation.get_or_start_generation_run("wf-discard")
+        await _wait_finished(old)
+
+        # 晚到的订阅方拿到回放迭代器，但还没开始读 spill
+        sub, backlog, _ = old.subscribe()
+        new, started = generation.get_or_start_generation_run("wf-discard")
+        assert started and new is not old
+        assert os.path.exists(old._spill_path)
+
+        assert sum(1 for e in backlog if e[1] == "case") == 10
+        sub.close()
+        assert not os.path.exists(old._spill_path)
+
+        # 没有订阅方的旧 run 立即删除
+        await _wait_finished(new)
+        generation.get_or_start_generation_run("wf-discard")
+        assert not os.path.exists(new._spill_path)
+
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# tests/test_job_queue.py
+
+import os
+import signal
+import time
+
+import pytest
+
+from app.services.job_queue import JobQueue, ActiveJobError
+from app.services.jobs import JobWorkerPool
+
+
+def test_claim_respects_global_running_limit(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    for _ in range(3):
+        queue.submit("parse", {"pdf_path": "x.pdf"})
+
+    # 两个「API 进程」各自的 worker 共享同一个库：上限按库中 running 数计算
+    assert queue.claim("parse", "api1-w0", max_running=2)
+    assert queue.claim("parse", "api2-w0", max_running=2)
+    assert queue.claim("parse", "api2-w1", max_running=2) is None
+    assert queue.claim("parse", "api2-w1")   # 不限流时照常领取
+
+
+def test_exclusive_submit_rejects_active_job(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"))
+    job_id = queue.submit("generate", {}, workflow_id="wf", exclusive=True)
+
+    with pytest.raises(ActiveJobError):
+        queue.submit("generate", {}, workflow_id="wf", exclusive=True)
+    queue.submit("generate", {}, workflow_id="other", exclusive=True)
+
+    job = queue.claim("generate", "w")
+    assert job["id"] == job_id
+    queue.finish(job_id, {}, worker="w")
+    queue.submit("generate", {}, workflow_id="wf", exclusive=True)
+
+
+def test_worker_pool_restarts_dead_workers(tmp_path):
+    pool = JobWorkerPool(str(tmp_path / "jobs.sqlite3"), {"parse": 1})
+    pool.start()
+    try:
+        first = pool._workers[("parse", 0)]
+        os.kill(first.pid, signal.SIGKILL)
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            current = pool._workers[("parse", 0)]
+            if current is not first and current.is_alive():
+                break
+            time.sleep(0.1)
+        else:
+            pytest.fail("killed worker was not restarted")
+
+        assert not first.is_alive() and first.exitcode is not None
+    finally:
+        pool.stop()
+    assert not pool._workers
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# tests/test_keyword_matcher.py
+
+import pytest
+
+from app.services.keyword_matcher import REGEX_MAX_KEYWORDS, KeywordMatcher
+
+KEYWORDS = ["用户", "用户名", "户名", "名", "登录", "a.b", "a"]
+TEXT = "请输入用户名后登录，a.b 与 axb 不同"
+
+
+@pytest.mark.parametrize("backend", ["regex", "automaton"])
+def test_backends_report_overlapping_and_prefix_matches(backend):
+    matcher = KeywordMatcher(KEYWORDS, backend=backend)
+
+    assert matcher.find_all(TEXT) == {"用户", "用户名", "户名", "名", "登录", "a.b", "a"}
+    assert sorted(matcher.iter_matches(TEXT)) == [
+        (3, "用户"), (3, "用户名"), (4, "户名"), (5, "名"), (7, "登录"),
+        (10, "a"), (10, "a.b"), (16, "a"),
+    ]
+    assert matcher.count(TEXT)["a"] == 2
+
+
+def test_backend_follows_dictionary_size():
+    small = KeywordMatcher(str(i) for i in range(REGEX_MAX_KEYWORDS))
+    large = KeywordMatcher(str(i) for i in range(REGEX_MAX_KEYWORDS + 1))
+
+    assert (small.backend, large.backend) == ("regex", "automaton")
+
+
+@pytest.mark.parametrize("backend", ["regex", "automaton"])
+def test_empty_inputs(backend):
+    assert KeywordMatcher([], backend=backend).find_all(TEXT) == set()
+    assert KeywordMatcher(KEYWORDS, backend=backend).find_all("") == set()
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# tests/test_pdf_parser_memory.py
+"""
+解析内存高水位：合成 N 页 PDF，按 router 的方式逐页解析 + spill，
+tracemalloc 峰值需有界且基本不随页数增长
+"""
+
+import tracemalloc
+
+import pytest
+
+from app.services.pdf_parser import iter_parse_pdf, PageTextSpill
+from pdf_samples import make_synthetic_pdf
+
+pytest.importorskip("pypdf")
+
+PAGES = 500
+PARSE_MEMORY_BUDGET_MB = 64
+# 每多解析一页允许的峰值增长（pypdf 页字典常驻约数 KB / 页；页缓存 / 图片泄漏是 MB 级）
+PARSE_MEMORY_PER_PAGE_KB = 16
+# 文本层完整的合成 PDF 只需要 pypdf；pdfplumber 在 tracemalloc 下要跑数分钟
+EXTRACTORS = ["pypdf"]
+
+
+def _measure(pdf_path: str) -> dict:
+    tracemalloc.start()
+    try:
+        pages = 0
+        with PageTextSpill() as spill:
+            for page_result in iter_parse_pdf(pdf_path, EXTRACTORS):
+                spill.add(page_result)
+                pages += 1
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"pages": pages, "peak_mb": peak / 1024 / 1024}
+
+
+def test_parse_peak_memory_is_bounded(tmp_path):
+    # 先不计量地解析一页：延迟导入 / 首次初始化的分配不计入峰值
+    for _ in iter_parse_pdf(make_synthetic_pdf(str(tmp_path / "warmup.pdf"), 1), EXTRACTORS):
+        pass
+
+    small = _measure(make_synthetic_pdf(str(tmp_path / "small.pdf"), PAGES // 5))
+    large = _measure(make_synthetic_pdf(str(tmp_path / "large.pdf"), PAGES))
+
+    assert large["pages"] == PAGES
+    assert large["peak_mb"] <= PARSE_MEMORY_BUDGET_MB
+
+    per_page_kb = (
+        (large["peak_mb"] - small["peak_mb"]) * 1024
+        / (large["pages"] - small["pages"])
+    )
+    assert per_page_kb <= PARSE_MEMORY_PER_PAGE_KB, (
+        f"{small['pages']} pages {small['peak_mb']:.2f}MB → "
+        f"{PAGES} pages {large['peak_mb']:.2f}MB ({per_page_kb:.1f}KB/page)"
+    )
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# tests/test_settings.py
+
+from app import settings
+
+
+def test_env_wins_over_config_yaml(monkeypatch):
+    monkeypatch.setattr(settings, "_CONFIG", {"BENCH_KEY": "from-yaml"})
+    monkeypatch.setenv("BENCH_KEY", "from-env")
+    assert settings._get_env_or_config("BENCH_KEY", "default") == "from-env"
+
+
+def test_config_yaml_used_when_env_missing(monkeypatch):
+    monkeypatch.setattr(settings, "_CONFIG", {"BENCH_KEY": "from-yaml"})
+    monkeypatch.delenv("BENCH_KEY", raising=False)
+    assert settings._get_env_or_config("BENCH_KEY", "default") == "from-yaml"
+    assert settings._get_env_or_config("MISSING_KEY", "default") == "default"
+
+
+def test_config_yaml_not_read_when_env_set(monkeypatch):
+    def fail():
+        raise AssertionError("config.yaml read although the env var is set")
+
+    monkeypatch.setattr(settings, "get_settings", fail)
+    monkeypatch.setenv("BENCH_KEY", "from-env")
+    assert settings._get_env_or_config("BENCH_KEY") == "from-env"
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# tests/test_startup_imports.py
+"""
+启动导入回归：全新解释器中 import app.main
+- 重依赖不得在启动时导入（首次使用 / 后台预热时才导入）
+- -X importtime 累计耗时不超过预算
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = "app.main"
+
+# import app.main 之后不允许出现在 sys.modules 中的模块
+STARTUP_FORBIDDEN_MODULES = (
+    "openpyxl",
+    "pdfplumber",
+    "pypdf",
+    "pytesseract",
+    "PIL",
+    "openai",
+)
+
+# import app.main 的累计耗时预算（毫秒）
+IMPORT_TIME_BUDGET_MS = 800
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    proc = subprocess.run(
+        [sys.executable, *args],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=dict(os.environ, PYTHONPATH=ROOT),
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    return proc
+
+
+def _cumulative_us(stderr: str, module: str) -> int:
+    """
+    解析 "import time: self [us] | cumulative | imported package" 行
+    """
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) == 3 and parts[2].strip() == module and parts[1].strip().isdigit():
+            return int(parts[1])
+    raise AssertionError(f"{module} not found in -X importtime output")
+
+
+def test_heavy_modules_not_imported_at_startup():
+    code = (
+        "import json, sys\n"
+        f"import {MODULE}\n"
+        f"print(json.dumps(sorted(m for m in {list(STARTUP_FORBIDDEN_MODULES)!r} if m in sys.modules)))"
+    )
+    loaded = json.loads(_run("-c", code).stdout.strip().splitlines()[-1])
+    assert loaded == []
+
+
+def test_startup_import_time_within_budget():
+    proc = _run("-X", "importtime", "-c", f"import {MODULE}")
+    total_ms = _cumulative_us(proc.stderr, MODULE) / 1000
+    assert total_ms <= IMPORT_TIME_BUDGET_MS, f"import {MODULE} took {total_ms:.0f}ms"
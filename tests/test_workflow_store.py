@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+# tests/test_workflow_store.py
+
+from datetime import datetime
+
+from app.workflow.models import WorkflowStage, WorkflowTask
+from app.workflow.store import MemoryWorkflowStore
+
+
+def _task(workflow_id: str, stage: WorkflowStage, text: str = "x" * 10_000) -> WorkflowTask:
+    return WorkflowTask(
+        workflow_id=workflow_id,
+        stage=stage,
+        progress=0,
+        message="",
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+        pdf_text=text,
+    )
+
+
+def test_sweep_keeps_running_workflows(tmp_path):
+    store = MemoryWorkflowStore(spill_dir=str(tmp_path), idle_ttl=1, expire_seconds=1)
+    store.put(_task("running", WorkflowStage.GENERATING))
+    store.put(_task("idle", WorkflowStage.GENERATED))
+    store._last_access = {wid: 0.0 for wid in store._last_access}
+
+    store.sweep()
+
+    assert store.get("idle") is None
+    running = store.get("running")
+    assert running is not None and running.pdf_text
+    assert "running" not in store._spilled
+
+
+def test_budget_does_not_spill_running_workflows(tmp_path):
+    # 预算只够一个 workflow 常驻；a 最久未访问但正在分析
+    store = MemoryWorkflowStore(spill_dir=str(tmp_path), max_resident_bytes=15_000)
+    store.put(_task("a", WorkflowStage.ANALYZING))
+    store.put(_task("b", WorkflowStage.FILE_READY))
+
+    assert "a" not in store._spilled
+    assert "b" in store._spilled